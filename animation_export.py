@@ -0,0 +1,209 @@
+"""
+Export the animation of a pipeline's canvas nodes without opening the Pipeline Editor.
+
+Every animatable node is seeked to the time of each frame (at --fps, for --duration seconds) and each canvas node is
+rasterised. Frames are encoded on a separate thread, so computing and rasterising frame k+1 overlaps with encoding
+frame k. Frames in which no animatable node changed reuse the previous image. Formats:
+    png     a numbered PNG sequence in a directory per canvas node
+    apng    an animated PNG per canvas node
+    gif     an animated GIF per canvas node
+
+Example:
+    python3 animation_export.py examples/blaze.pipeline -o renders --duration 4 --fps 25 --format gif apng
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+from PIL import Image
+
+from app_state import AppState
+from batch_render import canvas_nodes, render_size
+from id_datatypes import NodeId
+from node_manager import NodeManager
+from parallel_render import render_svg
+from pipeline_format import load_app_state
+from svg_raster import rasterise_svg
+
+FORMATS = ["png", "apng", "gif"]
+QUEUE_FRAMES = 8  # Frames rendered ahead of the encoder before rendering waits
+PUT_TIMEOUT_S = 0.5  # Interval at which rendering, while waiting for the encoder, checks that it is still running
+
+
+def frame_times(duration_s: float, fps: float) -> list[float]:
+    # Playback time of each frame in milliseconds
+    return [i * 1e3 / fps for i in range(max(1, round(duration_s * fps)))]
+
+
+def image_rgba(svg: bytes, width: int, height: int) -> Image.Image:
+    image = rasterise_svg(svg, width, height)
+    ptr = image.constBits()
+    ptr.setsize(image.byteCount())
+    # QImage ARGB32 pixels are stored as BGRA bytes
+    return Image.frombuffer("RGBA", (width, height), bytes(ptr), "raw", "BGRA", 0, 1)
+
+
+class FrameWriter:
+    """Encodes the frames of one canvas node in one format. Runs on the encoder thread."""
+
+    def __init__(self, base_path: str, fmt: str, frame_ms: float):
+        self.base_path = base_path
+        self.fmt = fmt
+        self.frame_ms = frame_ms
+        self.frames: list[Image.Image] = []  # Kept for the animated formats, which are written once complete
+        self.num_frames = 0
+        if fmt == "png":
+            os.makedirs(base_path, exist_ok=True)
+
+    @property
+    def path(self) -> str:
+        return {"png": self.base_path, "apng": self.base_path + ".png", "gif": self.base_path + ".gif"}[self.fmt]
+
+    def add(self, image: Image.Image) -> None:
+        if self.fmt == "png":
+            image.save(os.path.join(self.base_path, f"frame_{self.num_frames:05d}.png"))
+        elif self.fmt == "gif":
+            # Reduce each frame to a palette as it arrives, rather than all at once when saving
+            self.frames.append(image.quantize(method=Image.Quantize.FASTOCTREE))
+        else:
+            self.frames.append(image)
+        self.num_frames += 1
+
+    def close(self) -> None:
+        if not self.frames:
+            return
+        first, *rest = self.frames
+        if self.fmt == "gif":
+            first.save(self.path, save_all=True, append_images=rest, duration=round(self.frame_ms), loop=0,
+                       disposal=2)
+        else:
+            first.save(self.path, format="PNG", save_all=True, append_images=rest, duration=round(self.frame_ms),
+                       loop=0, default_image=False)
+        self.frames.clear()
+
+
+def encode_frames(frames: queue.Queue, writers: dict[NodeId, list[FrameWriter]], encode_times: list[float],
+                  errors: list[BaseException]) -> None:
+    # Encoder thread: takes (node, image) pairs until None
+    # An error stops the thread, and is kept in errors to be raised by the rendering thread
+    try:
+        while (item := frames.get()) is not None:
+            node, image = item
+            start = time.perf_counter()
+            for writer in writers[node]:
+                writer.add(image)
+            encode_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for node_writers in writers.values():
+            for writer in node_writers:
+                writer.close()
+        encode_times.append(time.perf_counter() - start)
+    except BaseException as e:
+        errors.append(e)
+
+
+def put_frame(frames: queue.Queue, item, encoder: threading.Thread) -> bool:
+    # Returns False, without queueing the item, if the encoder has stopped, as nothing would take it from the queue
+    while encoder.is_alive():
+        try:
+            frames.put(item, timeout=PUT_TIMEOUT_S)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def export_animation(app_state: AppState, nodes: list[NodeId], stem: str, out_dir: str, formats: list[str],
+                     duration_s: float, fps: float, scale: float) -> int:
+    # Returns the number of frames that produced an error visualisation
+    node_manager: NodeManager = app_state.node_manager
+    animatable: list[NodeId] = [node for node in node_manager.node_map if node_manager.node_info(node).animatable]
+    if not animatable:
+        print(f"{stem}: no animatable nodes, every frame will be the same", file=sys.stderr)
+    sizes: dict[NodeId, tuple[int, int]] = {node: render_size(app_state, node, scale) for node in nodes}
+    frame_ms: float = 1e3 / fps
+    writers: dict[NodeId, list[FrameWriter]] = {
+        node: [FrameWriter(os.path.join(out_dir, f"{stem}_node{node.value}"), fmt, frame_ms) for fmt in formats]
+        for node in nodes}
+
+    frames: queue.Queue = queue.Queue(maxsize=QUEUE_FRAMES * len(nodes))
+    encode_times: list[float] = []
+    encode_errors: list[BaseException] = []
+    encoder = threading.Thread(target=encode_frames, args=(frames, writers, encode_times, encode_errors), daemon=True)
+    encoder.start()
+
+    num_errors = 0
+    render_time = 0.0
+    images: dict[NodeId, Image.Image] = {}
+    start = time.perf_counter()
+    times: list[float] = frame_times(duration_s, fps)
+    try:
+        for i, frame_time in enumerate(times):
+            render_start = time.perf_counter()
+            # Seek every node even if an earlier one changed, so they all show this frame
+            changed: bool = any([node_manager.seek(node, frame_time) for node in animatable])
+            for node in nodes:
+                if changed or i == 0:
+                    svg, error = render_svg(node_manager, node, *sizes[node])
+                    if error is not None:
+                        num_errors += 1
+                        print(f"{stem}: node {node} failed at {frame_time:.0f} ms: {error}", file=sys.stderr)
+                    images[node] = image_rgba(svg, *sizes[node])
+                if not put_frame(frames, (node, images[node]), encoder):
+                    break
+            if not encoder.is_alive():
+                break
+            render_time += time.perf_counter() - render_start
+    finally:
+        put_frame(frames, None, encoder)
+        encoder.join()
+    if encode_errors:
+        raise encode_errors[0]
+    elapsed: float = time.perf_counter() - start
+
+    for node, node_writers in writers.items():
+        for writer in node_writers:
+            print(f"{writer.path} ({writer.num_frames} frames, {sizes[node][0]}x{sizes[node][1]})")
+    print(f"{stem}: {len(times)} frames in {elapsed:.2f}s ({len(times) / elapsed:.1f} fps), "
+          f"rendering {render_time:.2f}s, encoding {sum(encode_times):.2f}s")
+    return num_errors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pipelines", nargs="+", help="Pipeline files to export.")
+    parser.add_argument("-o", "--out-dir", default=".", help="Directory to write the animations to.")
+    parser.add_argument("--nodes", type=int, nargs="+", metavar="ID",
+                        help="IDs of the nodes to export (default: every canvas node).")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["gif"], dest="formats",
+                        help="Output formats (default: gif).")
+    parser.add_argument("--duration", type=float, default=5, help="Length of the animation in seconds (default: 5).")
+    parser.add_argument("--fps", type=float, default=25, help="Frames per second (default: 25).")
+    parser.add_argument("--scale", type=float, default=1, help="Multiplier applied to each node's size.")
+    args = parser.parse_args(argv)
+    if args.fps <= 0 or args.duration <= 0:
+        parser.error("--fps and --duration must be positive")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    num_errors = 0
+    for filepath in args.pipelines:
+        app_state: AppState = load_app_state(filepath)
+        node_manager: NodeManager = app_state.node_manager
+        if args.nodes is None:
+            nodes: list[NodeId] = canvas_nodes(node_manager)
+        else:
+            nodes = [NodeId(node_id) for node_id in args.nodes if NodeId(node_id) in node_manager.node_map]
+        if not nodes:
+            print(f"{filepath}: no nodes to export", file=sys.stderr)
+            continue
+        stem: str = os.path.splitext(os.path.basename(filepath))[0]
+        num_errors += export_animation(app_state, nodes, stem, args.out_dir, args.formats, args.duration, args.fps,
+                                       args.scale)
+    return 1 if num_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+from id_datatypes import NodeId
+from node_manager import NodeManager
+
+STATS_WINDOW_MS = 1000  # Frames over this window are used for the frame rate and frame time statistics
+STATS_INTERVAL_MS = 500  # Minimum time between stats updates
+MIN_IDLE_RATIO = 0.5  # After each frame, leave at least this fraction of its compute time for the event loop
+
+
+def now_ms() -> float:
+    return time.perf_counter() * 1e3
+
+
+@dataclass(frozen=True)
+class AnimationStats:
+    playing: int = 0  # Number of nodes playing
+    fps: float = 0.0  # Frames completed per second over the stats window
+    mean_frame_ms: float = 0.0
+    max_frame_ms: float = 0.0
+    dropped_frames: int = 0  # Animation steps skipped since playback started, as frames took too long to compute
+
+    def __str__(self):
+        if not self.playing:
+            return ""
+        return (f"Animation: {self.fps:.1f} fps | frame {self.mean_frame_ms:.1f} ms (max {self.max_frame_ms:.1f} ms)"
+                f" | {self.dropped_frames} dropped")
+
+
+class AnimationScheduler(QObject):
+    """
+    Steps playing animatable nodes when their next animation step is due, rather than polling them on a fixed timer.
+
+    The deadline of each playing node is kept in a priority queue and a single-shot timer is armed for the earliest one,
+    so nothing runs while no node is playing. Nodes that are due at the same time are stepped together and the scene
+    refreshes their downstream nodes in one pass. If a frame takes longer to compute than the gap to the next deadline,
+    the next frame is held back to leave time for the event loop, and the steps that fall in between are dropped.
+    """
+    stats_updated = pyqtSignal(object)
+
+    def __init__(self, scene):
+        super().__init__()
+        self.scene = scene
+        self._queue: list[tuple[float, int, NodeId]] = []  # Deadlines, with entries invalidated through _entries
+        self._entries: dict[NodeId, int] = {}  # Current queue entry of each scheduled node
+        self._last_advanced: dict[NodeId, float] = {}  # Time each scheduled node was last advanced
+        self._counter = itertools.count()
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._run_frame)
+        self._frames: deque[tuple[float, float]] = deque()  # End time and compute time of recent frames
+        self._frame_ms_estimate = 0.0
+        self._dropped_frames = 0
+        self._last_stats_ms = 0.0
+
+    @property
+    def node_manager(self) -> NodeManager:
+        # The scene replaces its node manager when a file is loaded
+        return self.scene.node_manager
+
+    def is_scheduled(self, node: NodeId) -> bool:
+        return node in self._entries
+
+    def _push(self, node: NodeId, deadline: float) -> None:
+        entry: int = next(self._counter)
+        self._entries[node] = entry
+        heapq.heappush(self._queue, (deadline, entry, node))
+
+    def schedule(self, node: NodeId) -> None:
+        # Start stepping a node that has just started playing
+        current_ms: float = now_ms()
+        self._last_advanced[node] = current_ms
+        self._push(node, current_ms + self.node_manager.time_to_next_step(node))
+        self._rearm()
+
+    def unschedule(self, node: NodeId) -> None:
+        # Its queue entry is skipped when popped
+        self._entries.pop(node, None)
+        self._last_advanced.pop(node, None)
+        if not self._entries:
+            self._stop()
+
+    def sync(self) -> None:
+        # Schedule exactly the nodes that are playing, after nodes have been played, paused, added or removed
+        playing: set[NodeId] = self.node_manager.playing_nodes()
+        for node in set(self._entries) - playing:
+            self.unschedule(node)
+        for node in playing - set(self._entries):
+            self.schedule(node)
+
+    def clear(self) -> None:
+        self._queue.clear()
+        self._entries.clear()
+        self._last_advanced.clear()
+        self._stop()
+
+    def _stop(self) -> None:
+        self._timer.stop()
+        self._queue.clear()
+        self._frames.clear()
+        self._frame_ms_estimate = 0.0
+        self._dropped_frames = 0
+        self.stats_updated.emit(AnimationStats())
+
+    def _next_deadline(self) -> float:
+        # Drop stale entries from the front of the queue
+        while self._queue and self._entries.get(self._queue[0][2]) != self._queue[0][1]:
+            heapq.heappop(self._queue)
+        return self._queue[0][0] if self._queue else float('inf')
+
+    def _rearm(self, earliest_ms: float = 0.0) -> None:
+        deadline: float = self._next_deadline()
+        if deadline == float('inf'):
+            self._timer.stop()
+            return
+        delay_ms: float = max(deadline, earliest_ms) - now_ms()
+        self._timer.start(max(0, round(delay_ms)))
+
+    def _run_frame(self) -> None:
+        start_ms: float = now_ms()
+        node_manager: NodeManager = self.node_manager
+        # Advance every node that is due
+        due: list[NodeId] = []
+        while self._next_deadline() <= start_ms:
+            _, _, node = heapq.heappop(self._queue)
+            del self._entries[node]
+            due.append(node)
+        stepped: set[NodeId] = set()
+        for node in due:
+            last_advanced: float = self._last_advanced.pop(node)
+            if node not in node_manager.node_map or not node_manager.is_playing(node):
+                continue
+            steps: int = node_manager.reanimate(node, start_ms - last_advanced)
+            if steps:
+                stepped.add(node)
+                self._dropped_frames += steps - 1
+            self._last_advanced[node] = start_ms
+            self._push(node, start_ms + node_manager.time_to_next_step(node))
+        # Refresh the downstream nodes of all the nodes that stepped together
+        if stepped:
+            self.scene.advance_animation(stepped)
+        end_ms: float = now_ms()
+        if stepped:
+            self._record_frame(end_ms, end_ms - start_ms)
+        if not self._entries:
+            self._stop()
+            return
+        self._rearm(end_ms + MIN_IDLE_RATIO * self._frame_ms_estimate)
+
+    def _record_frame(self, end_ms: float, frame_ms: float) -> None:
+        # Exponential moving average, used to hold back the next frame
+        self._frame_ms_estimate = frame_ms if not self._frames else 0.8 * self._frame_ms_estimate + 0.2 * frame_ms
+        self._frames.append((end_ms, frame_ms))
+        while self._frames[0][0] < end_ms - STATS_WINDOW_MS:
+            self._frames.popleft()
+        if end_ms - self._last_stats_ms >= STATS_INTERVAL_MS:
+            self._last_stats_ms = end_ms
+            self.stats_updated.emit(self.stats())
+
+    def stats(self) -> AnimationStats:
+        if not self._frames:
+            return AnimationStats(playing=len(self._entries), dropped_frames=self._dropped_frames)
+        frame_times: list[float] = [frame_ms for _, frame_ms in self._frames]
+        # Frames per second over the span between the first and last frames in the window
+        span_ms: float = self._frames[-1][0] - self._frames[0][0]
+        fps: float = (len(self._frames) - 1) * 1e3 / span_ms if span_ms > 0 else 0.0
+        return AnimationStats(playing=len(self._entries),
+                              fps=fps,
+                              mean_frame_ms=sum(frame_times) / len(frame_times),
+                              max_frame_ms=max(frame_times),
+                              dropped_frames=self._dropped_frames)
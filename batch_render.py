@@ -0,0 +1,167 @@
+"""
+Render pipelines to SVG/PNG without opening the Pipeline Editor.
+
+Every canvas node of each pipeline is rendered unless node IDs are given. Randomisable pipelines can be rendered for
+several seeds, with each seed deterministically reseeding every randomisable node. By default all files and seeds are
+rendered in one process, so modules are only imported once. With --jobs N, the upstream cone of each rendered node is
+extracted and the renders are spread over N worker processes instead.
+
+Example:
+    python3 batch_render.py examples/blaze.pipeline examples/arrest1.pipeline -o renders --format svg png --seeds 1 2 3
+    python3 batch_render.py examples/*.pipeline -o renders --num-seeds 16 --jobs 8
+"""
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app_state import AppState, NodeState
+from id_datatypes import NodeId
+from node_manager import NodeManager
+from pipeline_format import load_app_state
+from parallel_render import RenderJob, render_parallel, render_svg
+
+FORMATS = ["svg", "png"]
+
+
+def canvas_nodes(node_manager: NodeManager) -> list[NodeId]:
+    return sorted((node for node in node_manager.node_map if node_manager.node_info(node).is_canvas),
+                  key=lambda node: node.value)
+
+
+def render_size(app_state: AppState, node: NodeId, scale: float = 1) -> tuple[int, int]:
+    # Canvases are rendered at their set size, other nodes at the size they are displayed in the editor
+    if app_state.node_manager.node_info(node).is_canvas:
+        width = app_state.node_manager.get_internal_property(node, 'width')
+        height = app_state.node_manager.get_internal_property(node, 'height')
+    else:
+        node_state: NodeState = next(state for state in app_state.node_states if state.node == node)
+        width, height = node_state.svg_size
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+@dataclass(frozen=True)
+class RenderTask:
+    name: str
+    node: NodeId
+    seed: Optional[int]
+    width: int
+    height: int
+
+
+def plan_file(filepath: str, node_ids: Optional[list[int]], seeds: list,
+              scale: float) -> tuple[NodeManager, list[RenderTask]]:
+    app_state: AppState = load_app_state(filepath)
+    node_manager: NodeManager = app_state.node_manager
+    stem: str = os.path.splitext(os.path.basename(filepath))[0]
+    if node_ids is None:
+        nodes: list[NodeId] = canvas_nodes(node_manager)
+    else:
+        nodes = [NodeId(node_id) for node_id in node_ids if NodeId(node_id) in node_manager.node_map]
+    if not nodes:
+        print(f"{filepath}: no nodes to render", file=sys.stderr)
+    tasks: list[RenderTask] = []
+    for seed in seeds:
+        for node in nodes:
+            name: str = f"{stem}_node{node.value}" + (f"_seed{seed}" if seed is not None else "")
+            tasks.append(RenderTask(name, node, seed, *render_size(app_state, node, scale)))
+    return node_manager, tasks
+
+
+def write_render(svg: bytes, base_path: str, width: int, height: int, formats: list[str]) -> list[str]:
+    written: list[str] = []
+    if "svg" in formats:
+        with open(base_path + ".svg", "wb") as f:
+            f.write(svg)
+        written.append(base_path + ".svg")
+    if "png" in formats:
+        from svg_raster import rasterise_svg
+        rasterise_svg(svg, width, height).save(base_path + ".png")
+        written.append(base_path + ".png")
+    return written
+
+
+def report(filepath: str, task: RenderTask, written: list[str], error: Optional[str], elapsed: float) -> None:
+    if error is not None:
+        print(f"{filepath}: node {task.node} failed: {error}", file=sys.stderr)
+    print(f"{', '.join(written)} ({task.width}x{task.height}, {elapsed:.2f}s)")
+
+
+def render_files(filepaths: list[str], out_dir: str, node_ids: Optional[list[int]], seeds: list, formats: list[str],
+                 scale: float) -> int:
+    # Returns the number of renders that produced an error visualisation
+    num_errors = 0
+    for filepath in filepaths:
+        node_manager, tasks = plan_file(filepath, node_ids, seeds, scale)
+        for task in tasks:
+            start = time.perf_counter()
+            if task.seed is not None:
+                node_manager.reseed(task.seed)
+            svg, error = render_svg(node_manager, task.node, task.width, task.height)
+            written = write_render(svg, os.path.join(out_dir, task.name), task.width, task.height, formats)
+            num_errors += error is not None
+            report(filepath, task, written, error, time.perf_counter() - start)
+    return num_errors
+
+
+def render_files_parallel(filepaths: list[str], out_dir: str, node_ids: Optional[list[int]], seeds: list,
+                          formats: list[str], scale: float, jobs: int) -> int:
+    # Each rendered node only needs its upstream cone, so cones are shipped to the workers instead of whole pipelines
+    cones: dict[str, NodeManager] = {}
+    planned: dict[RenderJob, tuple[str, RenderTask]] = {}
+    for filepath in filepaths:
+        node_manager, tasks = plan_file(filepath, node_ids, seeds, scale)
+        for task in tasks:
+            cone_key: str = f"{filepath}#{task.node.value}"
+            if cone_key not in cones:
+                cones[cone_key] = node_manager.extract_cone(task.node)
+            planned[RenderJob(cone_key, task.node, task.seed, task.width, task.height)] = filepath, task
+    if not planned:
+        return 0
+
+    num_errors = 0
+    start = time.perf_counter()
+    for result in render_parallel(cones, list(planned), jobs):
+        filepath, task = planned[result.job]
+        written = write_render(result.svg, os.path.join(out_dir, task.name), task.width, task.height, formats)
+        num_errors += result.error is not None
+        report(filepath, task, written, result.error, time.perf_counter() - start)
+    return num_errors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pipelines", nargs="+", help="Pipeline files to render.")
+    parser.add_argument("-o", "--out-dir", default=".", help="Directory to write renders to.")
+    parser.add_argument("--nodes", type=int, nargs="+", metavar="ID",
+                        help="IDs of the nodes to render (default: every canvas node).")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["svg"], dest="formats",
+                        help="Output formats (default: svg).")
+    parser.add_argument("--scale", type=float, default=1, help="Multiplier applied to each node's size.")
+    seed_group = parser.add_mutually_exclusive_group()
+    seed_group.add_argument("--seeds", type=int, nargs="+", help="Pipeline seeds to render.")
+    seed_group.add_argument("--num-seeds", type=int, help="Render seeds 0 to N-1.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of worker processes to render with (default: 1, render in this process).")
+    args = parser.parse_args(argv)
+
+    if args.seeds is not None:
+        seeds: list = args.seeds
+    elif args.num_seeds is not None:
+        seeds = list(range(args.num_seeds))
+    else:
+        seeds = [None]  # Render with the seeds saved in the pipeline
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    if args.jobs > 1:
+        num_errors = render_files_parallel(args.pipelines, args.out_dir, args.nodes, seeds, args.formats, args.scale,
+                                           args.jobs)
+    else:
+        num_errors = render_files(args.pipelines, args.out_dir, args.nodes, seeds, args.formats, args.scale)
+    return 1 if num_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
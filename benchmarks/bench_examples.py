@@ -0,0 +1,186 @@
+"""
+Reference benchmark over the example pipelines, reported as JSON.
+
+Run from the repository root with `python -m benchmarks.bench_examples [pipeline ...] [-o results.json]` (defaults to
+every file in examples/). For each pipeline it reports:
+    load_s            time to load the file
+    eval_s            time to evaluate every node once, in topological order
+    eval_by_class     per node class: number of nodes, total compute time and number of errors
+    serialise         per canvas node: SVG size in bytes, serialisation time, number of shapes and groups
+    peak_mem_bytes    peak Python heap allocation while loading, evaluating and serialising (tracemalloc)
+    compute_cache     compute cache statistics after evaluating (see compute_cache), which is emptied before each pass
+With --animate N, every animatable node is played and N ticks of --tick-ms are replayed through
+NodeManager.reanimate. As in the editor, every node downstream of the nodes that stepped is then re-evaluated and its
+visualisation serialised at its displayed size.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Optional
+
+from app_state import AppState
+from batch_render import canvas_nodes
+from compute_cache import COMPUTE_CACHE
+from id_datatypes import NodeId
+from node_manager import NodeManager
+from nodes.shape_datatypes import Element, Group
+from pipeline_format import load_app_state
+
+
+def count_elements(element: Element) -> tuple[int, int]:
+    # Returns the number of shapes and groups in the element
+    if not isinstance(element, Group):
+        return 1, 0
+    num_shapes, num_groups = 0, 1
+    for child in element.elements:
+        child_shapes, child_groups = count_elements(child)
+        num_shapes += child_shapes
+        num_groups += child_groups
+    return num_shapes, num_groups
+
+
+def canvas_size(node_manager: NodeManager, node: NodeId) -> tuple[int, int]:
+    return node_manager.get_internal_property(node, 'width'), node_manager.get_internal_property(node, 'height')
+
+
+def evaluate_all(node_manager: NodeManager) -> tuple[float, dict[str, dict]]:
+    by_class: dict[str, dict] = defaultdict(lambda: {"nodes": 0, "compute_s": 0.0, "errors": 0})
+    start = time.perf_counter()
+    for node in node_manager.node_graph.get_topo_order_subgraph():
+        stats = by_class[type(node_manager.node_map[node].node).__name__]
+        node_start = time.perf_counter()
+        node_manager.evaluate(node)
+        stats["compute_s"] += time.perf_counter() - node_start
+        stats["nodes"] += 1
+        stats["errors"] += node_manager.compute_error(node) is not None
+    return time.perf_counter() - start, dict(sorted(by_class.items()))
+
+
+def serialise_canvases(node_manager: NodeManager) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    for node in canvas_nodes(node_manager):
+        vis = node_manager.visualise(node)
+        width, height = canvas_size(node_manager, node)
+        start = time.perf_counter()
+        svg: bytes = vis.svg_bytes(width, height)
+        elapsed = time.perf_counter() - start
+        num_shapes, num_groups = count_elements(vis) if isinstance(vis, Element) else (0, 0)
+        results[str(node)] = {"svg_bytes": len(svg), "serialise_s": elapsed, "shapes": num_shapes,
+                              "groups": num_groups}
+    return results
+
+
+def replay_animation(app_state: AppState, ticks: int, tick_ms: float) -> Optional[dict]:
+    node_manager: NodeManager = app_state.node_manager
+    svg_sizes: dict[NodeId, tuple[float, float]] = {state.node: state.svg_size for state in app_state.node_states}
+    animatable: list[NodeId] = [node for node in node_manager.node_map if node_manager.node_info(node).animatable]
+    if not animatable:
+        return None
+    for node in animatable:
+        if not node_manager.is_playing(node):
+            node_manager.toggle_play(node)
+    tick_times: list[float] = []
+    frame_times: list[float] = []  # Times of the ticks in which some node stepped
+    for _ in range(ticks):
+        start = time.perf_counter()
+        stepped: set[NodeId] = {node for node in node_manager.playing_nodes() if
+                                node_manager.reanimate(node, tick_ms)}
+        if stepped:
+            affected: set[NodeId] = set().union(*(node_manager.node_graph.downstream_nodes(n) for n in stepped))
+            for node in node_manager.node_graph.get_topo_order_subgraph(affected):
+                node_manager.visualise(node).svg_bytes(*svg_sizes[node])
+        tick_times.append(time.perf_counter() - start)
+        if stepped:
+            frame_times.append(tick_times[-1])
+    frame_times.sort()
+    return {
+        "ticks": ticks,
+        "tick_ms": tick_ms,
+        "frames": len(frame_times),
+        "total_s": sum(tick_times),
+        "mean_tick_s": statistics.fmean(tick_times),
+        "mean_frame_s": statistics.fmean(frame_times) if frame_times else 0.0,
+        "p95_frame_s": frame_times[int(0.95 * (len(frame_times) - 1))] if frame_times else 0.0
+    }
+
+
+def bench_pipeline(filepath: str, animate: int, tick_ms: float, memory: bool) -> dict:
+    COMPUTE_CACHE.clear()
+    start = time.perf_counter()
+    app_state = load_app_state(filepath)
+    load_s = time.perf_counter() - start
+    node_manager: NodeManager = app_state.node_manager
+    eval_s, eval_by_class = evaluate_all(node_manager)
+    result = {
+        "file": os.path.basename(filepath),
+        "nodes": len(node_manager.node_map),
+        "load_s": load_s,
+        "eval_s": eval_s,
+        "eval_by_class": eval_by_class,
+        "compute_cache": COMPUTE_CACHE.stats(),
+        "serialise": serialise_canvases(node_manager)
+    }
+    if memory:
+        # Separate pass, as tracing allocations slows everything down
+        COMPUTE_CACHE.clear()
+        tracemalloc.start()
+        app_state = load_app_state(filepath)
+        evaluate_all(app_state.node_manager)
+        serialise_canvases(app_state.node_manager)
+        result["peak_mem_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    if animate:
+        result["animation"] = replay_animation(app_state, animate, tick_ms)
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pipelines", nargs="*", help="Pipeline files (default: examples/*.pipeline).")
+    parser.add_argument("-o", "--output", help="File to write the JSON results to (default: stdout).")
+    parser.add_argument("--animate", type=int, default=0, metavar="N", help="Replay N animation ticks.")
+    parser.add_argument("--tick-ms", type=float, default=10, help="Time passed per animation tick (default: 10).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory pass.")
+    parser.add_argument("--no-compute-cache", action="store_true", help="Disable the compute cache.")
+    args = parser.parse_args()
+    if args.no_compute_cache:
+        COMPUTE_CACHE.max_bytes = 0
+
+    pipelines: list[str] = args.pipelines or sorted(glob.glob("examples/*.pipeline"))
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pipelines": []
+    }
+    for filepath in pipelines:
+        print(f"Benchmarking {filepath}", file=sys.stderr)
+        results["pipelines"].append(bench_pipeline(filepath, args.animate, args.tick_ms, not args.no_memory))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
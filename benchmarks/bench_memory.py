@@ -0,0 +1,134 @@
+"""
+Benchmark of the memory held by the compute results of a pipeline, per element and per datatype.
+
+Run from the repository root with `python -m benchmarks.bench_memory [pipeline ...]` (defaults to
+examples/cataract3.pipeline). Each pipeline is loaded and every node evaluated, with the compute cache disabled. It
+reports the evaluation time, the memory held by the results of all the nodes (measured with tracemalloc while loading a
+pickled copy of them), the number of elements (shapes and groups) in the results and the memory held per element.
+Then, for the datatypes the results are made of, it reports the number of distinct instances and the size of each
+instance (the object and its __dict__, if it has one), largest total first.
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from compute_cache import COMPUTE_CACHE
+from node_manager import NodeManager
+from nodes.shape_datatypes import Element
+from pipeline_format import load_app_state
+
+_LEAVES = (str, bytes, int, float, bool, type(None), type, np.ndarray)
+
+
+def _children(obj) -> list:
+    if isinstance(obj, dict):
+        return [*obj.keys(), *obj.values()]
+    if type(obj) in (list, tuple, set, frozenset):
+        return list(obj)
+    children: list = list(obj) if isinstance(obj, tuple) else []
+    state = getattr(obj, '__dict__', None)
+    if state is not None:
+        children.extend(state.values())
+    for cls in type(obj).__mro__:
+        for slot in cls.__dict__.get('__slots__', ()):
+            if slot not in ('__dict__', '__weakref__') and hasattr(obj, slot):
+                children.append(getattr(obj, slot))
+    return children
+
+
+def own_size(obj) -> int:
+    # Size of the object itself and of its attribute dict
+    state = getattr(obj, '__dict__', None) if not isinstance(obj, type) else None
+    return sys.getsizeof(obj) + (sys.getsizeof(state) if state is not None else 0)
+
+
+def datatype_sizes(roots: list) -> dict[str, tuple[int, int]]:
+    # Number of distinct instances and total own size of each non-builtin class reachable from roots
+    seen: set[int] = set()
+    stack: list = list(roots)
+    sizes: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or type(obj) in _LEAVES:
+            continue
+        seen.add(id(obj))
+        cls = type(obj)
+        if cls.__module__ != 'builtins':
+            entry = sizes[cls.__name__]
+            entry[0] += 1
+            entry[1] += own_size(obj)
+        if not isinstance(obj, np.ndarray):
+            stack.extend(_children(obj))
+    return {name: (count, total) for name, (count, total) in sizes.items()}
+
+
+def count_elements(roots: list) -> int:
+    # Number of distinct elements reachable from roots
+    seen: set[int] = set()
+    stack: list = list(roots)
+    count = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or type(obj) in _LEAVES:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, Element):
+            count += 1
+        stack.extend(_children(obj))
+    return count
+
+
+def results_memory(results: list) -> int:
+    # Bytes held by a copy of the results, as loaded from a pickle of them
+    payload: bytes = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    results_copy: list = pickle.loads(payload)
+    held: int = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del results_copy
+    return held
+
+
+def bench_pipeline(filepath: str) -> dict:
+    node_manager: NodeManager = load_app_state(filepath).node_manager
+    start = time.perf_counter()
+    for node in node_manager.node_graph.get_topo_order_subgraph():
+        node_manager.evaluate(node)
+    eval_s: float = time.perf_counter() - start
+    results: list = [runtime_node.compute_results for runtime_node in node_manager.node_map.values()]
+    return {
+        "eval_s": eval_s,
+        "held_bytes": results_memory(results),
+        "elements": count_elements(results),
+        "datatypes": datatype_sizes(results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pipelines", nargs="*", default=["examples/cataract3.pipeline"], help="Pipeline files.")
+    parser.add_argument("--top", type=int, default=12, help="Number of datatypes to report.")
+    args = parser.parse_args()
+    COMPUTE_CACHE.max_bytes = 0
+
+    for filepath in args.pipelines:
+        result = bench_pipeline(filepath)
+        elements: int = result["elements"]
+        print(f"{os.path.basename(filepath)}: evaluated in {result['eval_s']:.2f}s, results hold "
+              f"{result['held_bytes'] / 2 ** 20:.2f} MiB for {elements} elements, "
+              f"{result['held_bytes'] / max(elements, 1):.0f} bytes per element")
+        print(f"  {'datatype':<20}{'instances':>10}{'bytes each':>12}{'total KiB':>11}")
+        datatypes = sorted(result["datatypes"].items(), key=lambda item: -item[1][1])[:args.top]
+        for name, (count, total) in datatypes:
+            print(f"  {name:<20}{count:>10}{total / count:>12.0f}{total / 1024:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
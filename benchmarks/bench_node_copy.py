@@ -0,0 +1,76 @@
+"""
+Benchmark of copying nodes with copy.deepcopy versus Node.snapshot, over the example pipelines.
+
+Run from the repository root with `python -m benchmarks.bench_node_copy [pipeline ...]` (defaults to every file in
+examples/). Each pipeline is loaded and evaluated, then every node is copied both ways, as the iterator, random
+iterator, random animator and custom nodes copy their input nodes on every compute. For each pipeline it reports the
+time to copy all the nodes once and the memory the copies hold (tracemalloc), and the node classes costing the most
+to deepcopy.
+"""
+import argparse
+import copy
+import glob
+import os
+import timeit
+import tracemalloc
+from collections import defaultdict
+from typing import Callable
+
+from node_manager import NodeManager
+from nodes.node_defs import Node
+from pipeline_format import load_app_state
+
+
+def time_per_copy(copy_fn: Callable[[Node], Node], nodes: list[Node], repeat: int) -> float:
+    # Returns the best time to copy every node once, in milliseconds
+    return min(timeit.repeat(lambda: [copy_fn(node) for node in nodes], number=1, repeat=repeat)) * 1e3
+
+
+def copy_memory(copy_fn: Callable[[Node], Node], nodes: list[Node]) -> int:
+    # Returns the bytes allocated by copies of every node that are still alive
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    copies: list[Node] = [copy_fn(node) for node in nodes]
+    held: int = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del copies
+    return held
+
+
+def bench_pipeline(filepath: str, repeat: int) -> dict:
+    node_manager: NodeManager = load_app_state(filepath).node_manager
+    for node in node_manager.node_graph.get_topo_order_subgraph():
+        node_manager.evaluate(node)
+    nodes: list[Node] = [runtime_node.node for runtime_node in node_manager.node_map.values()]
+    by_class: dict[str, float] = defaultdict(float)
+    for node in nodes:
+        by_class[type(node).__name__] += time_per_copy(copy.deepcopy, [node], repeat)
+    return {
+        "nodes": len(nodes),
+        "deepcopy_ms": time_per_copy(copy.deepcopy, nodes, repeat),
+        "snapshot_ms": time_per_copy(Node.snapshot, nodes, repeat),
+        "deepcopy_bytes": copy_memory(copy.deepcopy, nodes),
+        "snapshot_bytes": copy_memory(Node.snapshot, nodes),
+        "slowest": sorted(by_class.items(), key=lambda item: -item[1])[:3]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pipelines", nargs="*", help="Pipeline files (default: examples/*.pipeline).")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed repeats, the best is kept.")
+    args = parser.parse_args()
+
+    pipelines: list[str] = args.pipelines or sorted(glob.glob("examples/*.pipeline"))
+    print(f"{'pipeline':<24}{'nodes':>6}{'deepcopy ms':>13}{'snapshot ms':>13}{'deepcopy KiB':>14}"
+          f"{'snapshot KiB':>14}  slowest to deepcopy (ms)")
+    for filepath in pipelines:
+        result = bench_pipeline(filepath, args.repeat)
+        slowest: str = ", ".join(f"{name} {ms:.2f}" for name, ms in result["slowest"])
+        print(f"{os.path.splitext(os.path.basename(filepath))[0]:<24}{result['nodes']:>6}"
+              f"{result['deepcopy_ms']:>13.2f}{result['snapshot_ms']:>13.2f}"
+              f"{result['deepcopy_bytes'] / 1024:>14.1f}{result['snapshot_bytes'] / 1024:>14.1f}  {slowest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of NodeGraph edge queries as the number of edges grows.
+
+Run from the repository root with `python -m benchmarks.bench_node_graph`. Each query should take roughly the same
+time regardless of the total edge count, since it only touches the edges around a single node or port.
+"""
+import argparse
+import itertools
+import random
+import timeit
+
+from id_datatypes import NodeId, EdgeId, input_port, output_port
+from node_graph import NodeGraph
+
+EDGE_COUNTS = [100, 1_000, 10_000, 100_000]
+EDGES_PER_NODE = 4
+
+
+def build_graph(num_edges: int, rng: random.Random) -> tuple[NodeGraph, list[EdgeId]]:
+    graph = NodeGraph()
+    num_nodes: int = max(2, num_edges // EDGES_PER_NODE)
+    for i in range(num_nodes):
+        graph.add_node(NodeId(i))
+    edges: list[EdgeId] = []
+    for i in range(num_edges):
+        # Edges always point from a lower to a higher node ID, keeping the graph acyclic
+        src, dst = sorted(rng.sample(range(num_nodes), 2))
+        edge = EdgeId(output_port(NodeId(src), '_main'), input_port(NodeId(dst), f'prop_{i % EDGES_PER_NODE}'))
+        graph.add_edge(edge)
+        graph.get_ref(edge.dst_node, edge.src_port)
+        edges.append(edge)
+    return graph, edges
+
+
+def time_per_call(fn, number: int) -> float:
+    # Returns the best-of-three time for a single call in microseconds
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def bench(num_edges: int, number: int, seed: int) -> dict[str, float]:
+    rng = random.Random(seed)
+    graph, edges = build_graph(num_edges, rng)
+    samples = itertools.cycle(rng.choices(edges, k=number))
+    refs = itertools.cycle([(edge.dst_node, graph.get_ref(edge.dst_node, edge.src_port)) for edge in
+                            rng.choices(edges, k=number)])
+
+    def remove_and_add():
+        edge = next(samples)
+        graph.remove_edge(edge)
+        graph.add_edge(edge)
+        graph.get_ref(edge.dst_node, edge.src_port)
+
+    return {
+        "incoming_edges(port)": time_per_call(lambda: graph.incoming_edges(next(samples).dst_port), number),
+        "incoming_edges(node)": time_per_call(lambda: graph.incoming_edges(next(samples).dst_node), number),
+        "outgoing_edges(port)": time_per_call(lambda: graph.outgoing_edges(next(samples).src_port), number),
+        "outgoing_edges(node)": time_per_call(lambda: graph.outgoing_edges(next(samples).src_node), number),
+        "query_ref": time_per_call(lambda: graph.query_ref(*next(refs)), number),
+        "remove_edge+add_edge": time_per_call(remove_and_add, number),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="Number of queries timed per measurement.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed used to build the graphs.")
+    args = parser.parse_args()
+
+    rows = {num_edges: bench(num_edges, args.number, args.seed) for num_edges in EDGE_COUNTS}
+    names = list(next(iter(rows.values())).keys())
+    print(f"{'query (µs/call)':<24}" + "".join(f"{n:>12,}" for n in EDGE_COUNTS))
+    for name in names:
+        print(f"{name:<24}" + "".join(f"{rows[n][name]:>12.2f}" for n in EDGE_COUNTS))
+
+
+if __name__ == "__main__":
+    main()
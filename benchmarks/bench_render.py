@@ -0,0 +1,88 @@
+"""
+Benchmark of SVG serialisation and QtSvg render time with nested groups versus flattened transforms, each with and
+without repeated elements instanced through <use>.
+
+Run from the repository root with `python -m benchmarks.bench_render [pipeline ...]` (defaults to
+examples/cataract3.pipeline). Every canvas node is rendered with each group's transform written on a nested <g>, and
+with the transforms flattened into one matrix per shape, each once with every repeated element written in full and once
+with it written to the definitions and drawn with <use>. The largest per-pixel difference between each rasterised image
+and the nested one is reported to check that flattening and instancing don't change the picture.
+"""
+import argparse
+import os
+import timeit
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5.QtGui import QImage
+
+from pipeline_format import load_app_state
+from batch_render import canvas_nodes
+from nodes.shape_datatypes import Element
+from svg_raster import rasterise_svg
+
+
+def best_time(fn, repeat: int) -> float:
+    # Returns the best time for a single call in milliseconds
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1e3
+
+
+def image_array(image: QImage) -> np.ndarray:
+    image = image.convertToFormat(QImage.Format_ARGB32)
+    ptr = image.constBits()
+    ptr.setsize(image.byteCount())
+    return np.frombuffer(ptr, np.uint8).reshape(image.height(), image.width(), 4).astype(int)
+
+
+def group_depth(element: Element) -> int:
+    if not hasattr(element, 'elements'):
+        return 0
+    return 1 + max((group_depth(child) for child in element.elements), default=0)
+
+
+def bench(element: Element, width: int, height: int, repeat: int) -> dict[str, tuple]:
+    results = {}
+    for mode, flatten, instance in [("nested", False, False), ("flattened", True, False),
+                                    ("nested+use", False, True), ("flat+use", True, True)]:
+        svg: bytes = element.svg_bytes(width, height, flatten_transforms=flatten, instance_repeats=instance)
+        results[mode] = (
+            best_time(lambda: element.svg_bytes(width, height, flatten_transforms=flatten, instance_repeats=instance),
+                      repeat),
+            best_time(lambda: rasterise_svg(svg, width, height), repeat),
+            svg.count(b"<g"),
+            svg.count(b"<use"),
+            len(svg),
+            image_array(rasterise_svg(svg, width, height))
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pipelines", nargs="*", default=["examples/cataract3.pipeline"], help="Pipeline files.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs (best is reported).")
+    parser.add_argument("--scale", type=float, default=4, help="Multiplier applied to each canvas size.")
+    args = parser.parse_args()
+
+    print(f"{'pipeline / node':<32}{'mode':<12}{'write ms':>10}{'render ms':>11}{'<g>':>8}{'<use>':>8}{'KB':>8}")
+    for filepath in args.pipelines:
+        node_manager = load_app_state(filepath).node_manager
+        for node in canvas_nodes(node_manager):
+            element = node_manager.visualise(node)
+            if not isinstance(element, Element):
+                continue
+            width = round(node_manager.get_internal_property(node, 'width') * args.scale)
+            height = round(node_manager.get_internal_property(node, 'height') * args.scale)
+            results = bench(element, width, height, args.repeat)
+            label = f"{os.path.basename(filepath)} {node}"
+            for mode, (write_ms, render_ms, num_groups, num_uses, size, _) in results.items():
+                print(f"{label:<32}{mode:<12}{write_ms:>10.1f}{render_ms:>11.1f}{num_groups:>8}{num_uses:>8}"
+                      f"{size / 1024:>8.0f}")
+                label = ""
+            max_diff = max(np.abs(results["nested"][5] - result[5]).max() for result in results.values())
+            print(f"{'':<32}group depth {group_depth(element)}, max pixel difference {max_diff}")
+
+
+if __name__ == "__main__":
+    main()
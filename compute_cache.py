@@ -0,0 +1,387 @@
+"""
+Compute results shared between every node whose compute is identical, wherever and whenever it happens.
+
+Results are keyed by the node's class, any state of the node they depend on besides its properties (see
+Node.cache_state) and a digest of its resolved properties. Properties are digested by content, except for the results
+of input nodes (and the items of input lists), which are replaced by the digest of the results they came from. Those
+digests are derived from the key of the compute that produced them, so identical computes anywhere upstream give
+identical keys without hashing any drawings. Nodes computing copies of their input node (the iterators and the random
+animator) use the digest of its results to identify how it computes too. Results of computes that can't be cached are
+given a digest unique to that compute, unless the node can derive one (see Node.derived_digest).
+
+The cache keeps the most recently used results within a byte budget, estimated from the size of the result objects.
+Results quicker to compute than MIN_COMPUTE_S aren't kept. Digesting takes as long as many computes, so a compute is
+only digested to look it up if its node class usually takes at least MIN_COMPUTE_S, and otherwise only if it turns out
+slow enough to keep or once another key needs its digest (see LazyDigest). Results must not be mutated once
+computed, as they may be returned to other nodes.
+"""
+import enum
+import hashlib
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+
+import numpy as np
+import sympy as sp
+
+from id_datatypes import PropKey
+from nodes.prop_types import PropType
+from nodes.prop_values import PropValue, List, PointArray, PortRefTableEntry, slot_names
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+MIN_COMPUTE_S = 1e-3  # Compute time below which results aren't cached
+COMPUTE_S_WEIGHT = 0.25  # Weight of the latest compute time in the moving average of a node class's compute time
+SIZE_SAMPLE = 8  # Number of items of a long sequence whose size is measured when estimating the size of results
+
+type CacheKey = tuple[type, bytes]
+type DigestSource = bytes | LazyDigest
+
+_PRIMITIVES: frozenset[type] = frozenset({str, int, float, bool, type(None)})
+
+
+class Uncacheable(Exception):
+    pass
+
+
+def new_digest() -> bytes:
+    # Digest of results that can't be reproduced, so never match any other
+    return uuid.uuid4().bytes
+
+
+class LazyDigest:
+    """Digest of compute results made when it is first needed, as most are never part of another key."""
+    __slots__ = ('_make', '_digest', '_unique')
+
+    def __init__(self, make: Callable[[], Optional[bytes]]):
+        # make must only depend on what it captured when the results were computed, not on any later state
+        # It returns None if it can't make a digest, and the results are then given a unique one
+        self._make: Optional[Callable[[], Optional[bytes]]] = make
+        self._digest: Optional[bytes] = None
+        self._unique = False
+
+    def digest(self) -> bytes:
+        if self._digest is None:
+            digest: Optional[bytes] = self._make()
+            self._make = None
+            self._unique = digest is None
+            self._digest = new_digest() if digest is None else digest
+        return self._digest
+
+    def key(self) -> Optional[bytes]:
+        # Digest identifying how the results were computed, None if they were given a unique one
+        digest: bytes = self.digest()
+        return None if self._unique else digest
+
+    def __reduce__(self):
+        return bytes, (self.digest(),)
+
+
+def resolve_digest(source: DigestSource) -> bytes:
+    return source.digest() if isinstance(source, LazyDigest) else source
+
+
+def child_digest(digest: bytes, key: Hashable) -> bytes:
+    # Digest of results derived from those with the given digest
+    return hashlib.blake2b(digest + repr(key).encode(), digest_size=16).digest()
+
+
+def output_digest(digest: bytes, key: PropKey) -> str:
+    # Digest of one output of the results with the given digest
+    return f"{digest.hex()}:{key!r}"
+
+
+def known_digests(inputs: Iterable[tuple[PropValue, DigestSource, PropKey]]) -> dict[int, str]:
+    # Digests of input values by object ID, given each value with the digest of the results and the output it came from
+    known: dict[int, str] = {}
+    for value, source, key in inputs:
+        register_result(known, value, output_digest(resolve_digest(source), key))
+    return known
+
+
+def register_result(known: dict[int, str], value: PropValue, digest: str) -> None:
+    # Let value (an input node's output) be digested by where it came from, along with the items of a list
+    known[id(value)] = digest
+    if isinstance(value, List) and not isinstance(value, PointArray):
+        for i, item in enumerate(value.items):
+            register_result(known, item, f"{digest}/{i}")
+
+
+_SCALAR, _BYTES, _SEQUENCE, _DICT, _ARRAY, _SET, _TYPE, _ENUM, _SYMPY, _OBJECT, _STATELESS = range(11)
+_KINDS: dict[type, tuple[int, Optional[str]]] = {}
+
+
+def _kind(cls: type) -> tuple[int, Optional[str]]:
+    # How values of a class are digested, and for objects digested by their state, any attribute left out of it
+    kind: Optional[tuple[int, Optional[str]]] = _KINDS.get(cls)
+    if kind is None:
+        if issubclass(cls, (bool, int, float, str)):
+            kind = (_SCALAR, None)
+        elif issubclass(cls, bytes):
+            kind = (_BYTES, None)
+        elif issubclass(cls, (tuple, list)):
+            kind = (_SEQUENCE, None)
+        elif issubclass(cls, dict):
+            kind = (_DICT, None)
+        elif issubclass(cls, np.ndarray):
+            kind = (_ARRAY, None)
+        elif issubclass(cls, (set, frozenset)):
+            kind = (_SET, None)
+        elif issubclass(cls, type):
+            kind = (_TYPE, None)
+        elif issubclass(cls, enum.Enum):
+            kind = (_ENUM, None)
+        elif issubclass(cls, sp.Basic):
+            kind = (_SYMPY, None)
+        elif issubclass(cls, PortRefTableEntry):
+            # IDs don't affect the computed values
+            kind = (_OBJECT, 'ref')
+        elif issubclass(cls, (PropValue, PropType)):
+            kind = (_OBJECT, None)
+        else:
+            # Functions and other objects whose behaviour may not be captured by their state can't be digested
+            kind = (_STATELESS, None)
+        _KINDS[cls] = kind
+    return kind
+
+
+class _Digester:
+    # Canonical encoding of values fed to a hash, with text buffered so the hash is updated in a few large chunks
+
+    def __init__(self, known: dict[int, str]):
+        self.known = known
+        self.hash = hashlib.blake2b(digest_size=16)
+        self.parts: list[str] = []
+
+    def digest(self) -> bytes:
+        self._flush()
+        return self.hash.digest()
+
+    def _flush(self) -> None:
+        self.hash.update("".join(self.parts).encode())
+        self.parts.clear()
+
+    def feed(self, value) -> None:
+        cls = type(value)
+        if cls in _PRIMITIVES:
+            self.parts.append(f"{cls.__name__}:{value!r};")
+            return
+        digest: Optional[str] = self.known.get(id(value))
+        if digest is not None:
+            self.parts.append(f"K{digest};")
+            return
+        kind, excluded = _kind(cls)
+        if kind == _OBJECT or kind == _STATELESS:
+            state = value.__getstate__()
+            if state is None and kind == _STATELESS:
+                raise Uncacheable(cls.__qualname__)
+            self.parts.append(f"{cls.__module__}.{cls.__qualname__}")
+            if isinstance(state, dict):
+                self._feed_dict(state, excluded)
+            else:
+                self.feed(state)
+        elif kind == _SEQUENCE:
+            append = self.parts.append
+            append(f"{cls.__name__}:{len(value)}(")
+            for item in value:
+                if type(item) in _PRIMITIVES:
+                    append(f"{type(item).__name__}:{item!r};")
+                else:
+                    self.feed(item)
+            append(")")
+        elif kind == _DICT:
+            self._feed_dict(value)
+        elif kind == _SCALAR:
+            self.parts.append(f"{cls.__name__}:{value!r};")
+        elif kind == _BYTES:
+            self.parts.append(f"bytes:{value.hex()};")
+        elif kind == _ARRAY:
+            self.parts.append(f"ndarray:{value.dtype}:{value.shape};")
+            self._flush()
+            self.hash.update(np.ascontiguousarray(value).tobytes())
+        elif kind == _SET:
+            self.parts.append(f"set:{len(value)}(")
+            for item in sorted(value, key=repr):
+                self.feed(item)
+            self.parts.append(")")
+        elif kind == _TYPE:
+            self.parts.append(f"type:{value.__module__}.{value.__qualname__};")
+        elif kind == _ENUM:
+            self.parts.append(f"enum:{cls.__qualname__}.{value.name};")
+        else:
+            self.parts.append(f"sympy:{sp.srepr(value)};")
+
+    def _feed_dict(self, value: dict, excluded: Optional[str] = None) -> None:
+        try:
+            keys: list = sorted(value)
+        except TypeError:
+            keys = sorted(value, key=repr)
+        append = self.parts.append
+        append(f"dict:{len(value)}(")
+        for key in keys:
+            if key == excluded:
+                continue
+            item = value[key]
+            if type(key) not in _PRIMITIVES:
+                self.feed(key)
+            elif type(item) in _PRIMITIVES:
+                append(f"{key!r}:{type(item).__name__}:{item!r};")
+                continue
+            else:
+                append(f"{key!r}:")
+            self.feed(item)
+        append(")")
+
+
+def props_digest(node_class: type, state: Hashable, props: dict[PropKey, PropValue],
+                 known: dict[int, str]) -> Optional[bytes]:
+    # Digest of a node's class, cache state and resolved properties, or None if they can't be digested
+    digester = _Digester(known)
+    try:
+        digester.feed(node_class)
+        digester.feed(state)
+        digester.feed(props)
+    except Uncacheable:
+        return None
+    return digester.digest()
+
+
+def approx_bytes(value, seen: set[int]) -> int:
+    # Estimated memory held by value and everything it references that isn't in seen
+    # Long sequences are estimated from a sample of their items, so estimating large drawings stays cheap
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size: int = sys.getsizeof(value)
+    cls = type(value)
+    if cls in _PRIMITIVES:
+        return size
+    kind: int = _kind(cls)[0]
+    if kind == _SEQUENCE:
+        if len(value) > SIZE_SAMPLE:
+            sample = value[::len(value) // SIZE_SAMPLE][:SIZE_SAMPLE]
+            return size + sum(approx_bytes(item, seen) for item in sample) * len(value) // SIZE_SAMPLE
+        return size + sum(approx_bytes(item, seen) for item in value)
+    if kind == _DICT:
+        return size + sum(approx_bytes(item, seen) for item in value.values())
+    if kind == _ARRAY:
+        return size + (value.nbytes if value.base is None else 0)
+    state = getattr(value, '__dict__', None)
+    if state is not None:
+        size += approx_bytes(state, seen)
+    for name in slot_names(cls):
+        attribute = getattr(value, name, None)
+        if attribute is not None:
+            size += approx_bytes(attribute, seen)
+    return size
+
+
+class ComputeCache:
+    """Least recently used compute results, evicted once their estimated total size is over max_bytes."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._results: OrderedDict[CacheKey, tuple[dict[PropKey, PropValue], int]] = OrderedDict()
+        self._size = 0
+        self._compute_s: dict[type, float] = {}  # Moving average of the compute time of each node class
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def expected_s(self, node_class: type) -> float:
+        # Typical compute time of the node class, 0 if it hasn't been computed
+        return self._compute_s.get(node_class, 0.0)
+
+    def record_compute(self, node_class: type, seconds: float) -> None:
+        average: Optional[float] = self._compute_s.get(node_class)
+        self._compute_s[node_class] = seconds if average is None else average + (seconds - average) * COMPUTE_S_WEIGHT
+
+    def get(self, key: CacheKey) -> Optional[dict[PropKey, PropValue]]:
+        entry: Optional[tuple[dict[PropKey, PropValue], int]] = self._results.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._results.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: CacheKey, results: dict[PropKey, PropValue], shared: Iterable[int] = ()) -> None:
+        # Objects whose ids are in shared aren't counted in the size of the results
+        size: int = approx_bytes(results, set(shared))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._results[key] = (results, size)
+        self._size += size
+        self.shrink(self.max_bytes)
+
+    def shrink(self, max_bytes: int) -> None:
+        # Evict the least recently used results until they fit in max_bytes
+        while self._size > max_bytes:
+            self._remove(next(iter(self._results)))
+
+    def _remove(self, key: CacheKey) -> None:
+        entry: Optional[tuple[dict[PropKey, PropValue], int]] = self._results.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def clear(self) -> None:
+        self._results.clear()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int | float]:
+        lookups: int = self.hits + self.misses
+        return {"entries": len(self), "size_bytes": self._size, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# Shared by every node manager in the process, so identical computes in custom nodes, iterators and after undoing are
+# only done once. Set max_bytes to 0 to disable it.
+COMPUTE_CACHE = ComputeCache()
+
+
+def cached_compute(node, props, refs, ref_querier) -> tuple[dict[PropKey, PropValue], DigestSource]:
+    # Compute results of the node, and their digest, reusing the results of an identical compute if there is one
+    node.prepare_compute(props, refs, ref_querier)
+    state: Optional[Hashable] = node.cache_state(props, refs, ref_querier) if COMPUTE_CACHE.enabled else None
+    if state is None:
+        results = node.compute(props, refs, ref_querier)
+        return results, node.derived_digest() or new_digest()
+    # What the digest is made from is captured now, as the props dict may be reused for another compute
+    node_class: type = type(node)
+    inputs: list[tuple[PropValue, DigestSource, PropKey]] = ref_querier.input_sources()
+    props_now: dict[PropKey, PropValue] = dict(props)
+    known: dict[int, str] = {}
+
+    def make_digest() -> Optional[bytes]:
+        known.update(known_digests(inputs))
+        return props_digest(node_class, state, props_now, known)
+
+    digest = LazyDigest(make_digest)
+    results: Optional[dict[PropKey, PropValue]] = None
+    # Computes of node classes that are usually quick are done again rather than digested to look them up
+    if COMPUTE_CACHE.expected_s(node_class) >= MIN_COMPUTE_S and digest.key() is not None:
+        results = COMPUTE_CACHE.get((node_class, digest.key()))
+    if results is None:
+        start: float = time.perf_counter()
+        results = node.compute(props, refs, ref_querier)
+        compute_s: float = time.perf_counter() - start
+        COMPUTE_CACHE.record_compute(node_class, compute_s)
+        # Results quicker to compute again than to store aren't kept
+        if compute_s >= MIN_COMPUTE_S and digest.key() is not None:
+            # Inputs passed through to the results are held by the cache entries of the nodes they came from
+            COMPUTE_CACHE.put((node_class, digest.key()), results, shared=known)
+    return results, digest
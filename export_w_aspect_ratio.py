@@ -1,19 +1,15 @@
-import shutil
-
-from PyQt5.QtGui import QImage, QPainter
-from PyQt5.QtSvg import QSvgRenderer
 from PyQt5.QtWidgets import (
     QDialog, QLabel, QComboBox, QPushButton, QVBoxLayout,
     QFileDialog, QMessageBox, QSpinBox
 )
 
 from nodes.shape_datatypes import Element
+from svg_raster import rasterise_svg
 
 
 class ExportWithAspectRatio(QDialog):
-    def __init__(self, filepath, element: Element, default_width, default_height, parent=None):
+    def __init__(self, element: Element, default_width, default_height, parent=None):
         super().__init__(parent)
-        self.svg_path = filepath
         self.element = element
         self.default_width = default_width
         self.aspect_ratio = default_width / default_height
@@ -73,17 +69,9 @@ class ExportWithAspectRatio(QDialog):
             QMessageBox.warning(self, "Invalid Input", "Please enter a valid width.")
             return
 
-        self.element.save_to_svg(self.svg_path, width, height)
         if path.endswith(".svg"):
-            # Just copy the existing SVG file as-is
-            shutil.copyfile(self.svg_path, path)
+            self.element.save_to_svg(path, width, height)
         elif path.endswith(".png"):
             # Render SVG to PNG with requested dimensions
-            svg_renderer = QSvgRenderer(self.svg_path)
-            image = QImage(width, height, QImage.Format_ARGB32)
-            image.fill(0x00000000)  # transparent background
-            painter = QPainter(image)
-            svg_renderer.render(painter)
-            painter.end()
-            image.save(path)
+            rasterise_svg(self.element.svg_bytes(width, height), width, height).save(path)
         self.accept()
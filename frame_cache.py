@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from PyQt5.QtGui import QPixmap
+
+from id_datatypes import NodeId
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def pixmap_bytes(pixmap: QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class FrameCache:
+    """
+    Rendered animation frames of the nodes in the editor, so looping animations replay without recomputing.
+
+    Frames are keyed by node and a frame key naming the animation state of every animatable node upstream of it (plus
+    anything else affecting the image, such as its size). Once the total size of the pixmaps is over max_bytes, the
+    least recently shown frames are evicted. A node's frames must be invalidated whenever anything upstream of it is
+    edited.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._frames: OrderedDict[tuple[NodeId, Hashable], QPixmap] = OrderedDict()
+        self._node_keys: dict[NodeId, set[Hashable]] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get(self, node: NodeId, frame_key: Hashable) -> Optional[QPixmap]:
+        pixmap: Optional[QPixmap] = self._frames.get((node, frame_key))
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._frames.move_to_end((node, frame_key))
+        return pixmap
+
+    def put(self, node: NodeId, frame_key: Hashable, pixmap: QPixmap) -> None:
+        size: int = pixmap_bytes(pixmap)
+        if size > self.max_bytes:
+            return
+        self._remove((node, frame_key))
+        self._frames[(node, frame_key)] = pixmap
+        self._node_keys.setdefault(node, set()).add(frame_key)
+        self._size += size
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._frames)))
+
+    def _remove(self, key: tuple[NodeId, Hashable]) -> None:
+        pixmap: Optional[QPixmap] = self._frames.pop(key, None)
+        if pixmap is None:
+            return
+        self._size -= pixmap_bytes(pixmap)
+        node, frame_key = key
+        node_keys: set[Hashable] = self._node_keys[node]
+        node_keys.discard(frame_key)
+        if not node_keys:
+            del self._node_keys[node]
+
+    def invalidate(self, nodes: set[NodeId]) -> None:
+        for node in nodes:
+            for frame_key in list(self._node_keys.get(node, ())):
+                self._remove((node, frame_key))
+
+    def clear(self) -> None:
+        self._frames.clear()
+        self._node_keys.clear()
+        self._size = 0
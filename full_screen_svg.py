@@ -1,14 +1,14 @@
 from PyQt5.QtCore import Qt
-from PyQt5.QtCore import QRectF
+from PyQt5.QtCore import QRectF, QByteArray
 from PyQt5.QtGui import QPainter
 from PyQt5.QtSvg import QSvgRenderer
 from PyQt5.QtWidgets import QMainWindow, QWidget
 
 
 class SvgDisplayWidget(QWidget):
-    def __init__(self, svg_path):
+    def __init__(self, svg_content: bytes):
         super().__init__()
-        self.renderer = QSvgRenderer(svg_path)
+        self.renderer = QSvgRenderer(QByteArray(svg_content))
 
     def paintEvent(self, event):
         painter = QPainter(self)
@@ -31,10 +31,10 @@ class SvgDisplayWidget(QWidget):
         self.renderer.render(painter, target_rect)
 
 class SvgFullScreenWindow(QMainWindow):
-    def __init__(self, svg_path):
+    def __init__(self, svg_content: bytes):
         super().__init__()
 
-        self.svg_widget = SvgDisplayWidget(svg_path)
+        self.svg_widget = SvgDisplayWidget(svg_content)
         self.setCentralWidget(self.svg_widget)
 
         self.showFullScreen()
\ No newline at end of file
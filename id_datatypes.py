@@ -44,6 +44,11 @@ def input_port(node: NodeId, key: PropKey) -> PortId:
     return PortId(node, key, True)
 
 
+def vis_root_id(node: NodeId) -> str:
+    # ID of the root element of the node's visualisation, which the IDs of the elements below it start with
+    return f"node{node.value}"
+
+
 def node_changed_port(node: NodeId, port: PortId) -> PortId:
     return PortId(node, port.key, port.is_input)
 
@@ -2,8 +2,7 @@ import uuid
 from collections import defaultdict, deque
 from typing import Optional
 
-from app_state import NodeId
-from id_datatypes import EdgeId, PortId
+from id_datatypes import NodeId, EdgeId, PortId
 
 # Create a function to generate default RefId values
 type RefId = str
@@ -30,6 +29,68 @@ class NodeGraph:
         # Hence if we know a node wants information about a port ID, we instead give it a respective ref ID
         # The node can look up information using the ref ID in a safer way, whilst still retaining the relationship with the nodes after pasting
         self.node_to_port_ref: defaultdict[NodeId, defaultdict[PortId, RefId]] = defaultdict(create_port_ref_dict)
+        self._build_indexes()
+
+    def _build_indexes(self) -> None:
+        # Edges indexed by their destination/source node and port, so edge queries cost O(degree)
+        self._incoming: defaultdict[NodeId | PortId, set[EdgeId]] = defaultdict(set)
+        self._outgoing: defaultdict[NodeId | PortId, set[EdgeId]] = defaultdict(set)
+        for edge in self.edges:
+            self._index_edge(edge)
+        # Reverse of node_to_port_ref, mapping each node's ref IDs back to the referenced port
+        self._ref_to_port: defaultdict[NodeId, dict[RefId, PortId]] = defaultdict(dict)
+        for node, port_ref_map in self.node_to_port_ref.items():
+            self._ref_to_port[node].update({ref: port for port, ref in port_ref_map.items()})
+
+    def _index_edge(self, edge: EdgeId) -> None:
+        self._incoming[edge.dst_node].add(edge)
+        self._incoming[edge.dst_port].add(edge)
+        self._outgoing[edge.src_node].add(edge)
+        self._outgoing[edge.src_port].add(edge)
+
+    def _unindex_edge(self, edge: EdgeId) -> None:
+        for index, keys in ((self._incoming, (edge.dst_node, edge.dst_port)),
+                            (self._outgoing, (edge.src_node, edge.src_port))):
+            for key in keys:
+                edges = index.get(key)
+                if edges is not None:
+                    edges.discard(edge)
+                    if not edges:
+                        del index[key]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for index in ('_incoming', '_outgoing', '_ref_to_port'):
+            state.pop(index, None)
+        # Sets of IDs holding strings are ordered by string hashes, which differ between sessions,
+        # so save them in a stable order to pickle identical graphs identically
+        state['nodes'] = sorted(self.nodes, key=repr)
+        state['edges'] = sorted(self.edges, key=repr)
+        for adjacency in ('node_inputs', 'node_outputs'):
+            state[adjacency] = sorted(((node, sorted(nodes, key=repr)) for node, nodes in state[adjacency].items()),
+                                      key=repr)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.nodes = set(self.nodes)
+        self.edges = set(self.edges)
+        self.node_inputs = defaultdict(set, {node: set(srcs) for node, srcs in dict(self.node_inputs).items()})
+        self.node_outputs = defaultdict(set, {node: set(dsts) for node, dsts in dict(self.node_outputs).items()})
+        self._build_indexes()
+
+    def copy(self) -> "NodeGraph":
+        # Independent copy of the graph structure, sharing the (immutable) node, port, edge and ref IDs
+        graph: NodeGraph = NodeGraph.__new__(NodeGraph)
+        graph.nodes = set(self.nodes)
+        graph.edges = set(self.edges)
+        graph.node_inputs = defaultdict(set, {node: set(srcs) for node, srcs in self.node_inputs.items()})
+        graph.node_outputs = defaultdict(set, {node: set(dsts) for node, dsts in self.node_outputs.items()})
+        graph.node_to_port_ref = defaultdict(create_port_ref_dict,
+                                             {node: defaultdict(generate_ref_id, port_ref_map)
+                                              for node, port_ref_map in self.node_to_port_ref.items()})
+        graph._build_indexes()
+        return graph
 
     def does_edge_exist(self, edge: EdgeId) -> bool:
         return edge in self.edges
@@ -44,44 +105,23 @@ class NodeGraph:
 
     def incoming_edges(self, node_or_port: NodeId | PortId) -> set[EdgeId]:
         # Get edges the with the given node or port as the destination
-        if isinstance(node_or_port, NodeId):
-            return {
-                edge
-                for edge in self.edges
-                if edge.dst_node == node_or_port
-            }
-        else:
-            return {
-                edge
-                for edge in self.edges
-                if edge.dst_port == node_or_port
-            }
+        return set(self._incoming.get(node_or_port, ()))
 
     def outgoing_edges(self, node_or_port: NodeId | PortId) -> set[EdgeId]:
         # Get edges the with the given node or port as the source
-        if isinstance(node_or_port, NodeId):
-            return {
-                edge
-                for edge in self.edges
-                if edge.src_node == node_or_port
-            }
-        else:
-            return {
-                edge
-                for edge in self.edges
-                if edge.src_port == node_or_port
-            }
+        return set(self._outgoing.get(node_or_port, ()))
 
     def get_ref(self, node: NodeId, port_to_reference: PortId) -> RefId:
         port_ref_map: defaultdict[PortId, RefId] = self.node_to_port_ref[node]
-        return port_ref_map[port_to_reference]
+        ref: RefId = port_ref_map[port_to_reference]  # Generated on first reference
+        self._ref_to_port[node][ref] = port_to_reference
+        return ref
 
     def query_ref(self, node: NodeId, ref: RefId) -> PortId:
-        port_ref_map: defaultdict[PortId, RefId] = self.node_to_port_ref[node]
-        for port, r in port_ref_map.items():
-            if r == ref:
-                return port
-        raise KeyError(f"Ref {ref} not found")
+        port: Optional[PortId] = self._ref_to_port.get(node, {}).get(ref)
+        if port is None:
+            raise KeyError(f"Ref {ref} not found")
+        return port
 
     def extend_port_refs(self, more_node_to_port_refs: dict[NodeId, dict[PortId, RefId]]):
         converted_dict: defaultdict[NodeId, defaultdict[PortId, RefId]] = defaultdict(
@@ -92,24 +132,53 @@ class NodeGraph:
             }
         )
         self.node_to_port_ref.update(converted_dict)
+        for node_id, port_dict in converted_dict.items():
+            self._ref_to_port[node_id] = {ref: port for port, ref in port_dict.items()}
 
     def output_nodes(self, node: NodeId) -> set[NodeId]:
         # Get nodes that receive outputs from the given node
         return self.node_outputs.get(node, set())
 
+    def input_nodes(self, node: NodeId) -> set[NodeId]:
+        # Get nodes that send inputs to the given node
+        return self.node_inputs.get(node, set())
+
+    def downstream_nodes(self, node: NodeId) -> set[NodeId]:
+        # Get the given node together with every node that (transitively) depends on it
+        return NodeGraph._reachable(node, self.node_outputs)
+
+    def upstream_nodes(self, node: NodeId) -> set[NodeId]:
+        # Get the given node together with every node it (transitively) depends on
+        return NodeGraph._reachable(node, self.node_inputs)
+
+    @staticmethod
+    def _reachable(start: NodeId, adjacency: dict[NodeId, set[NodeId]]) -> set[NodeId]:
+        visited: set[NodeId] = {start}
+        stack: list[NodeId] = [start]
+        while stack:
+            node = stack.pop()
+            for neighbour in adjacency.get(node, ()):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    stack.append(neighbour)
+        return visited
+
     def add_edge(self, edge: EdgeId) -> None:
         # Add an edge
         self.edges.add(edge)
+        self._index_edge(edge)
         self.node_outputs[edge.src_node].add(edge.dst_node)
         self.node_inputs[edge.dst_node].add(edge.src_node)
 
     def remove_edge(self, edge: EdgeId) -> None:
         # Remove the edge
-        self.edges.discard(edge)
+        if edge in self.edges:
+            self.edges.discard(edge)
+            self._unindex_edge(edge)
         # Check if any other edges exist from src node to dst node to update topology
         still_connected = any(
-            e.src_node == edge.src_node and e.dst_node == edge.dst_node
-            for e in self.edges
+            e.dst_node == edge.dst_node
+            for e in self._outgoing.get(edge.src_node, ())
         )
         if not still_connected:
             self.node_outputs[edge.src_node].discard(edge.dst_node)
@@ -117,7 +186,9 @@ class NodeGraph:
         # Remove the dst node ref mapping to the src port (now unconnected) if it exists
         if edge.dst_node in self.node_to_port_ref:
             port_ref_map: defaultdict[PortId, RefId] = self.node_to_port_ref[edge.dst_node]
-            port_ref_map.pop(edge.src_port, None)
+            ref: Optional[RefId] = port_ref_map.pop(edge.src_port, None)
+            if ref is not None:
+                self._ref_to_port[edge.dst_node].pop(ref, None)
 
     def get_topo_order_subgraph(self, subset: Optional[set[NodeId]] = None) -> list[NodeId]:
         # Given a subset of nodes, get the topological order between them (parent nodes first ending with leaf nodes)
@@ -1,14 +1,18 @@
 import copy
+import random
+import traceback
 from dataclasses import dataclass
-from typing import Optional
+from typing import Hashable, Optional
 
 from sympy import Number
 
+from compute_cache import DigestSource
 from id_datatypes import NodeId, PortId, PropKey, input_port, output_port
 from node_graph import NodeGraph
 from nodes.node_defs import Node, RuntimeNode, ResolvedProps, ResolvedRefs, RefQuerier, PropDef, PortStatus, \
     NodeCategory, DisplayStatus
 from nodes.node_implementations.canvas import CanvasNode
+from nodes.node_input_exception import NodeInputException
 from nodes.nodes import CombinationNode, SelectableNode
 from nodes.prop_types import PropType, PT_List, PT_Int
 from nodes.prop_values import PropValue, List, Float
@@ -50,13 +54,37 @@ class NodeManager:
     def __init__(self):
         self.node_map: dict[NodeId, RuntimeNode] = {}
         self.node_graph: NodeGraph = NodeGraph()
+        # Nodes whose compute results are out of date; evaluation only recomputes these
+        self._dirty: set[NodeId] = set()
+        # Exceptions raised by the latest compute of a node, visualised in place of its results
+        self._errors: dict[NodeId, Exception] = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_dirty', None)
+        state.pop('_errors', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Compute results are not trusted after loading, so every node starts dirty
+        self._dirty = set(self.node_map)
+        self._errors = {}
 
     def _runtime_node(self, node: NodeId) -> RuntimeNode:
         return self.node_map[node]
 
-    def add_node(self, node: NodeId, base_node: Node, compute_results=None):
+    def add_node(self, node: NodeId, base_node: Node, compute_results=None,
+                 results_digest: Optional[DigestSource] = None):
         self.node_map[node] = RuntimeNode(uid=node, graph_querier=self.node_graph, node_querier=self, node=base_node,
                                           compute_results=compute_results)
+        self.node_map[node].results_digest = results_digest
+        # Nodes given their compute results up front (e.g. custom node inputs) are treated as up to date
+        if compute_results is None:
+            self._dirty.add(node)
+        else:
+            self._dirty.discard(node)
+        self._errors.pop(node, None)
 
     def get_compute_inputs(self, node: NodeId) -> tuple[ResolvedProps, ResolvedRefs, RefQuerier]:
         return self._runtime_node(node).get_compute_inputs()
@@ -64,8 +92,46 @@ class NodeManager:
     def get_compute_results(self, node: NodeId) -> dict[PropKey, PropValue]:
         return self._runtime_node(node).compute_results
 
+    def digest_source(self, node: NodeId) -> DigestSource:
+        return self._runtime_node(node).digest_source()
+
+    def output_digest(self, port: PortId) -> str:
+        return self._runtime_node(port.node).output_digest(port.key)
+
+    def input_sources(self, node: NodeId) -> list[tuple[PropValue, DigestSource, PropKey]]:
+        return self._runtime_node(node).input_sources()
+
     def remove_node(self, node: NodeId):
         self.node_map.pop(node, None)
+        self._dirty.discard(node)
+        self._errors.pop(node, None)
+
+    # Evaluation engine
+
+    def is_dirty(self, node: NodeId) -> bool:
+        return node in self._dirty
+
+    def mark_dirty(self, node: NodeId) -> set[NodeId]:
+        # Invalidate the node and its downstream cone, returning the invalidated nodes
+        cone: set[NodeId] = {n for n in self.node_graph.downstream_nodes(node) if n in self.node_map}
+        for n in cone:
+            self.node_map[n].invalidate()
+        self._dirty.update(cone)
+        return cone
+
+    def evaluate(self, node: NodeId) -> None:
+        # Bring the node up to date, computing each dirty upstream node at most once
+        stale: set[NodeId] = {n for n in self.node_graph.upstream_nodes(node) if n in self._dirty}
+        if not stale:
+            return
+        for n in self.node_graph.get_topo_order_subgraph(stale):
+            try:
+                self.compute(n)
+            except NodeInputException as e:
+                self._errors[n] = e
+            except Exception as e:
+                self._errors[n] = e
+                traceback.print_exc()
 
     def resolve_property(self, src_port: PortId, inp_type: PropType) -> Optional[PropValue]:
         src_runtime_node = self._runtime_node(src_port.node)
@@ -108,11 +174,20 @@ class NodeManager:
 
     def set_internal_property(self, node: NodeId, key: PropKey, value: PropValue) -> None:
         self._runtime_node(node).node.internal_props[key] = value
+        self.mark_dirty(node)
+
+    def compute_error(self, node: NodeId) -> Optional[Exception]:
+        # Exception raised by the latest compute of the node, if any
+        return self._errors.get(node)
 
     def visualise(self, node: NodeId) -> Visualisable:
-        return self._runtime_node(node).visualise()
+        self.evaluate(node)
+        return self._runtime_node(node).visualise(self._errors.get(node))
 
     def compute(self, node: NodeId) -> None:
+        # Unconditionally recompute the node from the current results of its inputs
+        self._dirty.discard(node)
+        self._errors.pop(node, None)
         self._runtime_node(node).compute()
 
     def selections_w_idx(self, node: NodeId) -> tuple[list[type[Node]], int]:
@@ -124,6 +199,7 @@ class NodeManager:
         comb_node: Node = self._runtime_node(node).node
         assert isinstance(comb_node, CombinationNode)
         comb_node.set_selection(index)
+        self.mark_dirty(node)
 
     def get_node_copies(self, subset: Optional[set[NodeId]] = None) -> dict[NodeId, Node]:
         nodes_to_copy: set[NodeId] = subset if subset is not None else self.node_map.keys()
@@ -132,14 +208,60 @@ class NodeManager:
             for node in nodes_to_copy
         }
 
+    def node_snapshot(self, node: NodeId) -> Node:
+        # Copy-on-write copy of the node for computing with, much cheaper than get_node_copies (see Node.snapshot)
+        return self._runtime_node(node).node.snapshot()
+
+    def snapshot(self) -> "NodeManager":
+        # Copy of the whole pipeline that can be computed independently of this one
+        # Nodes are snapshots and compute results are shared, as computing replaces rather than mutates them
+        manager = NodeManager()
+        manager.node_graph = self.node_graph.copy()
+        for node, runtime_node in self.node_map.items():
+            manager.add_node(node, runtime_node.node.snapshot(), compute_results=runtime_node.compute_results,
+                             results_digest=runtime_node.results_digest)
+        manager._dirty = set(self._dirty)
+        manager._errors = dict(self._errors)
+        return manager
+
+    def extract_cone(self, sink: NodeId, with_results: bool = False) -> "NodeManager":
+        # Copy the sink and every node upstream of it into a standalone node manager
+        # With with_results, the nodes keep their compute results and are up to date in the copy if they are here
+        cone: set[NodeId] = self.node_graph.upstream_nodes(sink)
+        cone_manager = NodeManager()
+        for node in cone:
+            cone_manager.node_graph.add_node(node)
+            runtime_node: RuntimeNode = self.node_map[node]
+            if with_results and node not in self._dirty:
+                cone_manager.add_node(node, runtime_node.node, compute_results=runtime_node.compute_results,
+                                      results_digest=runtime_node.results_digest)
+            else:
+                cone_manager.add_node(node, runtime_node.node)
+        for node in cone:
+            for edge in self.node_graph.incoming_edges(node):
+                cone_manager.node_graph.add_edge(edge)
+        cone_manager.node_graph.extend_port_refs({node: dict(self.node_graph.node_to_port_ref[node])
+                                                  for node in cone if node in self.node_graph.node_to_port_ref})
+        return cone_manager
+
     def update_nodes(self, base_nodes: dict[NodeId, Node]) -> None:
         for node, base_node in base_nodes.items():
             self.node_map[node] = RuntimeNode(uid=node, graph_querier=self.node_graph, node_querier=self,
                                               node=base_node)
+            self._dirty.add(node)
+            self._errors.pop(node, None)
 
     def randomise(self, node: NodeId, seed=None) -> None:
         random_node: Node = self._runtime_node(node).node
         random_node.randomise(seed=seed)
+        self.mark_dirty(node)
+
+    def reseed(self, pipeline_seed) -> None:
+        # Deterministically reseed every randomisable node from one pipeline seed
+        # Each node's seed only depends on its own ID, so any subset of the pipeline reseeds identically
+        for node, runtime_node in self.node_map.items():
+            if runtime_node.node.randomisable:
+                self.randomise(node, random.Random(f"{pipeline_seed}:{node.value}").random())
 
     def get_seed(self, node: NodeId, seed=None) -> float:
         random_node: Node = self._runtime_node(node).node
@@ -148,7 +270,9 @@ class NodeManager:
     def extract_element(self, node: NodeId, parent_group: Group, element_id: str) -> PropKey:
         runtime_node: RuntimeNode = self._runtime_node(node)
         assert isinstance(runtime_node.node, SelectableNode)
-        return runtime_node.extract_element(parent_group, element_id)
+        prop_key: PropKey = runtime_node.extract_element(parent_group, element_id)
+        self.mark_dirty(node)
+        return prop_key
 
     def is_playing(self, node: NodeId) -> bool:
         animate_node: Node = self._runtime_node(node).node
@@ -161,10 +285,34 @@ class NodeManager:
             if runtime_node.node.animatable and runtime_node.node.playing
         }
 
-    def reanimate(self, node: NodeId, time: float) -> bool:
+    def reanimate(self, node: NodeId, time: float) -> int:
+        # Returns the number of animation frames the node moved on
+        animate_node: Node = self._runtime_node(node).node
+        assert animate_node.animatable
+        steps: int = animate_node.reanimate(time)
+        if steps:
+            self.mark_dirty(node)
+        return steps
+
+    def time_to_next_step(self, node: NodeId) -> float:
+        animate_node: Node = self._runtime_node(node).node
+        assert animate_node.animatable
+        return animate_node.time_to_next_step()
+
+    def animation_key(self, node: NodeId) -> Optional[Hashable]:
+        runtime_node: RuntimeNode = self._runtime_node(node)
+        assert runtime_node.node.animatable
+        return runtime_node.node.animation_key(runtime_node.compute_results)
+
+    def seek(self, node: NodeId, time: float) -> bool:
+        # Set an animatable node to the frame shown after time milliseconds of playback
+        # Returns True if its frame changed, in which case it needs recomputing
         animate_node: Node = self._runtime_node(node).node
         assert animate_node.animatable
-        return animate_node.reanimate(time)
+        changed: bool = animate_node.seek(time)
+        if changed:
+            self.mark_dirty(node)
+        return changed
 
     def toggle_play(self, node: NodeId) -> None:
         animate_node: Node = self._runtime_node(node).node
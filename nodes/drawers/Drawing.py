@@ -1,3 +1,4 @@
+import io
 from abc import ABC, abstractmethod
 
 import svgwrite
@@ -5,10 +6,10 @@ import svgwrite
 
 class Drawing(ABC):
 
-    def __init__(self, filepath, width, height):
+    def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.dwg = svgwrite.Drawing(filepath, size=(self.width, self.height), preserveAspectRatio="none")
+        self.dwg = svgwrite.Drawing(size=(self.width, self.height), preserveAspectRatio="none")
 
         # Define clipping that clips everything outside of view box
         clip = self.dwg.defs.add(self.dwg.clipPath(id="viewbox-clip"))
@@ -19,9 +20,11 @@ class Drawing(ABC):
         element['clip-path'] = "url(#viewbox-clip)"
         self.dwg.add(element)
 
-    def save(self):
+    def svg_bytes(self) -> bytes:
         self.draw()
-        self.dwg.save()
+        buffer = io.StringIO()
+        self.dwg.write(buffer)
+        return buffer.getvalue().encode("utf-8")
 
     @abstractmethod
     def draw(self):
@@ -1,12 +1,32 @@
-from nodes.drawers.Drawing import Drawing
+import io
 
+from nodes.drawers.svg_writer import SvgWriter
 
-class ElementDrawer(Drawing):
+ROOT_ID = "root"  # ID of the drawn element, unless given one (such as its node's, see vis_root_id)
 
-    def __init__(self, filepath, width, height, inputs):
-        super().__init__(filepath, width, height)
+
+class ElementDrawer:
+
+    def __init__(self, width, height, inputs, flatten_transforms=False, instance_repeats=True, root_id=ROOT_ID):
+        self.width = width
+        self.height = height
         self.element = inputs
+        self.flatten_transforms = flatten_transforms
+        self.instance_repeats = instance_repeats
+        self.root_id = root_id
+
+    def write(self, out):
+        writer = SvgWriter(self.width, self.height, self.flatten_transforms)
+        if self.instance_repeats:
+            writer.find_repeats(self.element)
+        self.element.write_svg(writer, self.root_id)
+        writer.write(out)
+
+    def save(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            self.write(f)
 
-    def draw(self):
-        self.dwg.viewbox(0, 0, 1, 1)
-        self.dwg_add(self.element.get(self.dwg))
+    def svg_bytes(self) -> bytes:
+        buffer = io.StringIO()
+        self.write(buffer)
+        return buffer.getvalue().encode("utf-8")
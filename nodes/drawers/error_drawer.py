@@ -3,8 +3,8 @@ from nodes.drawers.Drawing import Drawing
 
 class ErrorDrawer(Drawing):
 
-    def __init__(self, filepath, width, height, inputs):
-        super().__init__(filepath, width, height)
+    def __init__(self, width, height, inputs):
+        super().__init__(width, height)
         self.title, self.content = inputs
 
     def draw(self):  # Add the title in bold, centered at the top third
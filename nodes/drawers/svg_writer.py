@@ -0,0 +1,138 @@
+from typing import Optional, TextIO
+
+from nodes.prop_values import PointArray
+
+# Namespaces and base attributes matching the svgwrite drawings elsewhere in the app
+SVG_ATTRS = ('baseProfile="full" version="1.1" xmlns="http://www.w3.org/2000/svg" '
+             'xmlns:ev="http://www.w3.org/2001/xml-events" xmlns:xlink="http://www.w3.org/1999/xlink"')
+
+
+def format_matrix(matrix) -> str:
+    (a, c, e), (b, d, f) = matrix[:2].tolist()
+    return f"matrix({a},{b},{c},{d},{e},{f})"
+
+
+def format_points(points) -> str:
+    if isinstance(points, PointArray):
+        points = points.array.tolist()
+    return ' '.join([f"{x},{y}" for x, y in points])
+
+
+class SvgWriter:
+    """
+    Writes an element tree straight to SVG text, without building an svgwrite object tree.
+
+    Elements write themselves through the shape and group methods, with the ID their parent gives them. Repeated style
+    declarations are collapsed into CSS classes and gradients into shared definitions, which are only known once the
+    whole tree has been written, so the body is buffered and the document is assembled in write().
+
+    With flatten_transforms, groups below the root's direct children are not written: each shape is instead placed by
+    the single matrix combining all of its ancestors' transformations.
+
+    Elements appearing more than once in the tree (such as the motif repeated in every cell of a grid) can be written
+    once into the definitions and drawn with a <use> wherever they appear, after find_repeats. The root and its direct
+    children are always written in place, so they can be found by ID. Definitions are groups rather than <symbol>s,
+    which QtSvg doesn't draw.
+    """
+
+    def __init__(self, width, height, flatten_transforms=False):
+        self.width = width
+        self.height = height
+        self.flatten_transforms = flatten_transforms
+        self._body: list[str] = []
+        self._depth = 0
+        self._style_classes: dict[str, str] = {}  # Style declarations to class names
+        self._gradients: dict[int, tuple[str, str]] = {}  # Gradient object IDs to gradient IDs and definitions
+        self._repeated: set[int] = set()  # Object IDs of the elements to write once and reuse
+        self._instances: dict[int, tuple[str, str]] = {}  # Repeated element object IDs to definition IDs and definitions
+
+    def _root_attrs(self) -> str:
+        # Clip the root element to the view box
+        return ' clip-path="url(#viewbox-clip)"' if self._depth == 0 else ''
+
+    def _style_class(self, style: str) -> str:
+        class_name: Optional[str] = self._style_classes.get(style)
+        if class_name is None:
+            class_name = self._style_classes[style] = f"s{len(self._style_classes)}"
+        return class_name
+
+    def fill_url(self, gradient) -> str:
+        grad_ref: Optional[tuple[str, str]] = self._gradients.get(id(gradient))
+        if grad_ref is None:
+            grad_id = f"grad{len(self._gradients)}"
+            (x1, y1), (x2, y2) = gradient.start_coord, gradient.end_coord
+            stops: str = ''.join(
+                [f'<stop offset="{stop.offset}" stop-color="{stop.colour.colour}" stop-opacity="{stop.colour.opacity}" />'
+                 for stop in gradient.stops])
+            grad_ref = self._gradients[id(gradient)] = (
+                grad_id, f'<linearGradient id="{grad_id}" x1="{x1}" x2="{x2}" y1="{y1}" y2="{y2}">{stops}</linearGradient>')
+        return f"url(#{grad_ref[0]})"
+
+    def begin_group(self, element_id: Optional[str], transform_str: Optional[str] = None):
+        id_attr: str = f' id="{element_id}"' if element_id else ''
+        transform_attr: str = f' transform="{transform_str}"' if transform_str else ''
+        self._body.append(f'<g{self._root_attrs()}{id_attr}{transform_attr}>')
+        self._depth += 1
+
+    def end_group(self):
+        self._depth -= 1
+        self._body.append('</g>')
+
+    def find_repeats(self, root) -> None:
+        counts: dict[int, int] = {}
+        root.count_occurrences(counts)
+        self._repeated = {element_id for element_id, count in counts.items() if count > 1}
+
+    @property
+    def has_repeats(self) -> bool:
+        return bool(self._repeated)
+
+    def is_instanced(self, element) -> bool:
+        # Whether the element is written as a reference to its definition here
+        return self._depth > 1 and id(element) in self._repeated
+
+    def use(self, element, matrix=None):
+        # Draw a repeated element from its definition, written the first time it is used
+        instance: Optional[tuple[str, str]] = self._instances.get(id(element))
+        if instance is None:
+            body, depth = self._body, self._depth
+            # Definitions are written below the root, so repeated elements inside them are instanced too
+            self._body, self._depth = [], 2
+            # Elements in a definition are identified from the definition's ID rather than from where they are used
+            instance_id = f"inst{len(self._instances)}"
+            element.write_svg(self, f"{instance_id}/0")
+            # Added after any definitions it uses, which QtSvg needs to be defined first
+            instance = self._instances[id(element)] = (instance_id,
+                                                       f'<g id="{instance_id}">{"".join(self._body)}</g>')
+            self._body, self._depth = body, depth
+        transform_attr: str = f' transform="{format_matrix(matrix)}"' if matrix is not None else ''
+        self._body.append(f'<use xlink:href="#{instance[0]}"{transform_attr} />')
+
+    def write_element(self, element, element_id: str):
+        # Write a child element in place with the given ID, or as a reference if it is instanced
+        if self.is_instanced(element):
+            self.use(element)
+        else:
+            element.write_svg(self, element_id)
+
+    def shape(self, tag: str, element_id: str, geometry: str, style: str, matrix=None):
+        # Geometry is the shape's preformatted attributes, style its CSS declarations
+        transform_attr: str = f' transform="{format_matrix(matrix)}"' if matrix is not None else ''
+        self._body.append(f'<{tag}{self._root_attrs()} class="{self._style_class(style)}" id="{element_id}" '
+                          f'{geometry}{transform_attr} />')
+
+    def write(self, out: TextIO):
+        out.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+        out.write(f'<svg {SVG_ATTRS} height="{self.height}" width="{self.width}" preserveAspectRatio="none" '
+                  f'viewBox="0,0,1,1">')
+        out.write(f'<defs><clipPath id="viewbox-clip"><rect height="{self.height}" width="{self.width}" x="0" y="0" />'
+                  f'</clipPath>')
+        if self._style_classes:
+            out.write('<style type="text/css"><![CDATA[')
+            out.write(''.join([f".{class_name}{{{style}}}" for style, class_name in self._style_classes.items()]))
+            out.write(']]></style>')
+        out.write(''.join([definition for _, definition in self._gradients.values()]))
+        out.write(''.join([definition for _, definition in self._instances.values()]))
+        out.write('</defs>')
+        out.write(''.join(self._body))
+        out.write('</svg>')
@@ -1,4 +1,6 @@
+import functools
 from abc import ABC, abstractmethod
+from typing import Callable
 
 import numpy as np
 import sympy as sp
@@ -12,6 +14,11 @@ class Function(PropValue, ABC):
     def get(self):
         pass
 
+    def sample(self, xs: np.ndarray) -> np.ndarray:
+        # Values of the function at each of xs, evaluated one at a time unless the function is vectorised
+        f = self.get()
+        return np.array([f(x) for x in xs])
+
     @property
     def type(self):
         return PT_Function()
@@ -21,6 +28,9 @@ class IdentityFun(Function):
     def get(self):
         return lambda x: x
 
+    def sample(self, xs: np.ndarray) -> np.ndarray:
+        return np.array(xs)
+
 
 class CubicFun(Function):
     def __init__(self, a, b, c, d):
@@ -32,6 +42,18 @@ class CubicFun(Function):
     def get(self):
         return lambda x: self.a * (x ** 3) + self.b * (x ** 2) + self.c * x + self.d
 
+    def sample(self, xs: np.ndarray) -> np.ndarray:
+        return self.get()(xs)
+
+
+@functools.lru_cache(maxsize=256)
+def _lambdify(symbols, parsed_expr) -> Callable:
+    # Compiled once per expression, as lambdify is slow
+    try:
+        return sp.lambdify(symbols, parsed_expr)
+    except:
+        return lambda x: x
+
 
 class CustomFun(Function):
     def __init__(self, symbols, parsed_expr):
@@ -39,11 +61,15 @@ class CustomFun(Function):
         self.parsed_expr = parsed_expr
 
     def get(self):
+        return _lambdify(self.symbols, self.parsed_expr)
+
+    def sample(self, xs: np.ndarray) -> np.ndarray:
         try:
-            f = sp.lambdify(self.symbols, self.parsed_expr)
-        except:
-            f = lambda x: x
-        return f
+            # Expressions not depending on x evaluate to a single value
+            return np.array(np.broadcast_to(self.get()(xs), np.shape(xs)))
+        except Exception:
+            # Not every expression can be evaluated on arrays
+            return super().sample(xs)
 
 
 class PiecewiseFun(Function):
@@ -53,3 +79,6 @@ class PiecewiseFun(Function):
 
     def get(self):
         return lambda i: np.interp(i, self.xs, self.ys)
+
+    def sample(self, xs: np.ndarray) -> np.ndarray:
+        return np.interp(xs, self.xs, self.ys)
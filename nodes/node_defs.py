@@ -3,8 +3,9 @@ import traceback
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import Optional, cast
+from typing import Hashable, Optional, Sequence, cast
 
+from compute_cache import DigestSource, cached_compute, output_digest, new_digest, resolve_digest
 from id_datatypes import PropKey, NodeId, PortId, input_port, EdgeId
 from node_graph import NodeGraph, RefId
 from nodes.node_implementations.visualiser import visualise_by_type
@@ -69,8 +70,8 @@ class RefQuerier:
         return self._node_querier.node_info(self.port(ref).node)
 
     def node_copy(self, ref: RefId):
-        node: NodeId = self.port(ref).node
-        return self._node_querier.get_node_copies({node})[node]
+        # Snapshot of the referenced node, to compute with without affecting the original (see Node.snapshot)
+        return self._node_querier.node_snapshot(self.port(ref).node)
 
     def get_compute_inputs(self, ref: RefId):
         return self._node_querier.get_compute_inputs(self.port(ref).node)
@@ -78,6 +79,23 @@ class RefQuerier:
     def get_compute_results(self, ref: RefId):
         return self._node_querier.get_compute_results(self.port(ref).node)
 
+    def get_results_digest(self, ref: RefId) -> DigestSource:
+        return self._node_querier.digest_source(self.port(ref).node)
+
+    def get_output_digest(self, ref: RefId) -> str:
+        # Digest of the referenced output, which also identifies how its node computes, so can be part of the cache key
+        # of results computed by copies of the node
+        return self._node_querier.output_digest(self.port(ref))
+
+    def input_sources(self) -> list[tuple[PropValue, DigestSource, PropKey]]:
+        # This node's input values, with the digest of the results and the output each came from, for its compute
+        # cache key (see compute_cache)
+        return self._node_querier.input_sources(self._uid)
+
+    def extract_cone(self, ref: RefId):
+        # Standalone node manager holding the referenced node and everything upstream of it, with compute results
+        return self._node_querier.extract_cone(self.port(ref).node, with_results=True)
+
     def get_compute_result(self, ref: RefId):
         port: PortId = self.port(ref)
         return self._node_querier.get_compute_result(port.node, port.key)
@@ -100,6 +118,7 @@ class PrivateNodeInfo:
 class Node(ABC):
     NAME = ""  # To override
     NODE_CATEGORY = NodeCategory.UNKNOWN # To override
+    CACHEABLE = True  # Override with False if compute results depend on more than the resolved props and cache_state
 
     def __init__(self, internal_props: Optional[dict[PropKey, PropValue]] = None):
         self.internal_props: dict[
@@ -113,9 +132,43 @@ class Node(ABC):
                 default_props[key] = copy.deepcopy(prop_def.default_value)
         return default_props
 
+    def snapshot(self) -> "Node":
+        # Copy of the node that can be computed without affecting this one
+        # Internal properties are shared copy-on-write, so subclasses must copy any other state their compute mutates
+        node: Node = copy.copy(self)
+        node.internal_props = {key: value.snapshot() if isinstance(value, PropValue) else value
+                               for key, value in self.internal_props.items()}
+        return node
+
+    def prepare_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> None:
+        # Update any state of the node that depends on its inputs, before computing (even if the results are cached)
+        pass
+
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        # State of the node besides its resolved properties that its compute results depend on, used in their key in
+        # the compute cache. None if the results can't be cached.
+        return () if self.CACHEABLE else None
+
+    def derived_digest(self) -> Optional[DigestSource]:
+        # Digest of the results of the last compute of a node that can't be cached, if it can tell they have been
+        # computed before (see compute_cache)
+        return None
+
     def final_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> dict[
         PropKey, PropValue]:
-        return self.compute(props, refs, ref_querier)
+        # Reuses the results of an identical compute if there is one (see compute_cache)
+        return cached_compute(self, props, refs, ref_querier)[0]
+
+    def batch_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier, prop_key: PropKey,
+                      values: Sequence[PropValue]) -> list[dict[PropKey, PropValue]]:
+        # Compute results for each value of one property, the other properties having been resolved once
+        # Nodes that can compute every value at once override this, otherwise it falls back to computing each in turn
+        results: list[dict[PropKey, PropValue]] = []
+        for value in values:
+            value_props: ResolvedProps = dict(props)
+            value_props[prop_key] = value
+            results.append(self.final_compute(value_props, dict(refs), ref_querier))
+        return results
 
     def visualise(self, compute_results: dict[PropKey, PropValue]) -> Optional[Visualisable]:
         try:
@@ -165,6 +218,11 @@ class Node(ABC):
 
 
 class RuntimeNode:
+    # Properties resolved for the last compute, reused when forwarding them as outputs (None if stale)
+    resolved_props: Optional[ResolvedProps] = None
+    # Digest of the compute results (see compute_cache), None until needed if they weren't computed here
+    results_digest: Optional[DigestSource] = None
+
     def __init__(self, uid: NodeId, graph_querier: NodeGraph, node_querier, node: Node, compute_results=None):
         self.uid = uid
         self.graph_querier = graph_querier
@@ -172,18 +230,21 @@ class RuntimeNode:
         self.compute_results: dict[PropKey, PropValue] = {} if compute_results is None else compute_results
         self.node: Node = node
 
-    def visualise(self) -> Visualisable:
-        # Catch exception if raised
-        try:
-            # Recompute results
-            self.compute()
-            # Obtain visualisation
-            vis = self.node.visualise(self.compute_results)
-        except NodeInputException as e:
-            vis = ErrorFig(e.title, e.message)
-        except Exception as e:
-            vis = ErrorFig("Unknown Exception", str(e))
-            traceback.print_exc()
+    def visualise(self, compute_error: Optional[Exception] = None) -> Visualisable:
+        # Visualise the current compute results, or the error raised when computing them
+        if isinstance(compute_error, NodeInputException):
+            vis = ErrorFig(compute_error.title, compute_error.message)
+        elif compute_error is not None:
+            vis = ErrorFig("Unknown Exception", str(compute_error))
+        else:
+            # Catch exception if raised
+            try:
+                vis = self.node.visualise(self.compute_results)
+            except NodeInputException as e:
+                vis = ErrorFig(e.title, e.message)
+            except Exception as e:
+                vis = ErrorFig("Unknown Exception", str(e))
+                traceback.print_exc()
         if not vis:
             # No visualisation, return blank canvas
             vis = Group(debug_info="Blank Canvas")
@@ -194,7 +255,33 @@ class RuntimeNode:
         return props, refs, RefQuerier(self.uid, self.node_querier, self.graph_querier)
 
     def compute(self) -> None:
-        self.compute_results = self.node.final_compute(*self.get_compute_inputs())
+        props, refs, ref_querier = self.get_compute_inputs()
+        self.resolved_props = None
+        self.compute_results, self.results_digest = cached_compute(self.node, dict(props), refs, ref_querier)
+        self.resolved_props = props
+
+    def digest_source(self) -> DigestSource:
+        # Digest of the compute results, which may not be made until it is first needed (see compute_cache.LazyDigest)
+        if self.results_digest is None:
+            self.results_digest = new_digest()
+        return self.results_digest
+
+    def digest(self) -> bytes:
+        return resolve_digest(self.digest_source())
+
+    def output_digest(self, key: PropKey) -> str:
+        return output_digest(self.digest(), key)
+
+    def input_sources(self) -> list[tuple[PropValue, DigestSource, PropKey]]:
+        sources: list[tuple[PropValue, DigestSource, PropKey]] = []
+        for edge in self.graph_querier.incoming_edges(self.uid):
+            value: Optional[PropValue] = self.node_querier.get_compute_result(edge.src_node, edge.src_key)
+            if value is not None:
+                sources.append((value, self.node_querier.digest_source(edge.src_node), edge.src_key))
+        return sources
+
+    def invalidate(self) -> None:
+        self.resolved_props = None
 
     def extract_element(self, parent_group: Group, element_id: str) -> PropKey:
         return self.node.extract_element(self.resolve_properties()[0], parent_group, element_id)
@@ -247,7 +334,7 @@ class RuntimeNode:
                         results_for_ref = ref_result_map[curr_prop.ref]
                         new_group_len: int = len(results_for_ref)
                         for res_idx, compute_result in enumerate(results_for_ref):
-                            new_ref_entry: PortRefTableEntry = copy.deepcopy(curr_prop)
+                            new_ref_entry: PortRefTableEntry = cast(PortRefTableEntry, curr_prop.snapshot())
                             new_ref_entry.data = compute_result
                             new_ref_entry.group_idx = (res_idx + 1, new_group_len)
                             # Add updated entry
@@ -300,4 +387,6 @@ class RuntimeNode:
         if key in self.compute_results:
             return self.compute_results[key]
         # Forwarding a resolved property
+        if self.resolved_props is not None:
+            return self.resolved_props.get(key)
         return self.resolve_properties()[0].get(key)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Hashable, Optional
 
 from id_datatypes import PropKey
 from nodes.drawers.draw_graph import create_graph_svg
@@ -43,38 +43,26 @@ class AnimatorNode(AnimatableNode):
     NODE_CATEGORY = NodeCategory.ANIMATOR
     DEFAULT_NODE_INFO = DEF_ANIMATOR_INFO
 
-    def __init__(self, internal_props: Optional[dict[PropKey, PropValue]] = None, add_info=None):
-        self._curr_idx = None
-        self._right_dir = None
-        self._reset_idx()
-        super().__init__(internal_props, add_info)
+    @staticmethod
+    def _period(num_items: int, reflective: bool) -> int:
+        # Reflecting back at the boundaries (ABCBA) repeats every 2(n - 1) frames
+        return 2 * (num_items - 1) if reflective and num_items > 1 else num_items
 
-    def _reset_idx(self):
-        self._curr_idx = 0
-        self._right_dir = True
-
-    def compute(self, props: ResolvedProps, *args):
+    def compute_at(self, frame: int, props: ResolvedProps, *args):
         val_list: List = props.get('val_list')
         if not val_list:
             return {}
-        # Reset curr index if necessary
-        if self._curr_idx >= len(val_list):
-            self._reset_idx()
-        output = val_list[self._curr_idx]
-        old_idx = self._curr_idx
-
-        if self.tick_reanimate():
-            if props.get('iter_type_enum').selected_option:
-                # Reverse direction at boundaries and update index
-                if self._curr_idx == 0:
-                    self._right_dir = True
-                elif self._curr_idx == len(val_list) - 1:
-                    self._right_dir = False
-            else:
-                self._right_dir = True
-            self._curr_idx += 1 if self._right_dir else -1
+        num_items: int = len(val_list)
+        period_idx: int = frame % self._period(num_items, props.get('iter_type_enum').selected_option)
+        curr_idx: int = period_idx if period_idx < num_items else 2 * (num_items - 1) - period_idx
+        return {'_main': val_list[curr_idx], 'curr_index': curr_idx, 'val_list': val_list}
 
-        return {'_main': output, 'curr_index': old_idx, 'val_list': val_list}
+    def animation_key(self, compute_results: dict[PropKey, PropValue]) -> Optional[Hashable]:
+        # The list (and so its length) is the same for every frame until an input changes
+        val_list: Optional[List] = compute_results.get('val_list')
+        if not val_list:
+            return None
+        return self.frame % self._period(len(val_list), self.internal_props['iter_type_enum'].selected_option)
 
     def visualise(self, compute_results: dict[PropKey, PropValue]) -> Optional[Visualisable]:
         output = compute_results.get('_main')
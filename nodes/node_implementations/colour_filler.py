@@ -3,9 +3,8 @@ import itertools
 from nodes.node_defs import PrivateNodeInfo, ResolvedProps, PropDef, PortStatus, NodeCategory, DisplayStatus
 from nodes.node_input_exception import NodeInputException
 from nodes.nodes import UnitNode
-from nodes.prop_types import PT_Element, PT_List, PT_FillHolder, PT_Point, \
-    PT_Fill
-from nodes.prop_values import List
+from nodes.prop_types import PT_Element, PT_List, PT_FillHolder, PT_Fill
+from nodes.prop_values import List, PointArray
 from nodes.shape_datatypes import Group, Polygon, Element, Polyline
 
 DEF_COLOUR_FILLER_INFO = PrivateNodeInfo(
@@ -47,9 +46,9 @@ class ColourFillerNode(UnitNode):
         for i in range(1, len(transformed_shapes)):
             shape1, transform_list1 = transformed_shapes[i - 1]
             shape2, transform_list2 = transformed_shapes[i]
-            points: List[PT_Point] = transform_list1.transform_points(shape1.points) + transform_list2.transform_points(
+            points: PointArray = transform_list1.transform_points(shape1.points) + transform_list2.transform_points(
                 shape2.points).reversed()
-            ret_group.add(Polygon(points.items, next(colour_it)))
+            ret_group.add(Polygon(points, next(colour_it)))
         return ret_group
 
     def compute(self, props: ResolvedProps, *args):
@@ -39,9 +39,9 @@ class FunSamplerNode(UnitNode):
     @staticmethod
     def helper(function, num_samples):
         samples = sample_fun(function, num_samples)
-        min_sample = min(samples)
-        max_sample = max(samples)
-        return List(PT_Number(min_value=min_sample, max_value=max_sample), [Float(i) for i in samples])
+        min_sample = samples.min()
+        max_sample = samples.max()
+        return List(PT_Number(min_value=min_sample, max_value=max_sample), [Float(i) for i in samples.tolist()])
 
     def compute(self, props: ResolvedProps, *args):
         function = props.get('function')
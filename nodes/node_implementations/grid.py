@@ -1,8 +1,9 @@
+from id_datatypes import PropKey
 from nodes.node_defs import PrivateNodeInfo, ResolvedProps, PropDef, PortStatus, NodeCategory, DisplayStatus
-from nodes.node_implementations.visualiser import get_grid
+from nodes.node_implementations.visualiser import get_grid, get_grid_lines
 from nodes.nodes import UnitNode
 from nodes.prop_types import PT_Warp, PT_Int, PT_Grid
-from nodes.prop_values import Int
+from nodes.prop_values import Int, Grid
 
 DEF_GRID_INFO = PrivateNodeInfo(
     description="Define a grid, which can be input to a Shape Repeater or Checkerboard node. The spacing between the vertical and horizontal lines of the grid can be altered via a Warp in the X or Y direction respectively.",
@@ -36,3 +37,15 @@ class GridNode(UnitNode):
 
     def compute(self, props: ResolvedProps, *args):
         return {'_main': get_grid(props.get('width'), props.get('height'), props.get('x_warp'), props.get('y_warp'))}
+
+    def batch_compute(self, props: ResolvedProps, refs, ref_querier, prop_key: PropKey, values):
+        # Only one axis changes between values, so the lines of the other are sampled once and shared
+        if prop_key in ('width', 'x_warp'):
+            h_line_ys = get_grid_lines(props.get('height'), props.get('y_warp'))
+            return [{'_main': Grid(get_grid_lines(value, props.get('x_warp')) if prop_key == 'width' else
+                                   get_grid_lines(props.get('width'), value), h_line_ys)} for value in values]
+        if prop_key in ('height', 'y_warp'):
+            v_line_xs = get_grid_lines(props.get('width'), props.get('x_warp'))
+            return [{'_main': Grid(v_line_xs, get_grid_lines(value, props.get('y_warp')) if prop_key == 'height' else
+                                   get_grid_lines(props.get('height'), value))} for value in values]
+        return super().batch_compute(props, refs, ref_querier, prop_key, values)
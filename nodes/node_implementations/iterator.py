@@ -1,4 +1,4 @@
-from typing import Optional, cast
+from typing import Hashable, Optional, cast
 
 from sympy.integrals.risch import NonElementaryIntegral
 
@@ -105,8 +105,19 @@ class IteratorNode(SelectableNode):
         enum.set_options(options, display_options)
         return True
 
+    def prepare_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> None:
+        super().prepare_compute(props, refs, ref_querier)
+        self._update_prop_change_enum(props, refs, ref_querier)
+
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        # Results are computed by a copy of the input node, so depend on how it computes and not just its output
+        state: Optional[Hashable] = super().cache_state(props, refs, ref_querier)
+        if state is None or refs.get('node_input') is None:
+            return state
+        return state, ref_querier.get_output_digest(refs.get('node_input'))
+
     def compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier):
-        if not self._update_prop_change_enum(props, refs, ref_querier):
+        if props.get('node_input') is None:
             return {}
 
         prop_change_key: PropKey = cast(Enum, props.get('prop_enum')).selected_option
@@ -124,11 +135,10 @@ class IteratorNode(SelectableNode):
 
         src_port_key: PropKey = ref_querier.port(node_ref).key
         iter_outputs = List(node_input.type, vertical_layout=cast(Enum, props.get('layout_enum')).selected_option)
-        for value in values:
-            in_props, in_refs, in_querier = ref_querier.get_compute_inputs(node_ref)
-            in_props[prop_change_key] = value
-            iteration_item = actual_node.final_compute(in_props, in_refs, in_querier)[src_port_key]
-            iter_outputs.append(iteration_item)
+        # Resolve the inputs of the node once for all values
+        in_props, in_refs, in_querier = ref_querier.get_compute_inputs(node_ref)
+        for iteration_results in actual_node.batch_compute(in_props, in_refs, in_querier, prop_change_key, values):
+            iter_outputs.append(iteration_results[src_port_key])
         ret_result = {'_main': iter_outputs}
         for key in self.extracted_props:
             # Compute cell
@@ -46,21 +46,27 @@ class ListSubsetNode(UnitNode):
     NODE_CATEGORY = NodeCategory.LIST_MODIFIER
     DEFAULT_NODE_INFO = DEF_LIST_SUBSET_INFO
 
-    def compute(self, props: ResolvedProps, *args):
+    def prepare_compute(self, props: ResolvedProps, *args) -> None:
+        # Update the index enums to the input list
         val_list = props.get('val_list')
         start_enum: Enum = props.get('start_idx_enum')
         stop_enum: Enum = props.get('stop_idx_enum')
         if not val_list:
             start_enum.set_options()
             stop_enum.set_options()
-            return {}
-
-        # Update enum
+            return
         new_options = list(range(len(val_list)))
         new_display_options = [str(i + 1) for i in new_options]
         start_enum.set_options(new_options, new_display_options)
         stop_enum.set_options(new_options, new_display_options)
 
+    def compute(self, props: ResolvedProps, *args):
+        val_list = props.get('val_list')
+        if not val_list:
+            return {}
+        start_enum: Enum = props.get('start_idx_enum')
+        stop_enum: Enum = props.get('stop_idx_enum')
+
         # Get start and stop indices
         start_idx: int = start_enum.selected_option
         stop_idx: int = stop_enum.selected_option
@@ -1,12 +1,15 @@
-from typing import cast
+import copy
+import time
+from typing import Hashable, Optional, cast
 
-from id_datatypes import PortId
+from id_datatypes import PortId, PropKey
 from node_graph import RefId
 from nodes.node_defs import PrivateNodeInfo, ResolvedProps, ResolvedRefs, RefQuerier, Node, PropDef, PortStatus, \
     NodeCategory, DisplayStatus
 from nodes.nodes import RandomisableNode
-from nodes.prop_types import PT_Int, PropType, PT_Enum, PT_List, find_closest_common_base
-from nodes.prop_values import List, Int, Enum
+from nodes.prop_types import PT_Int, PropType, PT_Enum, PT_List, PT_Bool, find_closest_common_base
+from nodes.prop_values import List, Int, Enum, Bool
+from parallel_compute import parallel_batch_compute, parallel_workers
 
 DEF_RANDOM_ITERATOR_INFO = PrivateNodeInfo(
     description="Create a specified number of random iterations, outputting a drawing.",
@@ -22,6 +25,14 @@ DEF_RANDOM_ITERATOR_INFO = PrivateNodeInfo(
             description="Number of random iterations of a node output to create, at least 1.",
             default_value=Int(3)
         ),
+        'parallel': PropDef(
+            prop_type=PT_Bool(),
+            display_name="Compute in parallel",
+            description="If ticked, iterations are spread over several processes when they take long enough to compute for this to be faster.",
+            default_value=Bool(False),
+            input_port_status=PortStatus.FORBIDDEN,
+            output_port_status=PortStatus.FORBIDDEN
+        ),
         'layout_enum': PropDef(
             prop_type=PT_Enum(),
             display_name="Visualisation layout",
@@ -46,6 +57,25 @@ class RandomIteratorNode(RandomisableNode):
     NODE_CATEGORY = NodeCategory.ITERATOR
     DEFAULT_NODE_INFO = DEF_RANDOM_ITERATOR_INFO
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Nodes saved before iterations could be computed in parallel get the option, off, after the iteration count
+        parallel_def: PropDef = DEF_RANDOM_ITERATOR_INFO.prop_defs['parallel']
+        prop_defs: dict[PropKey, PropDef] = self._node_info.prop_defs
+        if 'parallel' not in prop_defs:
+            items = list(prop_defs.items())
+            index: int = next((i + 1 for i, (key, _) in enumerate(items) if key == 'num_iterations'), len(items))
+            items.insert(index, ('parallel', parallel_def))
+            self._node_info.prop_defs = dict(items)
+        self.internal_props.setdefault('parallel', copy.deepcopy(parallel_def.default_value))
+
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        # Results are computed by a copy of the input node, so depend on how it computes and not just its output
+        state: Optional[Hashable] = super().cache_state(props, refs, ref_querier)
+        if state is None or refs.get('random_input') is None:
+            return state
+        return state, ref_querier.get_output_digest(refs.get('random_input'))
+
     def compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier):
         random_input = props.get('random_input')
         if random_input is None:
@@ -65,11 +95,17 @@ class RandomIteratorNode(RandomisableNode):
         rprops, rrefs, rquerier = ref_querier.get_compute_inputs(random_node_ref)
 
         # Calculate and set random compute result
-        items = []
-        for seed in seeds:
-            rprops['seed'] = seed
-            rrefs['seed'] = None
-            items.append(random_node.final_compute(rprops, rrefs, rquerier)[src_port.key])
+        rrefs['seed'] = None
+        start = time.perf_counter()
+        items = [results[src_port.key] for results in
+                 random_node.batch_compute(rprops, rrefs, rquerier, 'seed', seeds[:1])]
+        workers: int = parallel_workers(len(seeds) - 1, time.perf_counter() - start) if props.get('parallel') else 1
+        if workers > 1:
+            items += parallel_batch_compute(ref_querier.extract_cone(random_node_ref), src_port.node, src_port.key,
+                                            'seed', seeds[1:], workers)
+        else:
+            items += [results[src_port.key] for results in
+                      random_node.batch_compute(rprops, rrefs, rquerier, 'seed', seeds[1:])]
         my_type = random_input.type
         for item in items:
             if not item.type.is_compatible_with(my_type):
@@ -1,5 +1,5 @@
 import random
-from typing import Optional
+from typing import Hashable, Optional
 
 from id_datatypes import PortId, PropKey
 from node_graph import RefId
@@ -33,10 +33,28 @@ class RandomAnimatorNode(AnimatableNode):
     DEFAULT_NODE_INFO = DEF_RANDOM_ANIMATOR_INFO
 
     def __init__(self, internal_props: Optional[dict[PropKey, PropValue]] = None, add_info=None):
-        self._last_seed = random.random()
+        self._base_seed = random.random()
         super().__init__(internal_props, add_info)
 
-    def compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier):
+    def __setstate__(self, state):
+        # Nodes saved before frames were numbered keep the seed they were showing as their first frame
+        if '_last_seed' in state:
+            state['_base_seed'] = state.pop('_last_seed')
+        self.__dict__.update(state)
+
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        # Results are computed by a copy of the input node, so depend on how it computes and not just its output
+        state: Optional[Hashable] = super().cache_state(props, refs, ref_querier)
+        if state is None or refs.get('random_input') is None:
+            return state
+        return state, self._base_seed, ref_querier.get_output_digest(refs.get('random_input'))
+
+    def frame_seed(self, frame: int) -> float:
+        if frame == 0:
+            return self._base_seed
+        return random.Random(f"{self._base_seed}:{frame}").random()
+
+    def compute_at(self, frame: int, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier):
         random_input = props.get('random_input')
         if random_input is None:
             return {}
@@ -48,10 +66,8 @@ class RandomAnimatorNode(AnimatableNode):
         if not random_node.randomisable:
             return {'_main': random_input}
 
-        # Return random result
+        # Return the random result for this frame
         rprops, rrefs, rquerier = ref_querier.get_compute_inputs(random_node_ref)
-        if self.tick_reanimate():
-            self._last_seed = random.random()
-        rprops['seed'] = self._last_seed
+        rprops['seed'] = self.frame_seed(frame)
         rrefs['seed'] = None
         return {'_main': random_node.final_compute(rprops, rrefs, rquerier)[src_port.key]}
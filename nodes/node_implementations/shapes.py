@@ -1,6 +1,10 @@
 import math
 from typing import cast
 
+import numpy as np
+
+from id_datatypes import PropKey
+
 from nodes.node_defs import PrivateNodeInfo, ResolvedProps, PropDef, PortStatus, NodeCategory, DisplayStatus
 from nodes.node_implementations.blaze_maker import BlazeMakerNode
 from nodes.node_implementations.visualiser import get_rectangle
@@ -8,7 +12,7 @@ from nodes.node_input_exception import NodeInputException
 from nodes.nodes import UnitNode, CombinationNode
 from nodes.prop_types import PT_Number, PT_Point, PT_Fill, PT_Int, \
     PT_List, PT_PointsHolder, PT_Polyline, PT_Polygon, PT_Ellipse
-from nodes.prop_values import List, Int, Float, PointsHolder, Point, Colour, LineRef
+from nodes.prop_values import List, Int, Float, PointsHolder, Point, Colour, LineRef, PointArray
 from nodes.shape_datatypes import Ellipse, Polyline, Polygon
 
 DEF_SINE_WAVE_INFO = PrivateNodeInfo(
@@ -90,23 +94,27 @@ class SineWaveNode(UnitNode):
     NODE_CATEGORY = NodeCategory.LINE
     DEFAULT_NODE_INFO = DEF_SINE_WAVE_INFO
 
+    # Properties the wave's points can be computed for many values of at once
+    WAVE_PROPS = ('amplitude', 'wavelength', 'centre_y', 'phase', 'x_min', 'x_max')
+
     @staticmethod
-    def helper(amplitude, wavelength, centre_y, phase, x_min, x_max, stroke_width=1, stroke=Colour(), num_points=100,
-               orientation=0):
-        if x_min > x_max:
+    def wave_points(amplitude, wavelength, centre_y, phase, x_min, x_max, num_points=100):
+        # Arguments are numbers or (N, 1) arrays, giving N waves of num_points (x, y) points as an (N, num_points, 2) array
+        if np.any(np.greater(x_min, x_max)):
             raise ValueError("Wave start position must be smaller than wave stop position.")
-        points = List(PT_Point())
 
-        # Generate 100 evenly spaced x-values between x_min and x_max
-        x_values = [x_min + i * (x_max - x_min) / (num_points - 1) for i in range(num_points)]
+        # Generate evenly spaced x-values between x_min and x_max
+        x_values = x_min + np.arange(num_points) * np.subtract(x_max, x_min) / (num_points - 1)
 
-        # Calculate corresponding y-values using the sine wave formula
-        for x in x_values:
-            # Standard sine wave equation: y = A * sin(2π * x / λ + φ) + centre_y
-            # where A is amplitude, λ is wavelength, and φ is phase
-            y = amplitude * math.sin(2 * math.pi * x / wavelength + math.radians(phase)) + centre_y
-            points.append(Point(x, y))
+        # Standard sine wave equation: y = A * sin(2π * x / λ + φ) + centre_y
+        # where A is amplitude, λ is wavelength, and φ is phase
+        y_values = amplitude * np.sin(2 * math.pi * x_values / wavelength + np.radians(phase)) + centre_y
+        return np.stack(np.broadcast_arrays(x_values, y_values), axis=-1)
 
+    @staticmethod
+    def helper(amplitude, wavelength, centre_y, phase, x_min, x_max, stroke_width=1, stroke=Colour(), num_points=100,
+               orientation=0):
+        points = PointArray(SineWaveNode.wave_points(amplitude, wavelength, centre_y, phase, x_min, x_max, num_points))
         return Polyline(points, stroke, stroke_width).rotate(orientation, (0.5, 0.5))
 
     def compute(self, props: ResolvedProps, *args):
@@ -122,6 +130,19 @@ class SineWaveNode(UnitNode):
             raise NodeInputException(e)
         return {'_main': sine_wave}
 
+    def batch_compute(self, props: ResolvedProps, refs, ref_querier, prop_key: PropKey, values):
+        if prop_key not in SineWaveNode.WAVE_PROPS:
+            return super().batch_compute(props, refs, ref_querier, prop_key, values)
+        # Compute the points of every wave in one go, with the iterated property as a column of values
+        wave_args = {key: props.get(key) for key in SineWaveNode.WAVE_PROPS}
+        wave_args[prop_key] = np.array(values, dtype=float).reshape(-1, 1)
+        try:
+            waves = SineWaveNode.wave_points(**wave_args, num_points=props.get('num_points'))
+        except ValueError as e:
+            raise NodeInputException(e)
+        return [{'_main': Polyline(PointArray(points), props.get('stroke_colour'), props.get('stroke_width')).rotate(
+            props.get('orientation'), (0.5, 0.5))} for points in waves]
+
 
 DEF_CUSTOM_LINE_INFO = PrivateNodeInfo(
     description="Create a custom line by defining the points the line passes through. Coordinates are set in the context of a 1x1 canvas, with (0.5, 0.5) being the centre and (0,0) being the top-left corner.",
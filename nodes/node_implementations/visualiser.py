@@ -20,20 +20,20 @@ def add_background(element: Element, colour: Colour):
     return group
 
 
-def get_grid(width=1, height=1, x_warp=None, y_warp=None) -> Grid:
-    if x_warp is None:
-        x_warp = PosWarp(IdentityFun())
-    else:
-        assert isinstance(x_warp, PosWarp) or isinstance(x_warp, RelWarp)
+IDENTITY_WARP = PosWarp(IdentityFun())  # Shared, so its samples are cached between grids
+
 
-    if y_warp is None:
-        y_warp = PosWarp(IdentityFun())
+def get_grid_lines(num_cells=1, warp=None) -> list[float]:
+    # Positions of the lines dividing one axis of a grid into num_cells cells
+    if warp is None:
+        warp = IDENTITY_WARP
     else:
-        assert isinstance(y_warp, PosWarp) or isinstance(y_warp, RelWarp)
+        assert isinstance(warp, PosWarp) or isinstance(warp, RelWarp)
+    return warp.sample(num_cells + 1)
 
-    v_line_xs = x_warp.sample(width + 1)
-    h_line_ys = y_warp.sample(height + 1)
-    return Grid(v_line_xs, h_line_ys)
+
+def get_grid(width=1, height=1, x_warp=None, y_warp=None) -> Grid:
+    return Grid(get_grid_lines(width, x_warp), get_grid_lines(height, y_warp))
 
 
 def repeat_shapes(grid: Grid, elements: List[PT_Element], row_iter=True, scale_x=True, scale_y=True):
@@ -56,7 +56,8 @@ def repeat_shapes(grid: Grid, elements: List[PT_Element], row_iter=True, scale_x
         y2 = grid.h_line_ys[i + 1]
         x_sf = x2 - x1 if scale_x else 1 / cols
         y_sf = y2 - y1 if scale_y else 1 / rows
-        cell_group = Group([Scale(x_sf, y_sf), Translate(x1, y1)], debug_info=f"Cell ({i},{j})")
+        cell_group = Group([Scale(x_sf, y_sf), Translate(x1, y1)], debug_info=f"Cell ({i},{j})",
+                           name=f"cell_{i}_{j}")
         cell_group.add(next(element_it))
         ret_group.add(cell_group)
 
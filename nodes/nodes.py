@@ -1,8 +1,9 @@
 import copy
 import random
 from abc import ABC, abstractmethod
-from typing import Optional, cast
+from typing import Hashable, Optional, Sequence, cast
 
+from compute_cache import DigestSource, LazyDigest, child_digest, new_digest, resolve_digest
 from id_datatypes import PropKey, NodeId, PortId, EdgeId, input_port
 from node_graph import RefId
 from nodes.node_defs import Node, PrivateNodeInfo, ResolvedProps, ResolvedRefs, RefQuerier, PropDef, PortStatus, \
@@ -41,10 +42,30 @@ class SelectableNode(UnitNode, ABC):
         self.extracted_props: set[PropKey] = set()
         super().__init__(internal_props)
 
-    def final_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> dict[
-        PropKey, PropValue]:
+    def __getstate__(self):
+        # Sets are ordered by string hashes, which differ between sessions, so save the keys in a stable order
+        state = self.__dict__.copy()
+        state['extracted_props'] = sorted(self.extracted_props)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.extracted_props = set(self.extracted_props)
+
+    def snapshot(self) -> "SelectableNode":
+        # Computing removes redundant extracted ports, so each snapshot has its own prop defs
+        node: SelectableNode = cast(SelectableNode, super().snapshot())
+        node._node_info = PrivateNodeInfo(self._node_info.description, dict(self._node_info.prop_defs))
+        node.extracted_props = set(self.extracted_props)
+        return node
+
+    def prepare_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> None:
         self._remove_redundant_ports(props)
-        return self.compute(props, refs, ref_querier)
+
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        # Results include the extracted ports
+        state: Optional[Hashable] = super().cache_state(props, refs, ref_querier)
+        return None if state is None else (state, tuple(sorted(self.extracted_props)))
 
     @abstractmethod
     def extract_element(self, props: ResolvedProps, parent_group: Group, element_id: str) -> PropKey:
@@ -89,6 +110,10 @@ class RandomisableNode(UnitNode, ABC):
     def get_seed(self):
         return self.internal_props['seed']
 
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        # Without a seed, compute picks a random one
+        return super().cache_state(props, refs, ref_querier) if props.get('seed') is not None else None
+
     @property
     def randomisable(self):
         return True
@@ -100,6 +125,14 @@ class RandomisableNode(UnitNode, ABC):
 
 
 class AnimatableNode(UnitNode, ABC):
+    """
+    Node whose output steps through numbered animation frames, one every jump_time milliseconds of playback.
+
+    Outputs are computed by compute_at, which must be a pure function of the frame index and the node's inputs, so
+    that any frame can be computed directly (by seeking to its time) without stepping through the ones before it.
+    """
+    _frame: int = 0  # Nodes saved before frames were numbered restart from the first frame
+
     def __init__(self, internal_props: Optional[dict[PropKey, PropValue]] = None, add_info=None):
         self._node_info: PrivateNodeInfo = self._default_node_info()
         self._node_info.prop_defs['jump_time'] = PropDef(
@@ -108,8 +141,8 @@ class AnimatableNode(UnitNode, ABC):
             default_value=Float(200)
         )
         self._time_left = 0  # In milliseconds
+        self._frame = 0
         self._playing = False
-        self._reanimate_on_compute = False
         super().__init__(internal_props)
 
     @property
@@ -120,28 +153,59 @@ class AnimatableNode(UnitNode, ABC):
     def playing(self) -> bool:
         return self._playing
 
-    def tick_reanimate(self) -> bool:
-        reanimate = self._reanimate_on_compute
-        if reanimate:
-            self._reanimate_on_compute = False
-        return reanimate
-
-    def reanimate(self, time: float) -> bool:
+    @property
+    def frame(self) -> int:
+        return self._frame
+
+    def frame_at(self, time: float) -> int:
+        # Frame shown after time milliseconds of playback
+        return int(time // self.internal_props['jump_time'])
+
+    def seek(self, time: float) -> bool:
+        # Jump to the point time milliseconds into playback, returning True if the frame changed
+        jump_time: float = self.internal_props['jump_time']
+        old_frame: int = self._frame
+        self._frame = self.frame_at(time)
+        self._time_left = jump_time - time % jump_time
+        return self._frame != old_frame
+
+    def reanimate(self, time: float) -> int:
         # time is time in milliseconds that has passed
-        # Returns True if it moved to the next animation step
+        # Returns the number of frames moved on (0 if none), skipping any frames whose time has already passed
         assert self.playing
         self._time_left -= time
-        if self._time_left <= 0:
-            # Reset time left
-            self._time_left: float = self.internal_props['jump_time']  # Time in milliseconds
-            self._reanimate_on_compute = True
-        else:
-            self._reanimate_on_compute = False
-        return self._reanimate_on_compute
+        if self._time_left > 0:
+            return 0
+        jump_time: float = self.internal_props['jump_time']
+        steps: int = 1 + int(-self._time_left // jump_time)
+        self._frame += steps
+        self._time_left += steps * jump_time
+        return steps
+
+    def animation_key(self, compute_results: dict[PropKey, PropValue]) -> Optional[Hashable]:
+        # Key that is equal for any two frames with the same output, given the node's last compute results
+        # None if frames never repeat, which is assumed unless a subclass knows its animation loops
+        return None
+
+    def time_to_next_step(self) -> float:
+        # Time in milliseconds until reanimate moves to the next animation frame
+        return max(self._time_left, 0)
 
     def toggle_play(self) -> None:
         self._playing = not self._playing
 
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        state: Optional[Hashable] = super().cache_state(props, refs, ref_querier)
+        return None if state is None else (state, self._frame)
+
+    def compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> dict[PropKey, PropValue]:
+        return self.compute_at(self._frame, props, refs, ref_querier)
+
+    @abstractmethod
+    def compute_at(self, frame: int, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> dict[
+        PropKey, PropValue]:
+        pass
+
 
 class CombinationNode(Node, ABC):
     NAME = None
@@ -173,6 +237,12 @@ class CombinationNode(Node, ABC):
     def selection_index(self) -> int:
         return self._selection_index
 
+    def snapshot(self) -> "CombinationNode":
+        # Attributes other than the selection are set on the selected node, so snapshot that instead
+        node: CombinationNode = copy.copy(self)
+        node._node = self._node.snapshot()
+        return node
+
     def set_selection(self, index):
         self._selection_index = index
         old_internal_props = copy.deepcopy(self.internal_props)
@@ -192,17 +262,45 @@ class CombinationNode(Node, ABC):
     def node_info(self):
         return self._node.node_info
 
+    def prepare_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> None:
+        self._node.prepare_compute(props, refs, ref_querier)
+
+    def cache_state(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> Optional[Hashable]:
+        state: Optional[Hashable] = self._node.cache_state(props, refs, ref_querier)
+        return None if state is None else (type(self._node), state)
+
+    def derived_digest(self) -> Optional[DigestSource]:
+        return self._node.derived_digest()
+
     def compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> dict[PropKey, PropValue]:
         return self._node.compute(props, refs, ref_querier)
 
+    def batch_compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier, prop_key: PropKey,
+                      values: Sequence[PropValue]) -> list[dict[PropKey, PropValue]]:
+        return self._node.batch_compute(props, refs, ref_querier, prop_key, values)
+
     def visualise(self, compute_results: dict[PropKey, PropValue]) -> Optional[Visualisable]:
         return self._node.visualise(compute_results)
 
 
 class CustomNode(Node):
+    """
+    Node computing a subgraph of other nodes, saved as a custom node definition.
+
+    The sources of its inputs stay bound into the subgraph between computes, so each compute only recomputes the inner
+    nodes downstream of an input that was reconnected or recomputed, of a reseeded node or of an animation step.
+    """
     NAME = "Custom"
     NODE_CATEGORY = NodeCategory.UNKNOWN
     DEFAULT_NODE_INFO = None
+    CACHEABLE = False  # Its subgraph caches the results of its inner nodes
+    # State of the last compute, None until the first compute (including in nodes saved before it was kept)
+    _bound_edges: Optional[set[EdgeId]] = None  # Edges from the sources of the inputs into the subgraph
+    # Results each source was bound with, None for sources left from before the node was saved or copied
+    _bound_results: Optional[dict[NodeId, Optional[dict[PropKey, PropValue]]]] = None
+    _bound_seed = None
+    _plan: Optional[list[NodeId]] = None
+    _identity: Optional[bytes] = None  # Distinguishes its subgraph from those of other custom nodes in results digests
 
     @staticmethod
     def to_custom_key(node_id, port_key) -> PropKey:
@@ -301,43 +399,95 @@ class CustomNode(Node):
     def base_name(self):
         return self._name
 
-    def _replace_input_nodes(self, refs: ResolvedRefs, ref_querier: RefQuerier):
-        # Remove existing connections and source nodes
-        for edge in list(self.subgraph.edges):
-            if edge.dst_node in self.selected_ports and edge.dst_port in self.selected_ports[edge.dst_node]:
-                self.subgraph.remove_edge(edge)
-                self.sub_node_manager.remove_node(edge.src_node)
-
-        # Collate references
-        refs_by_key: dict[PropKey, set[RefId]] = {}
-        for key, value in refs.items():
-            if isinstance(value, list):
-                refs = {ref for ref in value if ref is not None}
-            else:
-                refs = {value} if value is not None else set()
-            refs_by_key[key] = refs
-
-        # Get edges to have and source nodes mapped to their ref
+    def __getstate__(self):
+        # The state of the last compute holds the results of the input sources, so isn't saved or copied with the node
+        # The next compute then takes over the connections left in the subgraph
+        state = self.__dict__.copy()
+        for key in ('_bound_edges', '_bound_results', '_bound_seed', '_plan'):
+            state.pop(key, None)
+        return state
+
+    def snapshot(self) -> "CustomNode":
+        # Computing replaces the input nodes of the subgraph and recomputes it, so snapshot the sub node manager too
+        node: CustomNode = cast(CustomNode, super().snapshot())
+        node.sub_node_manager = self.sub_node_manager.snapshot()
+        node.subgraph = node.sub_node_manager.node_graph
+        # Snapshots share the subgraph's state, so keep the state of the last compute
+        if self._bound_edges is not None:
+            node._bound_edges = set(self._bound_edges)
+            node._bound_results = dict(self._bound_results)
+        node._bound_seed = self._bound_seed
+        node._plan = self._plan
+        return node
+
+    def _bind_inputs(self, refs: ResolvedRefs, ref_querier: RefQuerier) -> None:
+        # Connect the current sources of the inputs into the subgraph, invalidating only the inner nodes downstream of
+        # edges that changed or of sources that have been recomputed since they were bound
+        if self._bound_edges is None:
+            self._adopt_inputs()
+        # Get edges to have into the subgraph and source nodes mapped to their ref
         edges_to_have: set[EdgeId] = set()
         source_nodes: dict[NodeId, RefId] = {}
-        this_node: NodeId = ref_querier.uid
-        for dst_key, ref_set in refs_by_key.items():
-            dst_port: PortId = input_port(node=this_node, key=dst_key)
-            # Get edges connected to the above input port
-            for ref in ref_set:
+        for key, value in refs.items():
+            for ref in (value if isinstance(value, list) else [value]):
+                if ref is None:
+                    continue
                 src_port: PortId = ref_querier.port(ref)
-                edges_to_have.add(EdgeId(src_port, dst_port))
+                node, inner_key = CustomNode.from_custom_key(key)
+                edges_to_have.add(EdgeId(src_port, input_port(node=node, key=inner_key)))
                 source_nodes[src_port.node] = ref
 
-        # Add source nodes and edges to internal graph and node manager
+        # Update the edges
+        for edge in self._bound_edges - edges_to_have:
+            self.subgraph.remove_edge(edge)
+            self.sub_node_manager.mark_dirty(edge.dst_node)
+        for edge in edges_to_have - self._bound_edges:
+            self.subgraph.add_edge(edge)
+            self.sub_node_manager.mark_dirty(edge.dst_node)
+        self._bound_edges = edges_to_have
+        # Update the source nodes, recognising recomputed ones by their new compute results
+        for src_node in set(self._bound_results) - set(source_nodes):
+            self.subgraph.remove_node(src_node)
+            self.sub_node_manager.remove_node(src_node)
+            del self._bound_results[src_node]
         for src_node, ref in source_nodes.items():
+            compute_results: dict[PropKey, PropValue] = ref_querier.get_compute_results(ref)
+            if self._bound_results.get(src_node) is compute_results:
+                continue
             self.subgraph.add_node(src_node)
-            self.sub_node_manager.add_node(src_node, ref_querier.node_copy(ref),
-                                           compute_results=ref_querier.get_compute_results(ref))
-        for edge in edges_to_have:
-            # Replace dest port id with original
-            node, key = CustomNode.from_custom_key(edge.dst_key)
-            self.subgraph.add_edge(EdgeId(edge.src_port, input_port(node=node, key=key)))
+            self.sub_node_manager.add_node(src_node, ref_querier.node_copy(ref), compute_results=compute_results,
+                                           results_digest=ref_querier.get_results_digest(ref))
+            self._bound_results[src_node] = compute_results
+            for dst_node in self.subgraph.output_nodes(src_node):
+                self.sub_node_manager.mark_dirty(dst_node)
+
+    def _adopt_inputs(self) -> None:
+        # Take over the connections left in the subgraph by earlier computes (before saving or copying the node), so
+        # edges bound again keep their port refs. The source nodes left are all replaced, as their results aren't known
+        self._bound_edges = {edge for edge in self.subgraph.edges if edge.dst_node in self.selected_ports
+                             and edge.dst_port in self.selected_ports[edge.dst_node]}
+        self._bound_results = {edge.src_node: None for edge in self._bound_edges}
+
+    def _reseed(self, seed) -> None:
+        # Reseed the randomisable inner nodes, which invalidates the nodes downstream of them, if the seed changed
+        if seed is None:
+            self.randomise()
+        elif seed == self._bound_seed:
+            return
+        rng = random.Random(seed)
+        for node in self.randomisable_nodes:
+            self.sub_node_manager.randomise(node, rng.random())
+        self._bound_seed = seed
+
+    def _compute_plan(self) -> list[NodeId]:
+        # Inner nodes that the exposed outputs and the visualised node depend on, in topological order
+        if self._plan is None:
+            needed: set[NodeId] = self.subgraph.upstream_nodes(self.vis_node)
+            for node, ports in self.selected_ports.items():
+                if any(not port.is_input for port in ports):
+                    needed |= self.subgraph.upstream_nodes(node)
+            self._plan = [node for node in self.node_topo_order if node in needed]
+        return self._plan
 
     def _update_internal_props(self, props):
         for prop_key, prop_val in props.items():
@@ -352,22 +502,19 @@ class CustomNode(Node):
         return self._node_info
 
     def compute(self, props: ResolvedProps, refs: ResolvedRefs, ref_querier: RefQuerier) -> dict[PropKey, PropValue]:
-        # Compute nodes in the subgraph
-        self._replace_input_nodes(refs, ref_querier)
+        self._bind_inputs(refs, ref_querier)
         # self._update_internal_props(props)
         if self.randomisable:
-            if props.get('seed') is None:
-                self.randomise()
-            rng = random.Random(props.get('seed'))
-            seeds = [rng.random() for _ in range(len(self.randomisable_nodes))]
-        seed_i = 0
-        for node in self.node_topo_order:
-            # Set random seed if appropriate
-            if self.sub_node_manager.node_info(node).randomisable:
-                self.sub_node_manager.randomise(node, seeds[seed_i])
-                seed_i += 1
-            # Compute
-            self.sub_node_manager.compute(node)
+            self._reseed(props.get('seed'))
+        # Compute the inner nodes invalidated by changed inputs, seeds or animation frames since the last compute
+        for node in self._compute_plan():
+            if self.sub_node_manager.is_dirty(node):
+                try:
+                    self.sub_node_manager.compute(node)
+                except Exception:
+                    # Keep it out of date, so it is computed again next time
+                    self.sub_node_manager.mark_dirty(node)
+                    raise
         # Gather and return compute results
         compute_results = {}
         for node, ports in self.selected_ports.items():
@@ -378,6 +525,23 @@ class CustomNode(Node):
                         compute_results[CustomNode.to_custom_key(node, port.key)] = compute_res
         return compute_results
 
+    def derived_digest(self) -> Optional[DigestSource]:
+        # Its results are those of its output nodes, so have been computed before if theirs have
+        if self._identity is None:
+            self._identity = new_digest()
+        identity: bytes = self._identity
+        outputs: list[tuple[int, DigestSource]] = [(node.value, self.sub_node_manager.digest_source(node))
+                                                   for node, ports in self.selected_ports.items()
+                                                   if any(not port.is_input for port in ports)]
+
+        def make_digest() -> bytes:
+            digest: bytes = identity
+            for node_value, source in outputs:
+                digest = child_digest(digest, (node_value, resolve_digest(source)))
+            return digest
+
+        return LazyDigest(make_digest)
+
     def visualise(self, *args) -> Optional[Visualisable]:
         return self.sub_node_manager.visualise(self.vis_node)
 
@@ -410,15 +574,29 @@ class CustomNode(Node):
     def playing(self) -> bool:
         return self._playing
 
-    def reanimate(self, time: float) -> bool:
+    def reanimate(self, time: float) -> int:
         # time is time in milliseconds that has passed
-        # Returns True if it moved to the next animation step
+        # Returns the most frames any sub-node moved on (0 if none)
         assert self.playing
         rel_time: float = self.internal_props['speed'] * time
-        update: bool = False
+        # Advance every sub-node, even once one has stepped
+        return max([self.sub_node_manager.reanimate(node, rel_time) for node in self.animatable_nodes], default=0)
+
+    def time_to_next_step(self) -> float:
+        return min((self.sub_node_manager.time_to_next_step(node) for node in self.animatable_nodes),
+                   default=float('inf')) / self.internal_props['speed']
+
+    def animation_key(self, compute_results: dict[PropKey, PropValue]) -> Optional[Hashable]:
+        sub_keys: tuple = tuple(self.sub_node_manager.animation_key(node) for node in self.animatable_nodes)
+        return None if None in sub_keys else sub_keys
+
+    def seek(self, time: float) -> bool:
+        # Sub-nodes play at the custom node's speed
+        rel_time: float = self.internal_props['speed'] * time
+        changed: bool = False
         for node in self.animatable_nodes:
-            update = update or self.sub_node_manager.reanimate(node, rel_time)
-        return update
+            changed = self.sub_node_manager.seek(node, rel_time) or changed
+        return changed
 
     def toggle_play(self) -> None:
         self.set_playing(not self._playing)
@@ -1,24 +1,59 @@
-import uuid
+import copy
+import functools
 from abc import ABC, abstractmethod
 from typing import TypeVar, Generic, Optional, cast
 
+import numpy as np
+
 from nodes.prop_types import PropType, PT_List, PT_Scalar, PT_Int, PT_Number, PT_String, PT_Bool, PT_Enum, \
     PT_Point, PT_PointsHolder, PT_Grid, PT_Element, PT_ElementHolder, PT_FillHolder, PT_Fill, PT_Colour, \
     PT_GradOffset, PT_Gradient, PT_ValProbPairHolder, PT_BlazeCircleDef
 
 
 class PropValue(ABC):
+    __slots__ = ()
 
     @property
     @abstractmethod
     def type(self) -> PropType:
         pass
 
+    def snapshot(self) -> "PropValue":
+        # Copy that shares the value's contents until one of the two is mutated
+        # Attributes are shared, so values whose contents are mutated in place must override this
+        if isinstance(self, (int, float, str, tuple)):
+            return self  # Immutable
+        return copy.copy(self)
+
 
 T = TypeVar('T', bound='PropType')
 
 
+@functools.cache
+def slot_names(cls: type) -> tuple[str, ...]:
+    # Names of the attributes of a class stored in __slots__, its bases' included
+    return tuple(name for klass in reversed(cls.__mro__) for name in klass.__dict__.get('__slots__', ())
+                 if name not in ('__dict__', '__weakref__'))
+
+
+class Slotted:
+    """
+    Base of values created in large numbers, whose attributes are kept in __slots__ instead of a __dict__.
+    They are pickled as a dict of their set attributes, so states pickled from a __dict__ load the same.
+    """
+    __slots__ = ()
+
+    def __getstate__(self) -> dict:
+        return {name: getattr(self, name) for name in slot_names(type(self)) if hasattr(self, name)}
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
 class List(Generic[T], PropValue):
+    _shared_items = False  # Whether the items list is shared with a snapshot, so must be copied before mutating
+
     def __init__(self, item_type: T = PropType(), items: Optional[list[PropValue]] = None, vertical_layout=True):
         self.item_type = item_type
         self.items: list[PropValue] = items if items is not None else []
@@ -83,9 +118,21 @@ class List(Generic[T], PropValue):
         # Re-nest flat items to match target depth
         return List.build_nested_list(flat.items, base_item_type, target_depth)
 
+    def snapshot(self) -> "List":
+        snapshot: List = copy.copy(self)
+        self._shared_items = snapshot._shared_items = True
+        return snapshot
+
+    def _own_items(self) -> None:
+        # Copy the items list before mutating it if it is shared with a snapshot
+        if self._shared_items:
+            self.items = list(self.items)
+            self._shared_items = False
+
     def append(self, item: PropValue) -> None:
         if not item.type.is_compatible_with(self.item_type):
             raise TypeError(f"Invalid type: expected {self.item_type}, got {item.type}")
+        self._own_items()
         self.items.append(item)
 
     def __add__(self, other: "List") -> "List":
@@ -107,10 +154,12 @@ class List(Generic[T], PropValue):
         return List(self.item_type, list(reversed(self.items)))
 
     def delete(self, idx: int):
+        self._own_items()
         del self.items[idx]
 
     def extend(self, other_list):
         assert isinstance(other_list, List) and other_list.item_type.is_compatible_with(self.item_type)
+        self._own_items()
         self.items += other_list.items
 
     def __bool__(self):
@@ -129,22 +178,34 @@ class List(Generic[T], PropValue):
         return f"List({repr(self.item_type)}, items={self.items})"
 
 class Int(int, PropValue):
+    __slots__ = ()
+
     def __new__(cls, value: int):
         return super().__new__(cls, value)
 
-    def __init__(self, value: int):
-        self.value = value
+    def __setstate__(self, state):
+        pass  # Earlier versions pickled the value as an attribute too
+
+    @property
+    def value(self) -> int:
+        return int(self)
 
     @property
     def type(self) -> PropType:
         return PT_Int(min_value=self.value, max_value=self.value)
 
 class Float(float, PropValue):
+    __slots__ = ()
+
     def __new__(cls, value: float):
         return super().__new__(cls, value)
 
-    def __init__(self, value: float):
-        self.value = value  # optional, but consistent with your Int class
+    def __setstate__(self, state):
+        pass  # Earlier versions pickled the value as an attribute too
+
+    @property
+    def value(self) -> float:
+        return float(self)
 
     def to_int(self) -> Int:
         return Int(int(self.value))
@@ -229,6 +290,8 @@ class Enum(PropValue):
 
 
 class PointsHolder(PropValue, ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def points(self) -> List[PT_Point]:
@@ -240,14 +303,11 @@ class PointsHolder(PropValue, ABC):
 
 
 class Point(tuple, PointsHolder):
+    __slots__ = ()
 
     def __new__(cls, x: float, y: float):
         return super().__new__(cls, (x, y))
 
-    def __init__(self, x: float, y: float):
-        # Optional: no need to store self.x/y, values are in the tuple
-        pass
-
     def __reduce__(self):
         return self.__class__, (self[0], self[1])
 
@@ -260,6 +320,115 @@ class Point(tuple, PointsHolder):
         return PT_Point()
 
 
+class PointArray(List[PT_Point]):
+    """
+    A list of points stored as an (N, 2) float array, so points can be transformed without per-point objects.
+
+    The points are held either as the array or as a list of Points, converted on demand. Reading items gives the list,
+    which is then the points until the array is next read, so the points can be changed through it as with any List.
+    """
+
+    def __init__(self, array=None, vertical_layout=True):
+        super().__init__(PT_Point(), vertical_layout=vertical_layout)
+        self.array = np.empty((0, 2)) if array is None else array
+
+    @staticmethod
+    def _to_array(points) -> np.ndarray:
+        return np.array([tuple(p) for p in points], dtype=float).reshape(-1, 2)
+
+    @staticmethod
+    def from_points(points) -> "PointArray":
+        if isinstance(points, PointArray):
+            return points
+        return PointArray(PointArray._to_array(points))
+
+    @property
+    def array(self) -> np.ndarray:
+        if self._array is None:
+            self._array = PointArray._to_array(self._items)
+            self._items = None
+        return self._array
+
+    @array.setter
+    def array(self, array) -> None:
+        self._array: Optional[np.ndarray] = np.asarray(array, dtype=float).reshape(-1, 2)
+        self._items: Optional[list[Point]] = None
+
+    @property
+    def items(self) -> list[Point]:
+        if self._items is None:
+            self._items = [Point(x, y) for x, y in self._array.tolist()]
+            self._array = None
+        return self._items
+
+    @items.setter
+    def items(self, items: list[Point]) -> None:
+        self._items = items
+        self._array = None
+
+    def __getstate__(self):
+        # Always pickle (and digest) the array, so equal points give equal states
+        state = self.__dict__.copy()
+        state.pop('_items', None)
+        state['_array'] = self._array if self._items is None else PointArray._to_array(self._items)
+        return state
+
+    def __setstate__(self, state):
+        array = state.pop('_array', state.pop('array', None))
+        self.__dict__.update(state)
+        self.array = array
+
+    def append(self, item: Point) -> None:
+        if not item.type.is_compatible_with(self.item_type):
+            raise TypeError(f"Invalid type: expected {self.item_type}, got {item.type}")
+        if self._items is not None:
+            self._own_items()
+            self._items.append(item)
+        else:
+            self.array = np.vstack((self._array, (item[0], item[1])))
+
+    def __add__(self, other: List) -> List:
+        if isinstance(other, List) and isinstance(other.item_type, PT_Point):
+            return PointArray(np.vstack((self.array, PointArray.from_points(other).array)), self.vertical_layout)
+        return super().__add__(other)
+
+    def reversed(self) -> "PointArray":
+        return PointArray(self.array[::-1])
+
+    def delete(self, idx: int):
+        if self._items is not None:
+            self._own_items()
+            del self._items[idx]
+        else:
+            self.array = np.delete(self._array, idx, axis=0)
+
+    def extend(self, other_list):
+        assert isinstance(other_list, List) and other_list.item_type.is_compatible_with(self.item_type)
+        self.array = np.vstack((self.array, PointArray.from_points(other_list).array))
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        if self._items is not None:
+            return iter(self._items)
+        return (Point(x, y) for x, y in self._array.tolist())
+
+    def __getitem__(self, index: int | slice) -> Point | list[Point]:
+        if self._items is not None:
+            return self._items[index]
+        if isinstance(index, slice):
+            return [Point(x, y) for x, y in self._array[index].tolist()]
+        x, y = self._array[index].tolist()
+        return Point(x, y)
+
+    def __len__(self) -> int:
+        return len(self._items) if self._items is not None else len(self._array)
+
+    def __repr__(self):
+        return f"PointArray({self.array.tolist()})"
+
+
 class Grid(PropValue):
     def __init__(self, v_line_xs: list[float], h_line_ys: list[float]):
         self.v_line_xs = v_line_xs
@@ -287,6 +456,8 @@ class PortRefTableEntry(PropValue, ABC):
 
 
 class ElementHolder(PropValue, ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def element(self) -> PT_Element:
@@ -312,6 +483,8 @@ class ElementRef(ElementHolder, PortRefTableEntry):
 
 
 class FillHolder(PropValue, ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def fill(self):
@@ -337,6 +510,7 @@ class FillRef(FillHolder, PortRefTableEntry):
 
 
 class Fill(FillHolder):
+    __slots__ = ()
 
     @property
     def fill(self):
@@ -348,12 +522,11 @@ class Fill(FillHolder):
 
 
 class Colour(tuple, Fill):
+    __slots__ = ()
+
     def __new__(cls, red: int = 0, green: int = 0, blue: int = 0, alpha: float = 255):
         return super().__new__(cls, (int(red), int(green), int(blue), alpha))
 
-    def __init__(self, red: float = 0, green: float = 0, blue: float = 0, alpha: float = 255):
-        pass  # No need to store attributes separately; values are in the tuple
-
     def __reduce__(self):
         return self.__class__, (self[0], self[1], self[2], self[3])
 
@@ -378,14 +551,6 @@ class Gradient(Fill):
         self.end_coord = end_coord
         self.stops = stops  # Assume this is sorted by ascending offset
 
-    def get(self, dwg):
-        grad_id = str(uuid.uuid4())
-        gradient = dwg.linearGradient(id=grad_id, start=self.start_coord, end=self.end_coord)
-        for stop in self.stops:
-            gradient.add_stop_color(offset=stop.offset, opacity=stop.colour.opacity, color=stop.colour.colour)
-        dwg.defs.add(gradient)
-        return f'url(#{grad_id})'
-
     @property
     def type(self) -> PropType:
         return PT_Gradient()
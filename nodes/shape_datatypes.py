@@ -1,18 +1,21 @@
+import itertools
 import math
-import uuid
+
+import numpy as np
 from abc import ABC, abstractmethod
 from typing import Optional
 
-from nodes.drawers.element_drawer import ElementDrawer
+from nodes.drawers.element_drawer import ElementDrawer, ROOT_ID
+from nodes.drawers.svg_writer import SvgWriter, format_points, format_matrix
 from nodes.prop_types import PT_Ellipse, PT_Polyline, PT_Shape, PT_Polygon, PT_Element, PT_Point
-from nodes.prop_values import List, PointsHolder, Point, ElementHolder, Fill, Colour, Gradient
+from nodes.prop_values import List, PointsHolder, Point, ElementHolder, Fill, Colour, Gradient, Slotted
 from nodes.transforms import TransformList, Translate, Scale, Rotate
 from vis_types import Visualisable
 
 
-def process_fill(fill: Fill, dwg):
+def process_fill(fill: Fill, writer: SvgWriter):
     if isinstance(fill, Gradient):
-        colour = fill.get(dwg)
+        colour = writer.fill_url(fill)
         opacity = 1
     else:
         assert isinstance(fill, Colour)
@@ -21,14 +24,34 @@ def process_fill(fill: Fill, dwg):
     return colour, opacity
 
 
-class Element(ElementHolder, Visualisable, ABC):
+def compose_matrices(outer: Optional[np.ndarray], inner: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    # None stands for the identity, so untransformed shapes need no matrix
+    if outer is None:
+        return inner
+    if inner is None:
+        return outer
+    return outer @ inner
+
+
+class Element(Slotted, ElementHolder, Visualisable, ABC):
+    """
+    Drawing. In SVG, each element's ID is its position in the drawing: the root's ID followed by the names of the
+    elements down to it, such as "node7/cell_3_4/0". Elements are named by their index in their group unless given a
+    name, so the same drawing is always written with the same IDs.
+    """
+    __slots__ = ('name', 'debug_info')
 
-    def __init__(self, debug_info=None):
-        self.uid = str(uuid.uuid4())
+    def __init__(self, debug_info=None, name: Optional[str] = None):
+        self.name = name
         self.debug_info = debug_info
 
+    def __setstate__(self, state: dict) -> None:
+        # Earlier versions pickled a random ID instead of a name
+        self.name = None
+        super().__setstate__({key: value for key, value in state.items() if key != 'uid'})
+
     @abstractmethod
-    def get(self, dwg):
+    def write_svg(self, writer: SvgWriter, element_id: str):
         pass
 
     @abstractmethod
@@ -51,36 +74,124 @@ class Element(ElementHolder, Visualisable, ABC):
     def type(self):
         pass
 
+    def count_occurrences(self, counts: dict[int, int]):
+        # Add the number of times each element appears below this one to counts, keyed by object ID
+        pass
+
     @property
     def element(self) -> "Element":
         return self
 
-    def save_to_svg(self, filepath, width, height):
-        ElementDrawer(filepath, width, height, self).save()
+    def svg_bytes(self, width, height, flatten_transforms=False, instance_repeats=True, root_id=ROOT_ID) -> bytes:
+        return ElementDrawer(width, height, self, flatten_transforms, instance_repeats, root_id).svg_bytes()
+
+    def save_to_svg(self, filepath, width, height, flatten_transforms=False, instance_repeats=True, root_id=ROOT_ID):
+        ElementDrawer(width, height, self, flatten_transforms, instance_repeats, root_id).save(filepath)
 
 
 class Group(Element, PointsHolder):
+    __slots__ = ('elements', 'transform_list', '_own_matrix')
 
-    def __init__(self, transforms=None, debug_info=None):
-        super().__init__(debug_info)
+    def __init__(self, transforms=None, debug_info=None, name: Optional[str] = None):
+        super().__init__(debug_info, name)
         self.elements = []
         self.transform_list = TransformList(transforms)
-
-    def get(self, dwg):
-        transform_str = self.transform_list.get_transform_str()
-        if transform_str:
-            group = dwg.g(transform=transform_str, id=self.uid)
+        self._own_matrix: Optional[tuple[Optional[np.ndarray]]] = None  # Cache of matrix(), built on demand
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_own_matrix', None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        super().__setstate__(state)
+        self._own_matrix = None
+
+    def child_names(self) -> list[str]:
+        # Name of each element in the group: its own, or its index if it has none or an earlier element has it
+        names: list[str] = []
+        taken: set[str] = set()
+        for i, element in enumerate(self.elements):
+            name: str = element.name if element.name is not None and element.name not in taken else str(i)
+            taken.add(name)
+            names.append(name)
+        return names
+
+    def write_svg(self, writer: SvgWriter, element_id: str):
+        if writer.flatten_transforms:
+            self._write_flattened(writer, element_id)
+            return
+        writer.begin_group(element_id, self.transform_list.get_transform_str())
+        for element, name in zip(self.elements, self.child_names()):
+            writer.write_element(element, f"{element_id}/{name}")
+        writer.end_group()
+
+    def _write_flattened(self, writer: SvgWriter, element_id: str):
+        # Only the group and its direct children are kept (so child elements can still be selected by ID),
+        # with this group's own transformations folded into the matrices below
+        matrix: Optional[np.ndarray] = self.matrix()
+        writer.begin_group(element_id)
+        for element, name in zip(self.elements, self.child_names()):
+            child_id: str = f"{element_id}/{name}"
+            if isinstance(element, Group):
+                writer.begin_group(child_id)
+                # Instanced elements are placed like shapes, by the matrix of the group they are in
+                leaves = element._iter_placed(None, child_id, writer)
+            else:
+                leaves = [(element, None, child_id)]
+            # Consecutive leaves from the same group share a matrix, which is written once on a wrapping group
+            for _, run in itertools.groupby(leaves, key=lambda leaf: id(leaf[1])):
+                run: list[tuple[Element, Optional[np.ndarray], str]] = list(run)
+                leaf_matrix: Optional[np.ndarray] = compose_matrices(matrix, run[0][1])
+                if len(run) == 1 or leaf_matrix is None:
+                    for leaf, _, leaf_id in run:
+                        Group._write_leaf(leaf, leaf_id, writer, leaf_matrix)
+                else:
+                    writer.begin_group(None, format_matrix(leaf_matrix))
+                    for leaf, _, leaf_id in run:
+                        Group._write_leaf(leaf, leaf_id, writer, None)
+                    writer.end_group()
+            if isinstance(element, Group):
+                writer.end_group()
+        writer.end_group()
+
+    @staticmethod
+    def _write_leaf(leaf: "Element", leaf_id: str, writer: SvgWriter, matrix: Optional[np.ndarray]):
+        if writer.is_instanced(leaf):
+            writer.use(leaf, matrix)
         else:
-            group = dwg.g(id=self.uid)
+            leaf.write_svg(writer, leaf_id, matrix)
+
+    def _iter_placed(self, parent_matrix: Optional[np.ndarray], element_id: str, writer: SvgWriter):
+        # Every shape in the group, or element the writer instances, with the single affine matrix placing it (None
+        # if untransformed) and its ID. Each group's matrix is composed once and shared by all shapes directly inside it
+        matrix = compose_matrices(parent_matrix, self.matrix())
+        for element, name in zip(self.elements, self.child_names()):
+            child_id: str = f"{element_id}/{name}"
+            if isinstance(element, Group) and not writer.is_instanced(element):
+                yield from element._iter_placed(matrix, child_id, writer)
+            else:
+                yield element, matrix, child_id
+
+    def count_occurrences(self, counts: dict[int, int]):
         for element in self.elements:
-            group.add(element.get(dwg))
-        return group
+            count: int = counts.get(id(element), 0)
+            counts[id(element)] = count + 1
+            # Everything below an element is counted once, however often it appears
+            if count == 0:
+                element.count_occurrences(counts)
+
+    def matrix(self) -> Optional[np.ndarray]:
+        # The group's own transformations as one matrix, None if it has none
+        if self._own_matrix is None:
+            self._own_matrix = (self.transform_list.matrix() if self.transform_list.transforms else None,)
+        return self._own_matrix[0]
 
     def get_element_index_from_id(self, element_id: str) -> Optional[int]:
-        for i, elem in enumerate(self.elements):
-            if elem.uid == element_id:
-                return i
-        return None
+        # Index of the element written with the given ID as a child of this group
+        name: str = element_id.rpartition('/')[2]
+        names: list[str] = self.child_names()
+        return names.index(name) if name in names else None
 
     def __iter__(self):
         for element in self.elements:
@@ -143,7 +254,7 @@ class Group(Element, PointsHolder):
 
     def __repr__(self):
         debug_str = f"\"{self.debug_info}\"" if self.debug_info else ""
-        result = f"Group ({self.uid}) [{repr(self.transform_list)}] {debug_str} {{\n"
+        result = f"Group ({self.name}) [{repr(self.transform_list)}] {debug_str} {{\n"
         for elem in self.elements:
             # Get multiline representation and indent each line
             lines = repr(elem).splitlines()
@@ -154,6 +265,7 @@ class Group(Element, PointsHolder):
 
 
 class Shape(Element, ABC):
+    __slots__ = ()
 
     def translate(self, tx, ty):
         group = Group().translate(tx, ty)
@@ -178,10 +290,11 @@ class Shape(Element, ABC):
         return PT_Shape()
 
     def __repr__(self):
-        return f"Shape ({self.uid}) {self.__class__.__name__.upper()}"
+        return f"Shape ({self.name}) {self.__class__.__name__.upper()}"
 
 
 class Polyline(Shape, PointsHolder):
+    __slots__ = ('_points', 'stroke', 'stroke_width')
 
     def __init__(self, points: List[PT_Point], stroke: Fill = Colour(0, 0, 0, 255), stroke_width=1):
         super().__init__()
@@ -193,15 +306,11 @@ class Polyline(Shape, PointsHolder):
     def points(self) -> List[PT_Point]:
         return self._points
 
-    def get(self, dwg):
-        stroke, stroke_opacity = process_fill(self.stroke, dwg)
-        return dwg.polyline(points=self.points,
-                            stroke=stroke,
-                            stroke_opacity=stroke_opacity,
-                            stroke_width=self.stroke_width,
-                            fill='none',
-                            style='vector-effect: non-scaling-stroke',
-                            id=self.uid)
+    def write_svg(self, writer: SvgWriter, element_id: str, matrix=None):
+        stroke, stroke_opacity = process_fill(self.stroke, writer)
+        writer.shape('polyline', element_id, f'points="{format_points(self.points)}"',
+                     f"fill:none;stroke:{stroke};stroke-opacity:{stroke_opacity};stroke-width:{self.stroke_width};"
+                     f"vector-effect:non-scaling-stroke", matrix)
 
     @property
     def type(self):
@@ -209,6 +318,7 @@ class Polyline(Shape, PointsHolder):
 
 
 class Polygon(Shape):
+    __slots__ = ('points', 'fill', 'stroke', 'stroke_width')
 
     def __init__(self, points, fill: Fill, stroke: Fill = Colour(), stroke_width=0):
         super().__init__()
@@ -217,17 +327,12 @@ class Polygon(Shape):
         self.stroke = stroke
         self.stroke_width = stroke_width
 
-    def get(self, dwg):
-        fill, fill_opacity = process_fill(self.fill, dwg)
-        stroke, stroke_opacity = process_fill(self.stroke, dwg)
-        return dwg.polygon(points=self.points,
-                           fill=fill,
-                           fill_opacity=fill_opacity,
-                           stroke=stroke,
-                           stroke_opacity=stroke_opacity,
-                           stroke_width=self.stroke_width,
-                           style='vector-effect: non-scaling-stroke',
-                           id=self.uid)
+    def write_svg(self, writer: SvgWriter, element_id: str, matrix=None):
+        fill, fill_opacity = process_fill(self.fill, writer)
+        stroke, stroke_opacity = process_fill(self.stroke, writer)
+        writer.shape('polygon', element_id, f'points="{format_points(self.points)}"',
+                     f"fill:{fill};fill-opacity:{fill_opacity};stroke:{stroke};stroke-opacity:{stroke_opacity};"
+                     f"stroke-width:{self.stroke_width};vector-effect:non-scaling-stroke", matrix)
 
     @property
     def type(self):
@@ -235,6 +340,7 @@ class Polygon(Shape):
 
 
 class Ellipse(Shape):
+    __slots__ = ('center', 'r', 'fill', 'stroke', 'stroke_width')
 
     def __init__(self, center, r, fill: Fill, stroke: Fill = Colour(), stroke_width=0):
         super().__init__()
@@ -244,18 +350,13 @@ class Ellipse(Shape):
         self.stroke = stroke
         self.stroke_width = stroke_width
 
-    def get(self, dwg):
-        fill, fill_opacity = process_fill(self.fill, dwg)
-        stroke, stroke_opacity = process_fill(self.stroke, dwg)
-        return dwg.ellipse(center=self.center,
-                           r=self.r,
-                           fill=fill,
-                           fill_opacity=fill_opacity,
-                           stroke=stroke,
-                           stroke_opacity=stroke_opacity,
-                           stroke_width=self.stroke_width,
-                           style='vector-effect: non-scaling-stroke',
-                           id=self.uid)
+    def write_svg(self, writer: SvgWriter, element_id: str, matrix=None):
+        fill, fill_opacity = process_fill(self.fill, writer)
+        stroke, stroke_opacity = process_fill(self.stroke, writer)
+        writer.shape('ellipse', element_id,
+                     f'cx="{self.center[0]}" cy="{self.center[1]}" rx="{self.r[0]}" ry="{self.r[1]}"',
+                     f"fill:{fill};fill-opacity:{fill_opacity};stroke:{stroke};stroke-opacity:{stroke_opacity};"
+                     f"stroke-width:{self.stroke_width};vector-effect:non-scaling-stroke", matrix)
 
     @property
     def type(self):
@@ -1,22 +1,32 @@
 import math
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 from nodes.prop_types import PT_Point
-from nodes.prop_values import List, Point
+from nodes.prop_values import List, Point, PointArray, Slotted
 
 
-class Transform(ABC):
+class Transform(Slotted, ABC):
+    __slots__ = ()
 
     @abstractmethod
     def apply_to_point(self, point: Point) -> Point:
         pass
 
+    @abstractmethod
+    def matrix(self) -> np.ndarray:
+        # 3x3 affine matrix acting on column vectors (x, y, 1)
+        pass
+
     @abstractmethod
     def __repr__(self):
         pass
 
 
 class Translate(Transform):
+    __slots__ = ('tx', 'ty')
+
     def __init__(self, tx, ty):
         self.tx = tx
         self.ty = ty
@@ -24,11 +34,18 @@ class Translate(Transform):
     def apply_to_point(self, point: Point) -> Point:
         return Point(point[0] + self.tx, point[1] + self.ty)
 
+    def matrix(self) -> np.ndarray:
+        return np.array([[1, 0, self.tx],
+                         [0, 1, self.ty],
+                         [0, 0, 1]], dtype=float)
+
     def __repr__(self):
         return f"translate({self.tx},{self.ty})"
 
 
 class Scale(Transform):
+    __slots__ = ('sx', 'sy')
+
     def __init__(self, sx, sy):
         self.sx = sx
         self.sy = sy
@@ -36,11 +53,18 @@ class Scale(Transform):
     def apply_to_point(self, point: Point) -> Point:
         return Point(point[0] * self.sx, point[1] * self.sy)
 
+    def matrix(self) -> np.ndarray:
+        return np.array([[self.sx, 0, 0],
+                         [0, self.sy, 0],
+                         [0, 0, 1]], dtype=float)
+
     def __repr__(self):
         return f"scale({self.sx},{self.sy})"
 
 
 class Rotate(Transform):
+    __slots__ = ('angle', 'centre')
+
     def __init__(self, angle, centre):
         self.angle = angle
         self.centre = centre
@@ -61,11 +85,21 @@ class Rotate(Transform):
         y = rotated_y + self.centre[1]
         return Point(x, y)
 
+    def matrix(self) -> np.ndarray:
+        # Rotation about the centre: translate to the origin, rotate, translate back
+        angle_radians = math.radians(self.angle)
+        cos, sin = math.cos(angle_radians), math.sin(angle_radians)
+        cx, cy = self.centre[0], self.centre[1]
+        return np.array([[cos, -sin, cx - cx * cos + cy * sin],
+                         [sin, cos, cy - cx * sin - cy * cos],
+                         [0, 0, 1]], dtype=float)
+
     def __repr__(self):
         return f"rotate({self.angle},{self.centre[0]},{self.centre[1]})"
 
 
-class TransformList:
+class TransformList(Slotted):
+    __slots__ = ('transforms',)
 
     def __init__(self, transforms=None):
         if transforms:
@@ -92,11 +126,14 @@ class TransformList:
             return repr(self)
         return None
 
-    def transform_points(self, points: List[PT_Point]) -> List[PT_Point]:
-        new_points = List(PT_Point())
-        for p in points:
-            new_point = p
-            for t in self:
-                new_point = t.apply_to_point(new_point)
-            new_points.append(new_point)
-        return new_points
+    def matrix(self) -> np.ndarray:
+        # Compose all transformations into a single affine matrix
+        matrix = np.identity(3)
+        for t in self:
+            matrix = t.matrix() @ matrix
+        return matrix
+
+    def transform_points(self, points: List[PT_Point]) -> PointArray:
+        matrix = self.matrix()
+        array = PointArray.from_points(points).array
+        return PointArray(array @ matrix[:2, :2].T + matrix[:2, 2])
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 import numpy as np
 
@@ -6,10 +7,32 @@ from nodes.function_datatypes import Function
 from nodes.prop_types import PT_Warp
 from nodes.prop_values import PropValue
 
+MAX_CACHED_SAMPLES = 8  # Number of sample counts whose samples each warp keeps
+
 
 class Warp(PropValue, ABC):
+    _samples: Optional[dict[int, np.ndarray]] = None  # Cache of samples by number of samples, built on demand
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_samples', None)
+        return state
+
+    def sample(self, num_samples) -> np.ndarray:
+        # Samples are shared between calls, so are read only
+        if self._samples is None:
+            self._samples = {}
+        samples: Optional[np.ndarray] = self._samples.get(num_samples)
+        if samples is None:
+            samples = self._sample(num_samples)
+            samples.setflags(write=False)
+            if len(self._samples) >= MAX_CACHED_SAMPLES:
+                del self._samples[next(iter(self._samples))]
+            self._samples[num_samples] = samples
+        return samples
+
     @abstractmethod
-    def sample(self, num_samples):
+    def _sample(self, num_samples) -> np.ndarray:
         pass
 
     @property
@@ -26,9 +49,7 @@ def normalise(l: np.ndarray):
 
 
 def sample_fun(function: Function, num_samples):
-    f = function.get()
-    indices = np.linspace(0, 1, num_samples)
-    return np.array([f(i) for i in indices])
+    return function.sample(np.linspace(0, 1, num_samples))
 
 
 class PosWarp(Warp):
@@ -37,7 +58,7 @@ class PosWarp(Warp):
         self.pos_function = pos_function
         self.sample(1000)  # Validation
 
-    def sample(self, num_samples):
+    def _sample(self, num_samples):
         unnorm_pos = sample_fun(self.pos_function, num_samples)
         return normalise(unnorm_pos)
 
@@ -48,10 +69,8 @@ class RelWarp(Warp):
         self.rel_function = rel_function
         self.sample(1000)  # Validation
 
-    def sample(self, num_samples):
-        rel_f = self.rel_function.get()
-        indices = np.linspace(0, 1, num_samples)
-        unnorm_pos = np.zeros(num_samples)
-        for i in range(1, num_samples):
-            unnorm_pos[i] = unnorm_pos[i - 1] + rel_f(indices[i])
+    def _sample(self, num_samples):
+        # Each position is the previous one plus the relative function at it
+        rel_values = self.rel_function.sample(np.linspace(0, 1, num_samples)[1:])
+        unnorm_pos = np.concatenate(([0.0], np.cumsum(rel_values, dtype=float)))
         return normalise(unnorm_pos)
@@ -0,0 +1,85 @@
+"""
+Process-pool computation of one node for many values of a property, for nodes whose iterations are independent.
+
+The node's upstream cone, compute results included, is pickled once per compute and sent with each worker's share of
+the values, so every worker resolves the node's inputs once and computes its share with Node.batch_compute. Results
+come back in the order of the values. Starting worker processes is slow, so the pool is kept between computes, and
+callers should only use it when parallel_workers says the work is worth spreading. If the cone can't be pickled or
+the pool can't be used, the values are computed serially instead.
+"""
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Sequence
+
+from id_datatypes import NodeId, PropKey
+from nodes.prop_values import PropValue
+
+MIN_SERIAL_S = 2.0  # Estimated serial compute time below which the pool isn't used
+MIN_ITEM_S = 0.01  # Estimated time per value below which shipping the values and results costs more than it saves
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+
+
+def parallel_workers(num_values: int, item_s: float) -> int:
+    # Number of workers to compute num_values values with, each estimated to take item_s, or 1 to compute serially
+    workers: int = min(os.cpu_count() or 1, num_values)
+    if workers < 2 or item_s < MIN_ITEM_S or item_s * num_values < MIN_SERIAL_S:
+        return 1
+    return workers
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers < max_workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        # Spawn rather than fork, as forking a process that has started Qt is unsafe
+        _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        _executor_workers = max_workers
+    return _executor
+
+
+def _discard_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _compute_cone(cone, node: NodeId, output_key: PropKey, prop_key: PropKey,
+                  values: Sequence[PropValue]) -> list[PropValue]:
+    props, refs, ref_querier = cone.get_compute_inputs(node)
+    refs[prop_key] = None
+    # Compute with a snapshot, as the cone shares its nodes with the node manager it was extracted from
+    results = cone.node_map[node].node.snapshot().batch_compute(props, refs, ref_querier, prop_key, values)
+    return [value_results[output_key] for value_results in results]
+
+
+def _compute_values(payload: bytes, values: Sequence[PropValue]) -> list[PropValue]:
+    cone, node, output_key, prop_key = pickle.loads(payload)
+    return _compute_cone(cone, node, output_key, prop_key, values)
+
+
+def parallel_batch_compute(cone, node: NodeId, output_key: PropKey, prop_key: PropKey, values: Sequence[PropValue],
+                           workers: int) -> list[PropValue]:
+    # cone is a node manager holding the node and everything upstream of it (see NodeManager.extract_cone)
+    # Returns the node's output_key result for each value of prop_key, in order
+    try:
+        payload: bytes = pickle.dumps((cone, node, output_key, prop_key), protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError):
+        # Part of the cone can't be sent to the workers, so compute the values here
+        return _compute_cone(cone, node, output_key, prop_key, values)
+    # One contiguous share of the values per worker, so the payload is only sent to each worker once
+    share: int = -(-len(values) // workers)
+    shares: list[Sequence[PropValue]] = [values[i:i + share] for i in range(0, len(values), share)]
+    try:
+        futures = [_get_executor(workers).submit(_compute_values, payload, values_share) for values_share in shares]
+        return [result for future in futures for result in future.result()]
+    except (BrokenProcessPool, OSError, pickle.PicklingError):
+        # The pool couldn't be started or a worker died, so start a new pool next time and compute these values here
+        _discard_executor()
+        return _compute_cone(cone, node, output_key, prop_key, values)
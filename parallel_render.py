@@ -0,0 +1,78 @@
+"""
+Process-pool rendering of independent canvas sink cones and seed sweeps.
+
+Each render job only needs the upstream cone of the node it renders, so every cone is extracted into its own
+NodeManager and shipped to the workers as a pickle once, when the pool starts. Jobs then only name a cone, a node and
+a seed, and results stream back as SVG bytes in completion order.
+"""
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from id_datatypes import NodeId, vis_root_id
+from node_manager import NodeManager
+from nodes.shape_datatypes import Element
+from pipeline_format import dump_chunk
+from vis_types import Visualisable, ErrorFig
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    cone_key: str
+    node: NodeId
+    seed: Optional[int]
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class RenderResult:
+    job: RenderJob
+    svg: bytes
+    error: Optional[str]
+
+
+def render_svg(node_manager: NodeManager, node: NodeId, width: int, height: int) -> tuple[bytes, Optional[str]]:
+    vis: Visualisable = node_manager.visualise(node)
+    svg: bytes = vis.svg_bytes(width, height, root_id=vis_root_id(node)) if isinstance(vis, Element) else \
+        vis.svg_bytes(width, height)
+    error: Optional[str] = f"{vis.title}: {vis.content}" if isinstance(vis, ErrorFig) else None
+    return svg, error
+
+
+# Worker state, set up once per worker process
+_cone_payloads: dict[str, bytes] = {}
+_cone_managers: dict[str, NodeManager] = {}
+
+
+def _init_worker(cone_payloads: dict[str, bytes]) -> None:
+    global _cone_payloads
+    _cone_payloads = cone_payloads
+    _cone_managers.clear()
+
+
+def _render_job(job: RenderJob) -> RenderResult:
+    node_manager: Optional[NodeManager] = _cone_managers.get(job.cone_key)
+    if node_manager is None:
+        node_manager = _cone_managers[job.cone_key] = pickle.loads(_cone_payloads[job.cone_key])
+    if job.seed is not None:
+        node_manager.reseed(job.seed)
+    svg, error = render_svg(node_manager, job.node, job.width, job.height)
+    return RenderResult(job, svg, error)
+
+
+def render_parallel(cones: dict[str, NodeManager], jobs: list[RenderJob],
+                    max_workers: Optional[int] = None) -> Iterator[RenderResult]:
+    # Yields results as soon as each job finishes (not in job order)
+    # Workers recompute every node anyway, so compute results aren't shipped
+    cone_payloads: dict[str, bytes] = {key: dump_chunk(cone_manager) for key, cone_manager in cones.items()}
+    max_workers = min(max_workers or os.cpu_count() or 1, len(jobs)) or 1
+    # Spawn rather than fork, as forking a process that has started Qt is unsafe
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(cone_payloads,)) as executor:
+        futures = [executor.submit(_render_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
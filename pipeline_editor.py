@@ -1,29 +1,30 @@
 import copy
 import math
-import os
 import pickle
 import sys
-import tempfile
 from collections import defaultdict
 from functools import partial
-from typing import cast, Optional
+from typing import cast, Hashable, Optional
 
-from PyQt5.QtCore import QLineF, pyqtSignal, QObject, QRectF, QTimer, QMimeData, QRect
+from PyQt5.QtCore import QLineF, pyqtSignal, QObject, QRectF, QTimer, QMimeData, QRect, QByteArray
 from PyQt5.QtCore import QPointF
 from PyQt5.QtGui import QPainter, QFont, QFontMetricsF, QTransform, QNativeGestureEvent, QKeySequence, \
     QFontMetrics, QRegion
-from PyQt5.QtGui import QPainterPath
+from PyQt5.QtGui import QPainterPath, QPixmap
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QGraphicsScene, QGraphicsView,
                              QGraphicsLineItem, QMenu, QAction, QPushButton, QFileDialog, QGraphicsTextItem, QUndoStack,
-                             QUndoCommand, QGraphicsProxyWidget, QDialog)
-from PyQt5.QtWidgets import QGraphicsPathItem
+                             QUndoCommand, QGraphicsProxyWidget, QDialog, QLabel)
+from PyQt5.QtWidgets import QGraphicsPathItem, QGraphicsPixmapItem
 from PyQt5.QtXml import QDomDocument, QDomElement
 
+from animation_scheduler import AnimationScheduler
 from app_state import NodeState, AppState, CustomNodeDef, NodeId
 from delete_custom_node_dialog import DeleteCustomNodeDialog
 from export_w_aspect_ratio import ExportWithAspectRatio
+from frame_cache import FrameCache
 from full_screen_svg import SvgFullScreenWindow
-from id_datatypes import PortId, EdgeId, output_port, input_port, PropKey, node_changed_port, NodeIdGenerator
+from id_datatypes import PortId, EdgeId, output_port, input_port, PropKey, node_changed_port, NodeIdGenerator, \
+    vis_root_id
 from node_graph import NodeGraph, RefId
 from node_manager import NodeManager, NodeInfo
 from node_props_dialog import NodePropertiesDialog
@@ -34,7 +35,9 @@ from nodes.nodes import CombinationNode, CustomNode
 from nodes.prop_types import PT_Element, PT_Warp, PT_Function, PT_Grid, PT_List, PT_Scalar, PropType, PT_Fill
 from nodes.prop_values import PropValue
 from nodes.shape_datatypes import Group, Element
+from pipeline_format import load_app_state, save_app_state, saved_node_digests
 from reg_custom_dialog import RegCustomDialog
+from render_cache import CachedRender, RenderCache, render_keys
 from selectable_renderer import SelectableSvgElement
 from vis_types import Visualisable, ErrorFig
 
@@ -125,6 +128,8 @@ class NodeItem(QGraphicsRectItem):
         super().__init__(0, 0, width, height)
         self.svg_items = None
         self.svg_item = None
+        self.svg_renderer = None
+        self.render: Optional[CachedRender] = None  # Visualisation shown, while it is up to date with the node
         self.setPos(pos_x, pos_y)
         self.setZValue(1)
         self.setFlag(QGraphicsItem.ItemIsMovable)
@@ -274,10 +279,9 @@ class NodeItem(QGraphicsRectItem):
     def export_image(self):
         vis: Visualisable = self.visualise()
         if isinstance(vis, Element):
-            svg_path: str = os.path.join(self.scene().temp_dir, f"{self.uid}_export.svg")
             width: int = self.node_manager.get_internal_property(self.uid, 'width')
             height: int = self.node_manager.get_internal_property(self.uid, 'height')
-            dialog = ExportWithAspectRatio(svg_path, vis, width, height)
+            dialog = ExportWithAspectRatio(vis, width, height)
             dialog.exec_()
         # TODO: put warning here
 
@@ -422,8 +426,7 @@ class NodeItem(QGraphicsRectItem):
     def visualise(self) -> Visualisable:
         return self.node_manager.visualise(self.uid)
 
-    def update_vis_image(self):
-        """Add an SVG image to the node that scales with node size and has selectable elements"""
+    def remove_vis_items(self):
         # Remove existing SVG items if necessary
         if self.svg_items:
             for item in self.svg_items:
@@ -436,16 +439,59 @@ class NodeItem(QGraphicsRectItem):
             if self.svg_item in self.scene().items():
                 self.scene().removeItem(self.svg_item)
 
-        # Get item to draw
-        vis: Visualisable = self.visualise()
+    def svg_pos(self) -> tuple[float, float]:
+        # Base position for all SVG elements
+        return self.left_max_width + NodeItem.MARGIN_X + NodeItem.LABEL_SVG_DIST, NodeItem.TITLE_HEIGHT + NodeItem.MARGIN_Y
 
-        # Remove invalid keys (from extracted elements)
-        invalid_keys: set[PropKey] = {port.key for port in self.node_state.ports_open if
-                                      port.key not in self.node_info.prop_defs}
-        for key in invalid_keys:
-            self.scene().undo_stack.push(RemoveExtractedElementCmd(self, key))
+    def render_frame(self, scale: float) -> QPixmap:
+        # Rasterise the current visualisation, at scale pixels per scene unit
+        svg_width, svg_height = self.node_state.svg_size
+        pixmap = QPixmap(max(1, round(svg_width * scale)), max(1, round(svg_height * scale)))
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        self.svg_renderer.render(painter)
+        painter.end()
+        return pixmap
+
+    def show_frame(self, pixmap: QPixmap, scale: float):
+        # Show a cached frame from render_frame in place of the SVG
+        self.remove_vis_items()
+        self.render = None
+        self.svg_item = QGraphicsPixmapItem(pixmap)
+        self.svg_item.setTransformationMode(Qt.SmoothTransformation)
+        self.svg_item.setScale(1 / scale)
+        self.svg_item.setParentItem(self)
+        self.svg_item.setPos(*self.svg_pos())
+        self.svg_item.setZValue(2)
+
+    def show_render(self, render: CachedRender):
+        # Show a render from an earlier session without computing the node, which stays dirty until something needs it
+        self.remove_vis_items()
+        self.update_port_shapes(render.port_types)
+        self.svg_renderer = QSvgRenderer(QByteArray(render.svg))
+        self.add_svg_item()
+        self.render = render
+
+    def add_svg_item(self):
+        # Show the whole SVG of the renderer as one item
+        self.svg_item = QGraphicsSvgItem()
+        self.svg_item.setSharedRenderer(self.svg_renderer)
+        # Apply position
+        self.svg_item.setParentItem(self)
+        self.svg_item.setPos(*self.svg_pos())
+        self.svg_item.setZValue(2)
+
+    def output_port_types(self) -> dict[PropKey, Optional[PropType]]:
+        # Type of the result of each open output port, None if it has none
+        port_types: dict[PropKey, Optional[PropType]] = {}
+        for port in self.node_state.ports_open:
+            if not port.is_input:
+                value: Optional[PropValue] = self.node_manager.get_compute_result(port.node, port.key)
+                assert value is None or isinstance(value, PropValue)
+                port_types[port.key] = value.type if value is not None else None
+        return port_types
 
-        # Update output port shapes
+    def update_port_shapes(self, output_port_types: dict[PropKey, Optional[PropType]]):
         for port, port_item in self.port_items.items():
             if port not in self.node_state.ports_open: continue
             if port.is_input:
@@ -464,34 +510,53 @@ class NodeItem(QGraphicsRectItem):
                     port_item.draw_port(src_port_item.curr_port_shape)
             else:
                 # Update output port shape
-                value: Optional[PropValue] = self.node_manager.get_compute_result(port.node, port.key)
-                if value is None:
+                port_type: Optional[PropType] = output_port_types.get(port.key)
+                if port_type is None:
                     port_item.create_shape_for_port_type()
                 else:
-                    assert isinstance(value, PropValue)
-                    port_item.create_shape_for_port_type(value.type)
+                    port_item.create_shape_for_port_type(port_type)
 
-        svg_filepath = os.path.join(self.scene().temp_dir, f"{self.node_state.node}.svg")
-        # Base position for all SVG elements
-        svg_pos_x = self.left_max_width + NodeItem.MARGIN_X + NodeItem.LABEL_SVG_DIST
-        svg_pos_y = NodeItem.TITLE_HEIGHT + NodeItem.MARGIN_Y
+    def update_vis_image(self):
+        """Add an SVG image to the node that scales with node size and has selectable elements"""
+        # Elements are identified by their position in the drawing, so stay selected when it is recomputed
+        selected_ids: set[str] = {item.element_id for item in self.svg_items or ()
+                                  if isinstance(item, SelectableSvgElement) and item.isSelected()}
+        self.remove_vis_items()
+
+        # Get item to draw
+        vis: Visualisable = self.visualise()
+
+        # Remove invalid keys (from extracted elements)
+        invalid_keys: set[PropKey] = {port.key for port in self.node_state.ports_open if
+                                      port.key not in self.node_info.prop_defs}
+        for key in invalid_keys:
+            self.scene().undo_stack.push(RemoveExtractedElementCmd(self, key))
+
+        # Update port shapes
+        output_port_types: dict[PropKey, Optional[PropType]] = self.output_port_types()
+        self.update_port_shapes(output_port_types)
+
+        svg_pos_x, svg_pos_y = self.svg_pos()
         svg_width, svg_height = self.node_state.svg_size
 
-        vis.save_to_svg(svg_filepath, svg_width, svg_height)
+        # Render the SVG in memory once, shared by the displayed items and the element lookup below
+        if isinstance(vis, Element):
+            # QtSvg renders flattened transforms faster than deeply nested groups
+            svg_content: QByteArray = QByteArray(vis.svg_bytes(svg_width, svg_height, flatten_transforms=True,
+                                                               root_id=vis_root_id(self.uid)))
+        else:
+            svg_content = QByteArray(vis.svg_bytes(svg_width, svg_height))
+        self.svg_renderer = QSvgRenderer(svg_content)
+        # Errors may not happen again, so aren't kept in the render cache
+        self.render = CachedRender(bytes(svg_content), output_port_types) if not isinstance(vis, ErrorFig) else None
         if not self.node_info.selectable or isinstance(vis, ErrorFig):
-            self.svg_item = QGraphicsSvgItem(svg_filepath)
-            # Apply position
-            self.svg_item.setParentItem(self)
-            self.svg_item.setPos(svg_pos_x, svg_pos_y)
-            self.svg_item.setZValue(2)
+            self.add_svg_item()
         else:
             assert isinstance(vis, Group)
             assert not vis.transform_list.transforms
 
-            # Create SVG renderer
-            svg_renderer = QSvgRenderer(svg_filepath)
-
-            viewport_svg = QGraphicsSvgItem(svg_filepath)
+            viewport_svg = QGraphicsSvgItem()
+            viewport_svg.setSharedRenderer(self.svg_renderer)
             viewport_svg.setParentItem(self)
             viewport_svg.setPos(svg_pos_x, svg_pos_y)
             viewport_svg.setZValue(1)  # Set below selectable items
@@ -502,11 +567,9 @@ class NodeItem(QGraphicsRectItem):
             clip_path.addRect(QRectF(0, 0, svg_width, svg_height))
             viewport_svg.setFlag(QGraphicsItem.ItemClipsChildrenToShape, True)
 
-            # Load the SVG file as XML
+            # Load the SVG as XML
             dom_document = QDomDocument()
-            with open(svg_filepath, 'r') as file:
-                content = file.read()
-                dom_document.setContent(content)
+            dom_document.setContent(svg_content)
 
             def find_element_by_id(node, target_id):
                 if node.isElement():
@@ -525,7 +588,7 @@ class NodeItem(QGraphicsRectItem):
                 return QDomElement()  # Return null element if not found
 
             root = dom_document.documentElement()
-            vis_element = find_element_by_id(root, vis.uid)
+            vis_element = find_element_by_id(root, vis_root_id(self.uid))
             assert not vis_element.isNull()
 
             child = vis_element.firstChild()
@@ -534,18 +597,16 @@ class NodeItem(QGraphicsRectItem):
                     child_element = child.toElement()
                     child_elem_id = child_element.attribute('id')
                     assert child_elem_id
-                    selectable_item = SelectableSvgElement(child_elem_id, vis, svg_renderer, self)
+                    selectable_item = SelectableSvgElement(child_elem_id, vis, self.svg_renderer, self)
                     selectable_item.setParentItem(viewport_svg)
                     selectable_item.setPos(0, 0)
                     selectable_item.setZValue(3)
+                    selectable_item.setSelected(child_elem_id in selected_ids)
                     self.svg_items.append(selectable_item)
                 child = child.nextSibling()
 
     def update_visualisations(self):
-        self.update_vis_image()
-        for output_node in self.node_graph.output_nodes(self.uid):
-            output_node_item: NodeItem = self.scene().node_item(output_node)
-            output_node_item.update_visualisations()
+        self.scene().update_visualisations({self.uid})
 
     def create_ports(self, update_vis=True):
         for port in self.node_state.ports_open:
@@ -1075,13 +1136,13 @@ class RandomiseNodesCmd(QUndoCommand):
     def undo(self):
         for node, prev_seed in self.prev_seeds.items():
             self.node_manager.randomise(node, prev_seed)
-            self.scene.node_items[node].update_visualisations()
+        self.scene.update_visualisations(set(self.prev_seeds))
 
     def redo(self):
         for node in self.nodes:
             self.prev_seeds[node] = self.node_manager.get_seed(node)
             self.node_manager.randomise(node)  # TODO: store new seed for redo
-            self.scene.node_item(node).update_visualisations()
+        self.scene.update_visualisations(self.nodes)
 
 
 class PlayNodesCmd(QUndoCommand):
@@ -1133,7 +1194,7 @@ class PauseNodesCmd(QUndoCommand):
 class PipelineScene(QGraphicsScene):
     """Scene that contains all pipeline elements"""
 
-    def __init__(self, temp_dir: str, parent=None):
+    def __init__(self, parent=None):
         super().__init__(parent)
         self.setSceneRect(-100000, -100000, 200000, 200000)
         self.skip_next_context_menu = False
@@ -1150,7 +1211,6 @@ class PipelineScene(QGraphicsScene):
         self.node_manager: NodeManager = NodeManager()
         self.node_id_generator: NodeIdGenerator = NodeIdGenerator()
 
-        self.temp_dir = temp_dir
         self.undo_stack = QUndoStack()
         self.filepath = None
         self.svg_viewer = None
@@ -1160,22 +1220,14 @@ class PipelineScene(QGraphicsScene):
         self.connection_signals.connectionMade.connect(self.finish_connection)
 
         # Animation
-        self.timer = QTimer()
-        self.timer_interval_ms = 10
-        self.timer.setInterval(self.timer_interval_ms)
-        self.timer.timeout.connect(self.animate)
-        # TODO: uncomment this when figure out efficiency
-        self.timer.start()
+        self.frame_cache = FrameCache()
+        self.render_cache = RenderCache()
+        self.animation_scheduler = AnimationScheduler(self)
+        self.undo_stack.indexChanged.connect(self.animation_scheduler.sync)
 
     def gen_node_id(self) -> NodeId:
         return self.node_id_generator.gen_node_id()
 
-    def animate(self):
-        for node in self.node_manager.playing_nodes():
-            # Perform animation logic here
-            if self.node_manager.reanimate(node, self.timer_interval_ms):
-                self.node_item(node).update_visualisations()
-
     @property
     def node_graph(self):
         return self.node_manager.node_graph
@@ -1376,37 +1428,36 @@ class PipelineScene(QGraphicsScene):
             # Add custom nodes
             if self.custom_node_defs:
                 menu.addSeparator()
-                sorted_custom_node_defs = sorted(self.custom_node_defs.items(), key=lambda item: item[0])
-                for name, node_def in sorted_custom_node_defs:
+                for name in sorted(self.custom_node_defs):
                     action = QAction(name, menu)
-                    handler = partial(self.add_new_node, event.scenePos(), CustomNode,
-                                      add_info=(name, copy.deepcopy(node_def)))
-                    action.triggered.connect(handler)
+                    # Only copy the definition once chosen, as definitions may be loaded lazily
+                    action.triggered.connect(partial(self.add_custom_node, event.scenePos(), name))
                     menu.addAction(action)
 
             menu.exec_(event.screenPos())
 
+    def add_custom_node(self, pos, name: str):
+        self.add_new_node(pos, CustomNode, add_info=(name, copy.deepcopy(self.custom_node_defs[name])))
+
     def view_svg_full_screen(self, canvas_node: NodeItem):
         vis: Visualisable = canvas_node.visualise()
         if isinstance(vis, Element):
-            svg_path: str = os.path.join(self.temp_dir, f"{canvas_node.uid}_fullscreen.svg")
             width: int = self.node_manager.get_internal_property(canvas_node.uid, 'width')
             height: int = self.node_manager.get_internal_property(canvas_node.uid, 'height')
-            vis.save_to_svg(svg_path, width, height)
-            self.svg_viewer = SvgFullScreenWindow(svg_path)
+            self.svg_viewer = SvgFullScreenWindow(vis.svg_bytes(width, height))
             self.svg_viewer.show()
 
     def save_scene(self, filepath):
         view = self.view()
         center = view.mapToScene(view.viewport().rect().center())
         zoom = view.current_zoom
-        with open(filepath, "wb") as f:
-            pickle.dump(AppState(view_pos=(center.x(), center.y()),
-                                 zoom=zoom,
-                                 node_states=[node_item.node_state for node_item in self.node_items.values()],
-                                 node_manager=self.node_manager,
-                                 custom_node_defs=self.custom_node_defs,
-                                 next_node_id=self.node_id_generator.next_id), f)
+        save_app_state(filepath, AppState(view_pos=(center.x(), center.y()),
+                                          zoom=zoom,
+                                          node_states=[node_item.node_state for node_item in self.node_items.values()],
+                                          node_manager=self.node_manager,
+                                          custom_node_defs=self.custom_node_defs,
+                                          next_node_id=self.node_id_generator.next_id))
+        self.store_renders(render_keys(self.node_graph, saved_node_digests(filepath)))
 
     # Item getter functions
     def node_item(self, node: NodeId) -> NodeItem:
@@ -1437,22 +1488,85 @@ class PipelineScene(QGraphicsScene):
     def remove_edge(self, edge: EdgeId, update_vis=True):
         self.edge_item(edge).remove_from_scene(update_vis=update_vis)
 
+    def update_visualisations(self, nodes: set[NodeId]):
+        # Invalidate the downstream cones of the given nodes, then refresh each affected node once in topological order
+        affected_nodes: set[NodeId] = set()
+        for node in nodes:
+            affected_nodes.update(self.node_manager.mark_dirty(node))
+        # Frames rendered before the edit are out of date
+        self.frame_cache.invalidate(affected_nodes)
+        for node in self.node_graph.get_topo_order_subgraph(affected_nodes):
+            self.node_item(node).update_vis_image()
+
+    def frame_scale(self) -> float:
+        # Device pixels per scene unit, so cached frames are as sharp as the SVG they replace
+        return round(self.view().transform().m11() * self.view().devicePixelRatioF(), 2)
+
+    def frame_key(self, node: NodeId, scale: float) -> Optional[Hashable]:
+        # Key of the node's current animation frame in the frame cache, or None if it shouldn't be cached
+        node_item: NodeItem = self.node_item(node)
+        if node_item.node_info.selectable:
+            return None  # Selectable elements need the SVG
+        animation_keys: list[tuple[int, Hashable]] = []
+        for upstream_node in self.node_graph.upstream_nodes(node):
+            if self.node_manager.node_info(upstream_node).animatable:
+                animation_key: Optional[Hashable] = self.node_manager.animation_key(upstream_node)
+                if animation_key is None:
+                    return None  # Animation doesn't loop
+                animation_keys.append((upstream_node.value, animation_key))
+        return tuple(sorted(animation_keys)), node_item.node_state.svg_size, scale
+
+    def advance_animation(self, nodes: set[NodeId]):
+        # Refresh the nodes affected by the given animatable nodes stepping, showing frames from the cache if seen before
+        affected_nodes: set[NodeId] = set()
+        for node in nodes:
+            affected_nodes.update(self.node_manager.mark_dirty(node))
+        scale: float = self.frame_scale()
+        for node in self.node_graph.get_topo_order_subgraph(affected_nodes):
+            node_item: NodeItem = self.node_item(node)
+            frame_key: Optional[Hashable] = self.frame_key(node, scale)
+            pixmap: Optional[QPixmap] = self.frame_cache.get(node, frame_key) if frame_key is not None else None
+            if pixmap is not None:
+                # Shown without computing the node, which stays dirty until something else needs it
+                node_item.show_frame(pixmap, scale)
+                continue
+            node_item.update_vis_image()
+            if frame_key is not None:
+                self.frame_cache.put(node, frame_key, node_item.render_frame(scale))
+
     def add_node(self, node_state: NodeState, update_vis=True):
         node_item = NodeItem(node_state, self.node_manager.node_info(node_state.node))
         self.node_items[node_state.node] = node_item
         self.addItem(node_item)
         node_item.create_ports(update_vis=update_vis)
 
-    def load_from_node_states(self, node_states: set[NodeState], edges: set[EdgeId]):
+    def load_from_node_states(self, node_states: set[NodeState], edges: set[EdgeId],
+                              keys: Optional[dict[NodeId, str]] = None):
         # Add node items
         for node_state in node_states:
             self.add_node(node_state, update_vis=False)
         # Add edge items
         for edge in edges:
             self.add_edge(edge, update_vis=False)
-        # Update visualisations in order
+        # Update visualisations in order, showing renders from the render cache where the nodes' keys are found
+        keys = keys or {}
         for node in self.node_graph.get_topo_order_subgraph({node_state.node for node_state in node_states}):
-            self.node_item(node).update_vis_image()
+            node_item: NodeItem = self.node_item(node)
+            key: Optional[str] = keys.get(node)
+            # Selectable nodes need their visualisation to make their elements selectable
+            render: Optional[CachedRender] = self.render_cache.get(key) if (
+                    key is not None and not node_item.node_info.selectable) else None
+            if render is not None:
+                node_item.show_render(render)
+            else:
+                node_item.update_vis_image()
+
+    def store_renders(self, keys: dict[NodeId, str]):
+        # Keep the up to date renders of nodes, under their keys in the file just loaded or saved
+        for node, key in keys.items():
+            node_item: Optional[NodeItem] = self.node_items.get(node)
+            if node_item is not None and node_item.render is not None and not node_item.node_info.selectable:
+                self.render_cache.put(key, node_item.render)
 
     def add_to_graph_and_scene(self, node_states: dict[NodeId, NodeState], base_nodes: dict[NodeId, Node],
                                edges: set[EdgeId], more_node_to_port_refs: dict[NodeId, dict[PortId, RefId]]):
@@ -1485,29 +1599,32 @@ class PipelineScene(QGraphicsScene):
             if edge.src_node in self.node_items and edge.dst_node in self.node_items:
                 # Connection still exists, remove now
                 self.remove_edge(edge, update_vis=False)
-        # Update affected nodes in topological order
-        for affected_node in self.node_graph.get_topo_order_subgraph(affected_nodes):
-            affected_node_item = self.node_item(affected_node)
-            affected_node_item.update_visualisations()
+        self.frame_cache.invalidate(nodes)
+        # Update affected nodes
+        self.update_visualisations(affected_nodes)
 
     def clear_scene(self):
         nodes = list(self.node_items.keys())
         for node in nodes:
             self.node_item(node).remove_from_scene(update_vis=False)
+        self.animation_scheduler.clear()
+        self.frame_cache.clear()
 
     def load_scene(self, filepath):
         self.clear_scene()
 
-        with open(filepath, "rb") as f:
-            app_state: AppState = pickle.load(f)
+        app_state: AppState = load_app_state(filepath)
 
         self.view().centerOn(*app_state.view_pos)
         self.view().set_zoom(app_state.zoom)
         self.node_manager = app_state.node_manager
         self.custom_node_defs = app_state.custom_node_defs
         self.node_id_generator = NodeIdGenerator(app_state.next_node_id)
-        self.load_from_node_states(app_state.node_states, self.node_graph.edges)
+        keys: dict[NodeId, str] = render_keys(self.node_graph, saved_node_digests(filepath))
+        self.load_from_node_states(app_state.node_states, self.node_graph.edges, keys)
+        self.store_renders(keys)
         self.undo_stack.clear()
+        self.animation_scheduler.sync()
         self.filepath = filepath
 
     def change_node_selection(self, clicked_item: NodeItem, index):
@@ -1672,13 +1789,13 @@ class PipelineView(QGraphicsView):
 class PipelineEditor(QMainWindow):
     """Main application window"""
 
-    def __init__(self, temp_dir):
+    def __init__(self):
         super().__init__()
         self.setWindowTitle("Pipeline Editor")
         self.setGeometry(100, 100, 1000, 800)
 
         # Create the scene and view
-        self.scene = PipelineScene(temp_dir)
+        self.scene = PipelineScene()
         self.view = PipelineView(self.scene)
         self.setCentralWidget(self.view)
 
@@ -1688,6 +1805,9 @@ class PipelineEditor(QMainWindow):
         # Create a status bar with instructions
         self.statusBar().showMessage(
             "Right-click for node menu | Drag from output port (green) to input port (gray) to create connections")
+        self.animation_label = QLabel()
+        self.statusBar().addPermanentWidget(self.animation_label)
+        self.scene.animation_scheduler.stats_updated.connect(lambda stats: self.animation_label.setText(str(stats)))
 
         self.show()
 
@@ -2083,7 +2203,6 @@ class PipelineEditor(QMainWindow):
 
 
 if __name__ == "__main__":
-    with tempfile.TemporaryDirectory() as temp_dir:
-        app = QApplication(sys.argv)
-        editor = PipelineEditor(temp_dir=temp_dir)
-        sys.exit(app.exec_())
+    app = QApplication(sys.argv)
+    editor = PipelineEditor()
+    sys.exit(app.exec_())
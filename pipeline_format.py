@@ -0,0 +1,332 @@
+"""
+Chunked binary file format for pipelines.
+
+Layout (integers are little-endian):
+    header   MAGIC, format version (u16)
+    chunks   pickled payloads, located through the table of contents
+    TOC      pickled dict mapping each chunk name to its (offset, length, digest)
+    footer   TOC offset (u64), TOC length (u64), FOOTER_MAGIC
+
+Chunks:
+    meta            view position, zoom, next node ID and the order of nodes and node states
+    graph           the NodeGraph of the scene
+    node/<id>       the NodeState (if any) and Node of each node in the scene
+    custom/<name>   each custom node definition, only unpickled when it is first used
+
+Compute results, and the input data cached in port reference table entries, are never written, as every node is
+recomputed after loading anyway. Chunks are pickled canonically, so unchanged contents give unchanged bytes in any
+session. Saving over a file in this format only appends the chunks whose contents changed, followed by a new TOC and
+footer; the file is rewritten from scratch once over half of it is superseded data. The appended chunks reach the disk
+before the footer does, and a file whose last save was cut short is read up to the last complete footer, so the
+previous save is kept. Files that don't start with MAGIC are loaded as legacy pickled AppStates.
+"""
+import copyreg
+import hashlib
+import io
+import os
+import pickle
+import struct
+from collections.abc import MutableMapping
+from typing import Iterator, Optional
+
+from app_state import AppState, CustomNodeDef, NodeState
+from id_datatypes import EdgeId, NodeId, PortId
+from node_manager import NodeManager
+from nodes.node_defs import RuntimeNode
+from nodes.prop_values import Colour, Point, PortRefTableEntry
+
+MAGIC = b"OPARTPL\x00"
+FOOTER_MAGIC = b"OPARTTOC"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<8sH")
+FOOTER = struct.Struct("<QQ8s")
+
+type Toc = dict[str, tuple[int, int, bytes]]
+
+
+class PipelineFormatError(Exception):
+    pass
+
+
+def _reduce_runtime_node(runtime_node: RuntimeNode):
+    # Pickle runtime nodes without their compute results, or the digest of them
+    state = runtime_node.__dict__.copy()
+    state['compute_results'] = {}
+    state.pop('resolved_props', None)
+    state.pop('results_digest', None)
+    return copyreg.__newobj__, (RuntimeNode,), state
+
+
+def _reduce_port_ref_entry(entry: PortRefTableEntry):
+    # Pickle port reference table entries without the input data, which is filled in again on compute
+    state = entry.__dict__.copy()
+    state['data'] = None
+    return copyreg.__newobj__, (type(entry),), state
+
+
+def _subclasses(cls) -> list[type]:
+    return [cls] + [sub for direct in cls.__subclasses__() for sub in _subclasses(direct)]
+
+
+class _CanonicalPickler(pickle._Pickler):
+    # Pickles equal immutable values as one object, so the bytes don't depend on which of them are the same object
+    # (computes replace them with equal ones made elsewhere). Only the pure Python pickler can be changed to do this.
+    VALUE_TYPES: frozenset[type] = frozenset({str, NodeId, PortId, EdgeId, Point, Colour})
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict = {}  # Memo index of each value pickled
+
+    def save(self, obj, save_persistent_id=True) -> None:
+        if type(obj) not in self.VALUE_TYPES:
+            super().save(obj, save_persistent_id)
+            return
+        # Item types are part of the key, so tuples of equal numbers of different types aren't merged
+        key = (type(obj), tuple(map(type, obj)), obj) if isinstance(obj, tuple) else (type(obj), obj)
+        index: Optional[int] = self._values.get(key)
+        if index is not None:
+            self.write(self.get(index))
+            return
+        super().save(obj, save_persistent_id)
+        self._values[key] = self.memo[id(obj)][0]
+
+
+def dump_chunk(obj, canonical: bool = False) -> bytes:
+    # With canonical, equal objects pickle to equal bytes however their strings are shared, at several times the cost
+    buffer = io.BytesIO()
+    pickler_class = _CanonicalPickler if canonical else pickle.Pickler
+    pickler = pickler_class(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    pickler.dispatch_table[RuntimeNode] = _reduce_runtime_node
+    # Dispatch tables are looked up by exact type
+    for entry_class in _subclasses(PortRefTableEntry):
+        pickler.dispatch_table[entry_class] = _reduce_port_ref_entry
+    pickler.dump(obj)
+    return buffer.getvalue()
+
+
+def _digest(payload) -> bytes:
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class LazyCustomNodeDefs(MutableMapping):
+    """Custom node definitions by name, kept pickled until each is first accessed."""
+
+    def __init__(self, pickled_defs: dict[str, bytes]):
+        self._pickled: dict[str, bytes] = pickled_defs
+        self._loaded: dict[str, CustomNodeDef] = {}
+        self._order: list[str] = list(pickled_defs)
+
+    def pickled(self, name: str) -> Optional[bytes]:
+        # Pickled definition if it hasn't been loaded (so it can't have been changed)
+        return self._pickled.get(name)
+
+    def __getitem__(self, name: str) -> CustomNodeDef:
+        if name in self._pickled:
+            self._loaded[name] = pickle.loads(self._pickled.pop(name))
+        return self._loaded[name]
+
+    def __setitem__(self, name: str, node_def: CustomNodeDef):
+        self._pickled.pop(name, None)
+        if name not in self._loaded:
+            self._order.append(name)
+        self._loaded[name] = node_def
+
+    def __delitem__(self, name: str):
+        if name not in self._pickled and name not in self._loaded:
+            raise KeyError(name)
+        self._pickled.pop(name, None)
+        self._loaded.pop(name, None)
+        self._order.remove(name)
+
+    def __contains__(self, name) -> bool:
+        return name in self._pickled or name in self._loaded
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._order))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+def _app_state_chunks(app_state: AppState) -> dict[str, bytes]:
+    node_manager: NodeManager = app_state.node_manager
+    states: dict[NodeId, NodeState] = {state.node: state for state in app_state.node_states}
+    # Pickles share equal objects only if they are the same object, so list the same node IDs in both places
+    node_ids: dict[NodeId, NodeId] = {node: node for node in node_manager.node_map}
+    chunks: dict[str, bytes] = {
+        'meta': dump_chunk({
+            'view_pos': app_state.view_pos,
+            'zoom': app_state.zoom,
+            'next_node_id': app_state.next_node_id,
+            'nodes': list(node_ids),
+            'node_states': [node_ids.get(node, node) for node in states]
+        }, canonical=True),
+        'graph': dump_chunk(node_manager.node_graph, canonical=True)
+    }
+    for node, runtime_node in node_manager.node_map.items():
+        chunks[f'node/{node.value}'] = dump_chunk((states.get(node), runtime_node.node), canonical=True)
+    custom_node_defs = app_state.custom_node_defs
+    for name in custom_node_defs:
+        pickled: Optional[bytes] = custom_node_defs.pickled(name) if isinstance(custom_node_defs,
+                                                                                  LazyCustomNodeDefs) else None
+        if pickled is None:
+            pickled = dump_chunk(custom_node_defs[name], canonical=True)
+        chunks[f'custom/{name}'] = pickled
+    return chunks
+
+
+def _find_toc(data: bytes) -> tuple[Toc, int]:
+    # TOC of the last complete save and the end of its footer, skipping anything a save cut short left after it
+    end: int = len(data)
+    while end >= HEADER.size + FOOTER.size:
+        if data[end - len(FOOTER_MAGIC):end] == FOOTER_MAGIC:
+            toc_offset, toc_length, _ = FOOTER.unpack_from(data, end - FOOTER.size)
+            if HEADER.size <= toc_offset and toc_offset + toc_length == end - FOOTER.size:
+                try:
+                    toc = pickle.loads(data[toc_offset:toc_offset + toc_length])
+                except Exception:
+                    toc = None  # Chunk data that happens to look like a footer
+                if isinstance(toc, dict):
+                    return toc, end
+        end = data.rfind(FOOTER_MAGIC, HEADER.size, end - 1) + len(FOOTER_MAGIC)
+    raise PipelineFormatError("Pipeline file footer is missing, the file may be truncated")
+
+
+def _read_toc(data) -> Toc:
+    if len(data) < HEADER.size + FOOTER.size:
+        raise PipelineFormatError("File is truncated")
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise PipelineFormatError("Not a pipeline file")
+    if version > FORMAT_VERSION:
+        raise PipelineFormatError(f"Pipeline file version {version} is newer than supported ({FORMAT_VERSION})")
+    return _find_toc(data)[0]
+
+
+def _read_existing_toc(filepath) -> Optional[tuple[Toc, int]]:
+    # TOC of the file being saved over and the end of its footer, or None if it doesn't exist or isn't in this format
+    try:
+        with open(filepath, "rb") as f:
+            data: bytes = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size or HEADER.unpack_from(data, 0) != (MAGIC, FORMAT_VERSION):
+        return None
+    try:
+        return _find_toc(data)
+    except PipelineFormatError:
+        return None
+
+
+def _sync(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _write_toc(f, toc: Toc) -> None:
+    toc_offset: int = f.tell()
+    toc_bytes: bytes = pickle.dumps(toc, protocol=pickle.HIGHEST_PROTOCOL)
+    f.write(toc_bytes)
+    f.write(FOOTER.pack(toc_offset, len(toc_bytes), FOOTER_MAGIC))
+
+
+def _write_full(filepath, chunks: dict[str, bytes]) -> None:
+    # Write to a temporary file first, so a failed save never leaves a broken pipeline behind
+    temp_path: str = filepath + ".tmp"
+    toc: Toc = {}
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        for name, payload in chunks.items():
+            toc[name] = (f.tell(), len(payload), _digest(payload))
+            f.write(payload)
+        _write_toc(f, toc)
+        _sync(f)
+    os.replace(temp_path, filepath)
+
+
+def save_app_state(filepath, app_state: AppState) -> None:
+    chunks: dict[str, bytes] = _app_state_chunks(app_state)
+    existing: Optional[tuple[Toc, int]] = _read_existing_toc(filepath)
+    if existing is None:
+        _write_full(filepath, chunks)
+        return
+    old_toc, file_size = existing
+
+    # Reuse the chunks already in the file, appending only changed ones
+    toc: Toc = {}
+    changed: dict[str, bytes] = {}
+    for name, payload in chunks.items():
+        digest: bytes = _digest(payload)
+        old_entry = old_toc.get(name)
+        if old_entry is not None and old_entry[1:] == (len(payload), digest):
+            toc[name] = old_entry
+        else:
+            changed[name] = payload
+    if not changed and toc.keys() == old_toc.keys():
+        if os.path.getsize(filepath) > file_size:
+            with open(filepath, "r+b") as f:
+                f.truncate(file_size)  # Drop what an earlier save cut short left after the footer
+        return
+
+    live_size: int = sum(len(payload) for payload in chunks.values())
+    if 2 * live_size < file_size + sum(len(payload) for payload in changed.values()):
+        _write_full(filepath, chunks)  # Compact
+        return
+    with open(filepath, "r+b") as f:
+        f.seek(file_size)
+        try:
+            f.truncate()  # Drop what an earlier save cut short left after the footer
+            for name, payload in changed.items():
+                toc[name] = (f.tell(), len(payload), _digest(payload))
+                f.write(payload)
+            # The new footer must not reach the disk before the chunks it points to
+            _sync(f)
+            _write_toc(f, toc)
+            _sync(f)
+        except BaseException:
+            # Leave the file as it was before the save
+            f.truncate(file_size)
+            raise
+
+
+def saved_node_digests(filepath) -> dict[NodeId, bytes]:
+    # Digest of each node's chunk in a pipeline file, empty if it isn't in this format
+    existing: Optional[tuple[Toc, int]] = _read_existing_toc(filepath)
+    if existing is None:
+        return {}
+    toc: Toc = existing[0]
+    return {NodeId(int(name.removeprefix('node/'))): digest for name, (_, _, digest) in toc.items()
+            if name.startswith('node/')}
+
+
+def load_app_state(filepath) -> AppState:
+    with open(filepath, "rb") as f:
+        data: bytes = f.read()
+    if not data.startswith(MAGIC):
+        return pickle.loads(data)  # Legacy pickled AppState
+
+    toc: Toc = _read_toc(data)
+
+    def chunk(name: str) -> bytes:
+        offset, length, _ = toc[name]
+        return data[offset:offset + length]
+
+    meta = pickle.loads(chunk('meta'))
+    node_manager = NodeManager()
+    node_manager.node_graph = pickle.loads(chunk('graph'))
+    states: dict[NodeId, NodeState] = {}
+    for node in meta['nodes']:
+        state, base_node = pickle.loads(chunk(f'node/{node.value}'))
+        node_manager.add_node(node, base_node)
+        if state is not None:
+            states[node] = state
+    custom_node_defs = LazyCustomNodeDefs({name.removeprefix('custom/'): chunk(name) for name in toc
+                                           if name.startswith('custom/')})
+    return AppState(view_pos=meta['view_pos'],
+                    zoom=meta['zoom'],
+                    node_states=[states[node] for node in meta['node_states']],
+                    node_manager=node_manager,
+                    custom_node_defs=custom_node_defs,
+                    next_node_id=meta['next_node_id'])
@@ -0,0 +1,183 @@
+"""
+Rendered visualisations of nodes kept on disk between editor sessions, so pipelines open without computing them.
+
+Each render is keyed by a digest of the node's upstream cone as saved in a pipeline file: the digest of every saved
+node chunk (which includes the node's state and its size in the editor), and of how those nodes are connected. Keys
+are only known for nodes in a file, so renders are stored after a pipeline is loaded or saved, and looked up when it is
+loaded again. A node whose key is unchanged since its render was stored is shown without computing it. Keys also
+include a digest of the source code that computes and draws nodes, so renders stored before it changed aren't found.
+
+Renders are files in the cache directory, and once their total size is over max_bytes the least recently used ones
+are deleted. The cache is best effort: renders that can't be read or written are treated as missing.
+"""
+import functools
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Optional
+
+from id_datatypes import NodeId, PropKey
+from node_graph import NodeGraph
+from nodes.prop_types import PropType
+
+# Source code that node renders depend on, from computing the nodes (reusing cached results) to the editor drawing
+# them: packages are included with all their modules
+RENDER_SOURCES = ("nodes", "id_datatypes.py", "node_graph.py", "node_manager.py", "compute_cache.py",
+                  "parallel_compute.py", "vis_types.py", "pipeline_editor.py", "render_cache.py")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "op_art_generator", "renders")
+SUFFIX = ".render"
+
+
+@dataclass(frozen=True)
+class CachedRender:
+    svg: bytes  # Visualisation of the node at its size in the editor
+    port_types: dict[PropKey, Optional[PropType]]  # Type of each open output port's result, None if it has none
+
+
+@functools.cache
+def code_version() -> bytes:
+    # Digest of the render sources, which changes whenever nodes may compute or render differently
+    root: str = os.path.dirname(os.path.abspath(__file__))
+    paths: list[str] = []
+    for source in RENDER_SOURCES:
+        path: str = os.path.join(root, source)
+        if os.path.isdir(path):
+            paths.extend(os.path.join(dirpath, filename) for dirpath, dirnames, filenames in os.walk(path)
+                         for filename in filenames if filename.endswith(".py"))
+        else:
+            paths.append(path)
+    code_hash = hashlib.blake2b(digest_size=16)
+    for path in sorted(paths):
+        code_hash.update(os.path.relpath(path, root).replace(os.sep, "/").encode() + b"\0")
+        with open(path, "rb") as f:
+            code_hash.update(f.read() + b"\0")
+    return code_hash.digest()
+
+
+def render_keys(node_graph: NodeGraph, node_digests: dict[NodeId, bytes]) -> dict[NodeId, str]:
+    # Key of each node whose upstream cone was all saved, given the digest of each node's saved chunk
+    keys: dict[NodeId, str] = {}
+    for node in node_graph.get_topo_order_subgraph():
+        digest: Optional[bytes] = node_digests.get(node)
+        if digest is None:
+            continue
+        port_refs: dict = node_graph.node_to_port_ref.get(node, {})
+        inputs: list[str] = []
+        for edge in node_graph.incoming_edges(node):
+            src_key: Optional[str] = keys.get(edge.src_node)
+            if src_key is None:
+                break
+            # The node refers to its sources by ref ID, not node ID
+            inputs.append(f"{edge.dst_port.key!r}<{port_refs.get(edge.src_port)}:{edge.src_port.key!r}:{src_key}")
+        else:
+            cone_hash = hashlib.blake2b(code_version() + digest, digest_size=16)
+            cone_hash.update(";".join(sorted(inputs)).encode())
+            keys[node] = cone_hash.hexdigest()
+    return keys
+
+
+class RenderCache:
+    """Node renders on disk, keyed by render_keys, evicted least recently used first once over max_bytes."""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # Total size of the files, measured when first needed
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        # Last use time, size and path of every render file
+        entries: list[tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(SUFFIX):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    @property
+    def size_bytes(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def get(self, key: str) -> Optional[CachedRender]:
+        path: str = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                render = pickle.loads(f.read())
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            self._delete(path)
+            self.misses += 1
+            return None
+        if not isinstance(render, CachedRender):
+            self._delete(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return render
+
+    def put(self, key: str, render: CachedRender) -> None:
+        path: str = self._path(key)
+        try:
+            # A render with the same key is the same render
+            os.utime(path)
+            return
+        except OSError:
+            pass
+        payload: bytes = pickle.dumps(render, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        # Write to a temporary file first, so other editors never read a partial render
+        temp_path: str = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError:
+            self._delete(temp_path)
+            return
+        self._size = self.size_bytes + len(payload)
+        self.shrink(self.max_bytes)
+
+    def shrink(self, max_bytes: int) -> None:
+        # Delete the least recently used renders until they fit in max_bytes
+        if self.size_bytes <= max_bytes:
+            return
+        entries: list[tuple[float, int, str]] = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= max_bytes:
+                break
+            if self._delete(path):
+                self._size -= size
+
+    @staticmethod
+    def _delete(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self) -> None:
+        self.shrink(0)
+        self.hits = 0
+        self.misses = 0
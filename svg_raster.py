@@ -0,0 +1,27 @@
+import os
+
+from PyQt5.QtCore import QByteArray
+from PyQt5.QtGui import QGuiApplication, QImage, QPainter
+from PyQt5.QtSvg import QSvgRenderer
+
+_headless_app = None
+
+
+def ensure_gui_application():
+    # Rendering SVG text needs a GUI application; outside the editor, create one on the offscreen platform
+    global _headless_app
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        _headless_app = QGuiApplication([])
+
+
+def rasterise_svg(svg, width, height) -> QImage:
+    # svg is either a filepath or the SVG document itself as bytes
+    ensure_gui_application()
+    svg_renderer = QSvgRenderer(QByteArray(svg) if isinstance(svg, bytes) else svg)
+    image = QImage(width, height, QImage.Format_ARGB32)
+    image.fill(0x00000000)  # transparent background
+    painter = QPainter(image)
+    svg_renderer.render(painter)
+    painter.end()
+    return image
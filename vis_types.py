@@ -1,14 +1,20 @@
+import io
 from abc import ABC, abstractmethod
 
 from nodes.drawers.error_drawer import ErrorDrawer
 
 
 class Visualisable(ABC):
+    __slots__ = ()
 
     @abstractmethod
-    def save_to_svg(self, filepath, width, height):
+    def svg_bytes(self, width, height) -> bytes:
         pass
 
+    def save_to_svg(self, filepath, width, height):
+        with open(filepath, 'wb') as f:
+            f.write(self.svg_bytes(width, height))
+
 
 class MatplotlibFig(Visualisable):
     DPI = 100
@@ -16,10 +22,12 @@ class MatplotlibFig(Visualisable):
     def __init__(self, fig):
         self.fig = fig
 
-    def save_to_svg(self, filepath, width, height):
+    def svg_bytes(self, width, height) -> bytes:
         self.fig.set_size_inches(width / MatplotlibFig.DPI, height / MatplotlibFig.DPI)
         self.fig.set_dpi(MatplotlibFig.DPI)
-        self.fig.savefig(filepath, format='svg', bbox_inches='tight')
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format='svg', bbox_inches='tight')
+        return buffer.getvalue()
 
 
 class ErrorFig(Visualisable):
@@ -28,5 +36,5 @@ class ErrorFig(Visualisable):
         self.title = title
         self.content = content
 
-    def save_to_svg(self, filepath, width, height):
-        ErrorDrawer(filepath, width, height, (self.title, self.content)).save()
+    def svg_bytes(self, width, height) -> bytes:
+        return ErrorDrawer(width, height, (self.title, self.content)).svg_bytes()